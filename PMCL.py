@@ -14,6 +14,13 @@ import urllib.parse
 import json
 import uuid
 import time
+import hashlib
+import concurrent.futures
+import queue
+import collections
+import contextlib
+import gzip
+import re
 
 class MinecraftLauncherGUI:
     def __init__(self, root):
@@ -40,6 +47,10 @@ class MinecraftLauncherGUI:
 """)
                 print(f"[{time.asctime()}] 程序开始运行")
                 f.write(f"[{time.asctime()}] 程序开始运行\n")
+
+            # 启动日志线程
+            self.log_level = "INFO"
+            self.start_logger()
             
             # 使用 PIL 打开PNG图片
             image = Image.open(self.resource_path('PMCL.png'))
@@ -62,6 +73,49 @@ class MinecraftLauncherGUI:
             self.java_path = None
             self.skin_path = None
             self.memory = None
+            self.jvm_profiles = {}
+            self.download_threads = 8
+            self.use_shared_store = True
+            self.max_downloads = 16
+            self.max_downloads_per_host = 8
+            self.download_speed_limit = 0
+
+            # 下载队列
+            self.download_condition = threading.Condition()
+            self.download_transfers = {}
+            self.download_counter = 0
+            self.download_active = 0
+            self.download_host_active = {}
+            self.downloads_paused = False
+            self.bandwidth_lock = threading.Lock()
+            self.bandwidth_tokens = 0.0
+            self.bandwidth_time = time.monotonic()
+
+            # 共享存储索引
+            self.store_index = None
+            self.store_lock = threading.Lock()
+            self.store_object_locks = {}
+
+            # HTTP连接池
+            self.http_pool = {}
+            self.http_pool_lock = threading.Lock()
+
+            # Java运行时索引
+            self.java_runtimes = None
+            self.java_runtimes_lock = threading.Lock()
+
+            # 元数据缓存
+            self.metadata_cache = {}
+            self.metadata_lock = threading.Lock()
+            self.metadata_refreshing = set()
+            self.forge_index = None
+
+            # 游戏日志会话
+            self.game_sessions = collections.OrderedDict()
+            self.game_sessions_lock = threading.Lock()
+
+            # 启动耗时记录
+            self.launch_history_lock = threading.Lock()
 
             # 启动器配置文件
             if not os.path.exists(f'{self.minecraft_directory}'):
@@ -136,6 +190,7 @@ class MinecraftLauncherGUI:
         except Exception as e:
             messagebox.showerror("错误", f"程序初始化失败: {e}")
             self.log(f"程序初始化失败: {e}", "ERROR")
+            self.stop_logger()
             sys.exit(-1)
 
     def resource_path(self, relative_path):
@@ -148,16 +203,217 @@ class MinecraftLauncherGUI:
 
         return os.path.join(base_path, relative_path)
 
+    # HTTP客户端
+    HTTP_USER_AGENT = 'PMCL/1.2 (Python Minecraft Launcher)'
+    HTTP_MAX_IDLE_CONNECTIONS = 16
+
+    def get_http_connection(self, scheme, host, port, timeout):
+        """从连接池中取出一个连接，没有空闲连接时新建，返回(连接池键, 连接, 是否复用, 是否使用HTTP代理)"""
+        import http.client
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and urllib.request.proxy_bypass(host):
+            proxy = None
+        key = (scheme, host, port, proxy)
+
+        with self.http_pool_lock:
+            idle_connections = self.http_pool.get(key)
+            if idle_connections:
+                connection = idle_connections.pop()
+                connection.timeout = timeout
+                if connection.sock:
+                    connection.sock.settimeout(timeout)
+                return key, connection, True, proxy and scheme == 'http'
+
+        if proxy:
+            proxy_url = urllib.parse.urlsplit(proxy if '://' in proxy else f'http://{proxy}')
+            if scheme == 'https':
+                connection = http.client.HTTPSConnection(proxy_url.hostname, proxy_url.port or 80, timeout=timeout)
+                connection.set_tunnel(host, port)
+            else:
+                connection = http.client.HTTPConnection(proxy_url.hostname, proxy_url.port or 80, timeout=timeout)
+        elif scheme == 'https':
+            connection = http.client.HTTPSConnection(host, port, timeout=timeout)
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        return key, connection, False, proxy and scheme == 'http'
+
+    def release_http_connection(self, key, connection, response):
+        """请求结束后将连接放回连接池"""
+        # 只有响应已经读完且服务器允许保持连接时才能复用
+        if response is not None and response.isclosed() and not response.will_close:
+            with self.http_pool_lock:
+                idle_connections = self.http_pool.setdefault(key, [])
+                if len(idle_connections) < self.HTTP_MAX_IDLE_CONNECTIONS:
+                    idle_connections.append(connection)
+                    return
+        connection.close()
+
+    @contextlib.contextmanager
+    def http_open(self, url, data=None, headers=None, method=None, timeout=30, retries=3):
+        """发送HTTP请求并返回响应，复用同一主机的连接，自动重试和跟随重定向，4xx/5xx时抛出HTTPError"""
+        import http.client
+        request_headers = {'User-Agent': self.HTTP_USER_AGENT}
+        request_headers.update(headers or {})
+        method = method or ('POST' if data is not None else 'GET')
+        idempotent = method in ('GET', 'HEAD')
+
+        redirects = 0
+        attempt = 0
+        while True:
+            url_parts = urllib.parse.urlsplit(url)
+            scheme = url_parts.scheme.lower()
+            if scheme not in ('http', 'https'):
+                raise ValueError(f"不支持的URL: {url}")
+            port = url_parts.port or (443 if scheme == 'https' else 80)
+            path = url_parts.path or '/'
+            if url_parts.query:
+                path += '?' + url_parts.query
+
+            key, connection, reused, absolute_path = self.get_http_connection(scheme, url_parts.hostname, port, timeout)
+            response = None
+            sent = False
+            try:
+                connection.request(method, url if absolute_path else path, body=data, headers=request_headers)
+                sent = True
+                response = connection.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                # 复用的连接可能已被服务器关闭，请求未发出或请求幂等时直接重试；其他错误只对幂等请求重试
+                if reused and (idempotent or (not sent and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)))):
+                    continue
+                if not idempotent or attempt >= retries - 1:
+                    raise urllib.error.URLError(e)
+                time.sleep(min(2 ** attempt, 10))
+                attempt += 1
+                continue
+
+            # 跟随重定向
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                response.read()
+                self.release_http_connection(key, connection, response)
+                redirects += 1
+                if redirects > 10:
+                    raise urllib.error.HTTPError(url, response.status, "重定向次数过多", response.headers, None)
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+                    method = 'GET'
+                    data = None
+                    idempotent = True
+                continue
+
+            # 服务器错误和限流可以重试
+            if response.status >= 400:
+                body = response.read()
+                self.release_http_connection(key, connection, response)
+                if idempotent and (response.status >= 500 or response.status == 429) and attempt < retries - 1:
+                    retry_after = response.getheader('Retry-After')
+                    time.sleep(min(int(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt, 10))
+                    attempt += 1
+                    continue
+                import io
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+
+            try:
+                yield response
+            finally:
+                self.release_http_connection(key, connection, response)
+            return
+
+    def http_request(self, url, data=None, headers=None, method=None, timeout=30, retries=3):
+        """发送HTTP请求并返回完整的响应内容"""
+        request_headers = {'Accept-Encoding': 'gzip'}
+        request_headers.update(headers or {})
+        with self.http_open(url, data, request_headers, method, timeout, retries) as response:
+            body = response.read()
+            if response.getheader('Content-Encoding') == 'gzip':
+                import gzip
+                body = gzip.decompress(body)
+            return body
+
+    # Modrinth API
+    MODRINTH_API = 'https://api.modrinth.com/v2'
+    MODRINTH_BATCH_SIZE = 100
+
+    def modrinth_request(self, path, params=None, data=None):
+        """请求Modrinth API并返回解析后的JSON，data不为None时以POST发送"""
+        url = f'{self.MODRINTH_API}{path}'
+        if params:
+            url += '?' + urllib.parse.urlencode({key: value if isinstance(value, str) else json.dumps(value, separators=(',', ':')) for key, value in params.items()})
+        if data is not None:
+            return json.loads(self.http_request(url, data=json.dumps(data).encode('utf-8'), headers={'Content-Type': 'application/json'}).decode())
+        return json.loads(self.http_request(url).decode())
+
+    def get_modrinth_projects(self, project_ids):
+        """批量获取项目信息，返回{项目ID或slug: 项目}"""
+        projects = {}
+        project_ids = list(dict.fromkeys(project_ids))
+        for i in range(0, len(project_ids), self.MODRINTH_BATCH_SIZE):
+            for project in self.modrinth_request('/projects', {'ids': project_ids[i:i + self.MODRINTH_BATCH_SIZE]}):
+                projects[project['id']] = project
+                if project.get('slug'):
+                    projects[project['slug']] = project
+        return projects
+
+    def get_modrinth_versions(self, version_ids):
+        """批量获取版本信息，返回{版本ID: 版本}"""
+        versions = {}
+        version_ids = list(dict.fromkeys(version_ids))
+        for i in range(0, len(version_ids), self.MODRINTH_BATCH_SIZE):
+            for version in self.modrinth_request('/versions', {'ids': version_ids[i:i + self.MODRINTH_BATCH_SIZE]}):
+                versions[version['id']] = version
+        return versions
+
+    def get_modrinth_versions_by_hash(self, hashes, algorithm='sha1'):
+        """根据文件哈希批量查找版本，返回{哈希: 版本}"""
+        versions = {}
+        hashes = list(dict.fromkeys(hashes))
+        for i in range(0, len(hashes), self.MODRINTH_BATCH_SIZE):
+            versions.update(self.modrinth_request('/version_files', data={'hashes': hashes[i:i + self.MODRINTH_BATCH_SIZE], 'algorithm': algorithm}))
+        return versions
+
+    def get_modrinth_updates_by_hash(self, hashes, loaders, game_versions, algorithm='sha1'):
+        """根据文件哈希批量查找符合加载器和游戏版本的最新版本，返回{哈希: 版本}"""
+        versions = {}
+        hashes = list(dict.fromkeys(hashes))
+        for i in range(0, len(hashes), self.MODRINTH_BATCH_SIZE):
+            versions.update(self.modrinth_request('/version_files/update', data={
+                'hashes': hashes[i:i + self.MODRINTH_BATCH_SIZE],
+                'algorithm': algorithm,
+                'loaders': loaders,
+                'game_versions': game_versions
+            }))
+        return versions
+
+    def get_modrinth_project_versions(self, project_ids, loaders=None, game_versions=None):
+        """并发获取多个项目符合条件的版本列表（从新到旧），返回{项目ID: [版本]}"""
+        params = {}
+        if loaders:
+            params['loaders'] = loaders
+        if game_versions:
+            params['game_versions'] = game_versions
+
+        project_ids = list(dict.fromkeys(project_ids))
+        if not project_ids:
+            return {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.download_threads, len(project_ids))) as executor:
+            futures = {project_id: executor.submit(self.modrinth_request, f'/project/{project_id}/version', params) for project_id in project_ids}
+            return {project_id: future.result() for project_id, future in futures.items()}
+
+    def get_primary_file(self, version):
+        """获取版本的主文件"""
+        files = version.get('files', [])
+        for file_info in files:
+            if file_info.get('primary'):
+                return file_info
+        return files[0] if files else None
+
     def get_from_server(self, url):
         """从PMCL服务器获取文件"""
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
         }
-        req = urllib.request.Request(url, headers=headers)
-    
         try:
-            with urllib.request.urlopen(req) as response:
-                data = response.read()
+            data = self.http_request(url, headers=headers)
             
             # 返回获取到的数据
             return data
@@ -165,6 +421,1084 @@ class MinecraftLauncherGUI:
             self.log(f"请求失败: {e}", "ERROR")
             messagebox.showerror("错误", f"请求失败: {e}")
 
+    def download_file(self, url, save_path, progress_callback=None, hashes=None, size=None, headers=None, transfer=None):
+        """下载单个文件到指定路径，先写入.part文件，中断后再次调用时断点续传，校验通过后才放到目标路径"""
+        # 没有传入下载队列中的传输时单独登记
+        if transfer is None:
+            transfer = self.register_download(os.path.basename(save_path), url)
+            try:
+                return self.download_file(url, save_path, progress_callback, hashes, size, headers, transfer)
+            finally:
+                self.unregister_download(transfer)
+
+        part_path = f"{save_path}.part"
+        journal_path = f"{part_path}.json"
+
+        # 读取未完成下载的记录，期望的文件不同时重新下载
+        journal = None
+        if os.path.isfile(part_path) and os.path.isfile(journal_path):
+            try:
+                with open(journal_path, 'r', encoding='utf-8') as f:
+                    journal = json.load(f)
+            except Exception:
+                journal = None
+            if journal and (journal.get('size') != size or journal.get('hashes') != (hashes or None) or (not hashes and journal.get('url') != url)):
+                journal = None
+
+        offset = os.path.getsize(part_path) if journal else 0
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers['Range'] = f'bytes={offset}-'
+            # 服务器上的文件改变时返回完整文件
+            if journal.get('etag') or journal.get('last_modified'):
+                request_headers['If-Range'] = journal.get('etag') or journal.get('last_modified')
+
+        try:
+            with self.download_slot(transfer, url), self.http_open(url, headers=request_headers) as response:
+                if response.status == 206:
+                    total_size = offset + int(response.getheader('Content-Length', '0'))
+                    content_range = response.getheader('Content-Range', '')
+                    if '/' in content_range and content_range.rsplit('/', 1)[1].isdigit():
+                        total_size = int(content_range.rsplit('/', 1)[1])
+                    mode = 'ab'
+                else:
+                    total_size = int(response.getheader('Content-Length', '0'))
+                    offset = 0
+                    mode = 'wb'
+
+                # 记录下载信息以便续传
+                with open(journal_path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'url': url,
+                        'size': size,
+                        'hashes': hashes or None,
+                        'etag': response.getheader('ETag'),
+                        'last_modified': response.getheader('Last-Modified')
+                    }, f)
+
+                downloaded = offset
+                transfer['downloaded'] = downloaded
+                transfer['total'] = total_size
+                with open(part_path, mode) as f:
+                    while True:
+                        self.check_download_state(transfer)
+                        chunk = response.read(65536)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        transfer['downloaded'] = downloaded
+                        self.throttle_download(len(chunk))
+                        if progress_callback:
+                            progress_callback(downloaded, total_size)
+        except urllib.error.HTTPError as e:
+            if not (e.code == 416 and offset):
+                raise
+            # 416表示续传的起点已在文件末尾之后，Content-Range中是服务器上文件的大小
+            content_range = e.headers.get('Content-Range', '') if e.headers else ''
+            remote_size = int(content_range.rsplit('/', 1)[1]) if '/' in content_range and content_range.rsplit('/', 1)[1].isdigit() else None
+            expected_size = size or remote_size
+            # 大小一致，或者大小未知但可以校验哈希时，认为.part文件已经下载完整，否则删除后重新下载
+            if not (expected_size == offset or (expected_size is None and hashes)):
+                for path in (part_path, journal_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise Exception("无法续传，已删除未完成的文件，将重新下载")
+            total_size = downloaded = offset
+
+        # 被截断的下载保留.part文件，下次继续
+        if total_size and downloaded != total_size:
+            raise Exception(f"下载不完整 ({downloaded}/{total_size} 字节)")
+
+        # 校验失败的文件不能续传
+        if self.verify_file(part_path, hashes, size) is False:
+            for path in (part_path, journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise Exception("文件校验失败")
+
+        os.replace(part_path, save_path)
+        os.remove(journal_path)
+
+    # 下载队列
+    def register_download(self, name, url):
+        """在下载队列中登记一个传输，返回传输记录"""
+        with self.download_condition:
+            self.download_counter += 1
+            transfer = {
+                'id': self.download_counter,
+                'name': name,
+                'host': urllib.parse.urlsplit(url).hostname or '',
+                'state': 'queued',
+                'downloaded': 0,
+                'total': 0,
+                'paused': False,
+                'cancelled': False
+            }
+            self.download_transfers[transfer['id']] = transfer
+            self.download_condition.notify_all()
+        return transfer
+
+    def unregister_download(self, transfer):
+        """从下载队列中移除传输"""
+        with self.download_condition:
+            self.download_transfers.pop(transfer['id'], None)
+
+    @contextlib.contextmanager
+    def download_slot(self, transfer, url):
+        """等待全局和单个服务器的下载名额，暂停时不占用名额"""
+        host = urllib.parse.urlsplit(url).hostname or ''
+        with self.download_condition:
+            transfer['host'] = host
+            while True:
+                if transfer['cancelled']:
+                    raise Exception("下载已取消")
+                if self.downloads_paused or transfer['paused']:
+                    transfer['state'] = 'paused'
+                elif self.download_active < self.max_downloads and self.download_host_active.get(host, 0) < self.max_downloads_per_host:
+                    break
+                else:
+                    transfer['state'] = 'queued'
+                self.download_condition.wait()
+            self.download_active += 1
+            self.download_host_active[host] = self.download_host_active.get(host, 0) + 1
+            transfer['state'] = 'active'
+        try:
+            yield
+        finally:
+            with self.download_condition:
+                self.download_active -= 1
+                self.download_host_active[host] -= 1
+                if not self.download_host_active[host]:
+                    del self.download_host_active[host]
+                if transfer['state'] == 'active':
+                    transfer['state'] = 'queued'
+                self.download_condition.notify_all()
+
+    def check_download_state(self, transfer):
+        """传输过程中处理暂停和取消"""
+        if not (self.downloads_paused or transfer['paused'] or transfer['cancelled']):
+            return
+        with self.download_condition:
+            while (self.downloads_paused or transfer['paused']) and not transfer['cancelled']:
+                transfer['state'] = 'paused'
+                self.download_condition.wait()
+            if transfer['cancelled']:
+                raise Exception("下载已取消")
+            transfer['state'] = 'active'
+
+    def throttle_download(self, size):
+        """按全局限速（令牌桶）等待，使所有下载的总速度不超过限制"""
+        limit = self.download_speed_limit * 1024
+        if not limit:
+            return
+        with self.bandwidth_lock:
+            now = time.monotonic()
+            # 最多积累一秒的令牌
+            self.bandwidth_tokens = min(limit, self.bandwidth_tokens + (now - self.bandwidth_time) * limit)
+            self.bandwidth_time = now
+            self.bandwidth_tokens -= size
+            delay = -self.bandwidth_tokens / limit if self.bandwidth_tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+    def set_downloads_paused(self, transfer_ids, paused):
+        """暂停或继续传输，transfer_ids为None时作用于全部下载"""
+        with self.download_condition:
+            if transfer_ids is None:
+                self.downloads_paused = paused
+                if not paused:
+                    for transfer in self.download_transfers.values():
+                        transfer['paused'] = False
+            else:
+                for transfer_id in transfer_ids:
+                    if transfer_id in self.download_transfers:
+                        self.download_transfers[transfer_id]['paused'] = paused
+            self.download_condition.notify_all()
+
+    def cancel_downloads(self, transfer_ids=None):
+        """取消传输，transfer_ids为None时取消全部下载"""
+        with self.download_condition:
+            for transfer_id, transfer in self.download_transfers.items():
+                if transfer_ids is None or transfer_id in transfer_ids:
+                    transfer['cancelled'] = True
+                    transfer['state'] = 'cancelled'
+            self.download_condition.notify_all()
+
+    def create_download_manager_widgets(self):
+        """创建下载管理窗口"""
+        if getattr(self, 'download_manager_window', None) and self.download_manager_window.winfo_exists():
+            self.download_manager_window.lift()
+            return
+
+        self.download_manager_window = tk.Toplevel(self.root)
+        self.download_manager_window.title("下载管理")
+        self.download_manager_window.geometry(f"700x450+{int((self.root.winfo_screenwidth()-700)/2)}+{int((self.root.winfo_screenheight()-450)/2)}")
+        self.download_manager_window.resizable(False, False)
+
+        # 下载管理窗口主框架
+        download_manager_main_frame = ttk.Frame(self.download_manager_window, padding="10")
+        download_manager_main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 标题
+        title_label = ttk.Label(download_manager_main_frame, text="下载管理", font=("微软雅黑", 18))
+        title_label.pack(pady=(0, 10))
+
+        # 汇总信息
+        summary_label = ttk.Label(download_manager_main_frame, text="")
+        summary_label.pack(fill=tk.X, pady=(0, 5))
+
+        # 传输列表
+        transfer_list_frame = ttk.Frame(download_manager_main_frame)
+        transfer_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+
+        columns = ('name', 'host', 'state', 'progress')
+        transfers_tree = ttk.Treeview(transfer_list_frame, columns=columns, show='headings', height=12, selectmode='extended')
+        transfers_tree.heading('name', text='文件')
+        transfers_tree.heading('host', text='服务器')
+        transfers_tree.heading('state', text='状态')
+        transfers_tree.heading('progress', text='进度')
+        transfers_tree.column('name', width=250)
+        transfers_tree.column('host', width=170)
+        transfers_tree.column('state', width=70)
+        transfers_tree.column('progress', width=170)
+
+        transfers_scrollbar = ttk.Scrollbar(transfer_list_frame, orient=tk.VERTICAL, command=transfers_tree.yview)
+        transfers_tree.configure(yscrollcommand=transfers_scrollbar.set)
+        transfers_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        transfers_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        def selected_ids():
+            """获取选中的传输，未选中时返回None（作用于全部下载）"""
+            selection = transfers_tree.selection()
+            return [int(item) for item in selection] if selection else None
+
+        # 按钮框架
+        button_frame = ttk.Frame(download_manager_main_frame)
+        button_frame.pack(fill=tk.X)
+
+        ttk.Button(button_frame, text="暂停", command=lambda: self.set_downloads_paused(selected_ids(), True)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="继续", command=lambda: self.set_downloads_paused(selected_ids(), False)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="取消", command=lambda: self.cancel_downloads(selected_ids())).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Label(button_frame, text="提示：未选择时操作全部下载！").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="关闭", command=self.download_manager_window.destroy).pack(side=tk.RIGHT)
+
+        state_names = {'queued': '等待中', 'active': '下载中', 'paused': '已暂停', 'cancelled': '已取消'}
+        last_total = [None, time.monotonic()]
+
+        def refresh():
+            """定时刷新传输列表"""
+            if not transfers_tree.winfo_exists():
+                return
+            with self.download_condition:
+                transfers = [dict(transfer) for transfer in self.download_transfers.values()]
+                paused = self.downloads_paused
+
+            # 更新列表，保留选中状态
+            items = set(transfers_tree.get_children())
+            for transfer in transfers:
+                item = str(transfer['id'])
+                progress = self.format_file_size(transfer['downloaded'])
+                if transfer['total']:
+                    progress += f"/{self.format_file_size(transfer['total'])} {transfer['downloaded'] / transfer['total'] * 100:.1f}%"
+                values = (transfer['name'], transfer['host'], state_names.get(transfer['state'], transfer['state']), progress)
+                if item in items:
+                    transfers_tree.item(item, values=values)
+                    items.discard(item)
+                else:
+                    transfers_tree.insert('', tk.END, iid=item, values=values)
+            if items:
+                transfers_tree.delete(*items)
+
+            # 计算总速度
+            now = time.monotonic()
+            total_downloaded = sum(transfer['downloaded'] for transfer in transfers)
+            speed = max(0, total_downloaded - last_total[0]) / (now - last_total[1]) if last_total[0] is not None and now > last_total[1] else 0
+            last_total[0], last_total[1] = total_downloaded, now
+
+            active = sum(1 for transfer in transfers if transfer['state'] == 'active')
+            queued = sum(1 for transfer in transfers if transfer['state'] == 'queued')
+            summary = f"下载中 {active} 个，等待中 {queued} 个，速度 {self.format_file_size(speed)}/s"
+            if self.download_speed_limit:
+                summary += f"（限速 {self.download_speed_limit} KB/s）"
+            if paused:
+                summary += "，已全部暂停"
+            summary_label.config(text=summary)
+            self.download_manager_window.after(500, refresh)
+
+        refresh()
+
+    def hash_file(self, file_path, algorithm):
+        """流式计算文件的哈希值"""
+        hasher = hashlib.new(algorithm)
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def verify_file(self, file_path, hashes=None, size=None):
+        """校验文件的大小和哈希值，没有可校验的信息时返回None"""
+        hashes = hashes or {}
+        if size is None and not hashes:
+            return None
+        if not os.path.isfile(file_path):
+            return False
+
+        # 先比较大小，不一致时无需计算哈希
+        if size is not None and os.path.getsize(file_path) != int(size):
+            return False
+
+        for algorithm in ('sha1', 'sha512'):
+            if hashes.get(algorithm):
+                return self.hash_file(file_path, algorithm) == hashes[algorithm].lower()
+        return True
+
+    def download_files(self, tasks, log_func, max_workers=None, retries=3):
+        """使用线程池并发下载文件列表，返回下载失败的任务列表"""
+        # tasks中的每一项: {'urls': 下载地址列表, 'path': 保存路径, 'name': 显示名称,
+        #                   'hashes': {'sha1': ..., 'sha512': ...}（可选）, 'size': 文件大小（可选）,
+        #                   'store': 是否放入共享存储（可选，需要sha1）}
+        # 已存在且校验通过的文件会被跳过，失败或校验不通过的文件会轮换下载地址重试
+        if not tasks:
+            return []
+
+        if max_workers is None:
+            max_workers = self.download_threads
+        try:
+            max_workers = max(1, int(max_workers))
+        except (TypeError, ValueError):
+            max_workers = 8
+
+        # 在写入共享存储对象之前加载索引，第一次使用时不会因为已有对象而被认为索引丢失
+        if any(task.get('store') for task in tasks) and self.use_shared_store:
+            with self.store_lock:
+                self.load_store_index()
+
+        total = len(tasks)
+
+        def make_progress_callback():
+            """只有一个文件时按字节报告进度"""
+            last_percent = [-1]
+            def progress_callback(downloaded, total_size):
+                if total_size:
+                    percent = min(100, int(downloaded * 100 / total_size))
+                    if percent != last_percent[0]:
+                        last_percent[0] = percent
+                        log_func(f"下载进度: {percent}%", "INFO")
+            return progress_callback
+
+        def download_task(task):
+            """下载一个任务，返回(是否跳过, 最后一次的错误)"""
+            sha1 = (task.get('hashes') or {}).get('sha1')
+            if task.get('store') and sha1 and self.use_shared_store:
+                # 同一个共享存储对象同时只由一个任务处理
+                with self.get_store_object_lock(sha1):
+                    return download_task_locked(task, self.get_store_object_path(sha1))
+            return download_task_locked(task, None)
+
+        def download_task_locked(task, object_path):
+            """下载一个任务（object_path为共享存储对象路径）"""
+            hashes = task.get('hashes') or {}
+            size = task.get('size')
+            sha1 = hashes.get('sha1')
+
+            # 已存在且完整的文件无需重新下载
+            if self.verify_file(task['path'], hashes, size):
+                if object_path:
+                    self.adopt_store_object(task['path'], sha1, size)
+                return True, None
+
+            save_dir = os.path.dirname(task['path'])
+            if save_dir:
+                os.makedirs(save_dir, exist_ok=True)
+
+            # 共享存储中已有完整的文件时直接链接，否则下载到共享存储
+            if not (object_path and self.verify_file(object_path, hashes, size)):
+                urls = task.get('urls', [])
+                if not urls:
+                    return False, Exception("没有可用的下载地址")
+
+                if object_path:
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    # 校验通过后才会出现在共享存储中
+                    download_path = object_path
+                else:
+                    download_path = task['path']
+
+                error = None
+                transfer = self.register_download(task.get('name', os.path.basename(task['path'])), urls[0])
+                try:
+                    for attempt in range(retries):
+                        url = urls[attempt % len(urls)]
+                        try:
+                            self.download_file(url, download_path, make_progress_callback() if total == 1 else None, hashes, size, transfer=transfer)
+                            error = None
+                            break
+                        except Exception as e:
+                            error = e
+                            # 已取消的下载不再重试
+                            if transfer['cancelled']:
+                                break
+                            if attempt + 1 < retries:
+                                time.sleep(min(2 ** attempt, 10))
+                finally:
+                    self.unregister_download(transfer)
+
+                if error:
+                    # 下载写入 .part 文件，目标文件仍是原来的完整文件，不能删除
+                    return False, error
+
+            if object_path:
+                try:
+                    mode = self.link_file(object_path, task['path'])
+                    self.add_store_ref(sha1, size, task['path'], mode)
+                except Exception as e:
+                    return False, e
+            return False, None
+
+        failed_tasks = []
+        finished = 0
+        skipped = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, total)) as executor:
+            futures = {executor.submit(download_task, task): task for task in tasks}
+            # 在调用线程中汇总进度
+            for future in concurrent.futures.as_completed(futures):
+                task = futures[future]
+                name = task.get('name', os.path.basename(task['path']))
+                is_skipped, error = future.result()
+                finished += 1
+                if error:
+                    failed_tasks.append(task)
+                    log_func(f"下载 {name} 失败: {str(error)}", "ERROR")
+                elif is_skipped:
+                    skipped += 1
+                elif total > 1:
+                    log_func(f"已下载: {name}", "INFO")
+                if total > 1:
+                    log_func(f"进度：{finished}/{total} {finished / total * 100:.1f}%", "INFO")
+
+        if skipped:
+            log_func(f"{skipped} 个文件已存在且校验通过，已跳过", "INFO")
+
+        if any(task.get('store') for task in tasks):
+            self.save_store_index()
+
+        return failed_tasks
+
+    # 共享存储
+    def get_store_object_path(self, sha1):
+        """获取共享存储中对象的路径"""
+        return f"{self.minecraft_directory}/pmcl_store/objects/{sha1[:2]}/{sha1}"
+
+    def get_store_object_lock(self, sha1):
+        """获取共享存储对象的锁"""
+        with self.store_lock:
+            if sha1 not in self.store_object_locks:
+                self.store_object_locks[sha1] = threading.Lock()
+            return self.store_object_locks[sha1]
+
+    def load_store_index(self):
+        """加载共享存储索引（调用者需持有store_lock）"""
+        if self.store_index is None:
+            try:
+                with open(f"{self.minecraft_directory}/pmcl_store/index.json", "r", encoding="utf-8") as f:
+                    self.store_index = json.load(f)
+            except FileNotFoundError:
+                # 没有索引但已有对象时，索引中缺少的对象可能仍在使用
+                self.store_index = {"objects": {}, "incomplete": os.path.isdir(f"{self.minecraft_directory}/pmcl_store/objects")}
+            except (OSError, ValueError) as e:
+                self.log(f"读取共享存储索引失败: {str(e)}", "WARN")
+                self.store_index = {"objects": {}, "incomplete": True}
+        return self.store_index
+
+    def save_store_index(self):
+        """保存共享存储索引"""
+        with self.store_lock:
+            if self.store_index is None:
+                return
+            index_file = f"{self.minecraft_directory}/pmcl_store/index.json"
+            os.makedirs(os.path.dirname(index_file), exist_ok=True)
+            with open(f"{index_file}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.store_index, f)
+            os.replace(f"{index_file}.tmp", index_file)
+
+    def add_store_ref(self, sha1, size, path, mode):
+        """记录实例文件对共享存储对象的引用"""
+        with self.store_lock:
+            objects = self.load_store_index()["objects"]
+            entry = objects.setdefault(sha1, {"size": size, "refs": {}})
+            entry["refs"][os.path.abspath(path)] = mode
+
+    def move_store_ref(self, old_path, new_path):
+        """文件被重命名后将共享存储中的引用改为新的路径，返回是否有引用被修改"""
+        old_path = os.path.abspath(old_path)
+        moved = False
+        with self.store_lock:
+            for entry in self.load_store_index()["objects"].values():
+                if old_path in entry["refs"]:
+                    entry["refs"][os.path.abspath(new_path)] = entry["refs"].pop(old_path)
+                    moved = True
+        return moved
+
+    def adopt_store_object(self, path, sha1, size):
+        """将已存在的完整文件加入共享存储"""
+        object_path = self.get_store_object_path(sha1)
+        try:
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.link(path, object_path)
+            if os.path.samefile(path, object_path):
+                self.add_store_ref(sha1, size, path, 'link')
+        except (OSError, AttributeError):
+            # 文件系统不支持硬链接时不加入共享存储
+            pass
+
+    def reflink_file(self, src, dst):
+        """在支持写时复制的文件系统上克隆文件"""
+        import fcntl
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            try:
+                # FICLONE
+                fcntl.ioctl(dst_file.fileno(), 0x40049409, src_file.fileno())
+            except OSError:
+                dst_file.close()
+                os.remove(dst)
+                raise
+        import shutil
+        shutil.copystat(src, dst)
+
+    def link_file(self, src, dst):
+        """将文件硬链接到目标路径，不支持时依次尝试reflink和复制，返回使用的方式"""
+        import shutil
+        if os.path.lexists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+            return 'link'
+        except (OSError, AttributeError):
+            pass
+        try:
+            self.reflink_file(src, dst)
+            return 'reflink'
+        except (OSError, ImportError):
+            pass
+        shutil.copy2(src, dst)
+        return 'copy'
+
+    # 未记录在索引中的对象至少保留一天，避免删除正在下载、尚未记录引用的对象
+    STORE_GC_GRACE = 24 * 3600
+
+    def gc_store(self):
+        """清理共享存储中不再被引用的对象，返回(删除的对象数, 释放的字节数)"""
+        removed_count = 0
+        freed_size = 0
+        objects_dir = f"{self.minecraft_directory}/pmcl_store/objects"
+        with self.store_lock:
+            index = self.load_store_index()
+            objects = index["objects"]
+            tracked = set(objects)
+
+        # 查找索引中没有记录的对象，索引不完整时无法判断对象是否仍在使用
+        untracked = []
+        if index.get("incomplete"):
+            self.log("共享存储索引不完整，跳过清理未记录的对象", "WARN")
+        elif os.path.isdir(objects_dir):
+            now = time.time()
+            for root, dirs, files in os.walk(objects_dir):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    try:
+                        age = now - os.path.getmtime(file_path)
+                    except OSError:
+                        continue
+                    # 保留一周内未完成的下载
+                    if file.endswith(('.tmp', '.part', '.part.json')) and age < 7 * 24 * 3600:
+                        continue
+                    if file not in tracked and age >= self.STORE_GC_GRACE:
+                        untracked.append((file, file_path))
+
+        # 与下载使用相同的对象锁，先获取对象锁再获取store_lock
+        for sha1 in tracked:
+            with self.get_store_object_lock(sha1), self.store_lock:
+                entry = objects.get(sha1)
+                if entry is None:
+                    continue
+                object_path = self.get_store_object_path(sha1)
+
+                # 只保留仍然有效的引用
+                refs = {}
+                for path, mode in entry.get("refs", {}).items():
+                    try:
+                        if mode == 'link':
+                            valid = os.path.samefile(path, object_path)
+                        else:
+                            valid = os.path.getsize(path) == entry.get("size")
+                    except OSError:
+                        valid = False
+                    if valid:
+                        refs[path] = mode
+                entry["refs"] = refs
+
+                if not refs:
+                    try:
+                        if os.path.isfile(object_path):
+                            size = os.path.getsize(object_path)
+                            os.remove(object_path)
+                            freed_size += size
+                    except OSError as e:
+                        self.log(f"删除 {object_path} 失败: {str(e)}", "WARN")
+                        continue
+                    del objects[sha1]
+                    removed_count += 1
+
+        for file, file_path in untracked:
+            with self.get_store_object_lock(file.split('.')[0]), self.store_lock:
+                if file in objects:
+                    continue
+                try:
+                    size = os.path.getsize(file_path)
+                    os.remove(file_path)
+                except OSError as e:
+                    self.log(f"删除 {file_path} 失败: {str(e)}", "WARN")
+                    continue
+                freed_size += size
+                removed_count += 1
+
+        self.save_store_index()
+        return removed_count, freed_size
+
+    def clean_store(self):
+        """清理共享存储"""
+        def _clean_store_thread():
+            try:
+                self.log("正在清理共享存储...", "INFO")
+                removed_count, freed_size = self.gc_store()
+                self.log(f"共享存储清理完成，删除了 {removed_count} 个文件，释放了 {self.format_file_size(freed_size)}", "INFO")
+                self.root.after(0, lambda: messagebox.showinfo("成功", f"共享存储清理完成，释放了 {self.format_file_size(freed_size)}"))
+            except Exception as e:
+                self.log(f"清理共享存储失败: {str(e)}", "ERROR")
+                self.root.after(0, lambda error=str(e): messagebox.showerror("错误", f"清理共享存储失败: {error}"))
+
+        clean_store_thread = threading.Thread(target=_clean_store_thread)
+        clean_store_thread.daemon = True
+        clean_store_thread.start()
+
+    # Java运行时索引
+    def get_java_search_roots(self):
+        """返回用于查找Java的目录列表"""
+        roots = [os.path.join(self.minecraft_directory, 'runtime')]
+        if os.environ.get('JAVA_HOME'):
+            roots.append(os.environ['JAVA_HOME'])
+
+        # PATH中的java
+        import shutil
+        path_java = shutil.which('java')
+        if path_java:
+            roots.append(os.path.dirname(os.path.dirname(os.path.realpath(path_java))))
+
+        # 常见的JDK安装目录
+        system = platform.system().lower()
+        if system == 'windows':
+            for env_name in ('ProgramFiles', 'ProgramFiles(x86)'):
+                program_files = os.environ.get(env_name)
+                if program_files:
+                    for vendor in ('Java', 'Eclipse Adoptium', 'Eclipse Foundation', 'Zulu', 'Microsoft', 'BellSoft', 'Amazon Corretto'):
+                        roots.append(os.path.join(program_files, vendor))
+        elif system == 'darwin':
+            roots.extend(['/Library/Java/JavaVirtualMachines', os.path.expanduser('~/Library/Java/JavaVirtualMachines')])
+        else:
+            roots.extend(['/usr/lib/jvm', '/usr/java', '/opt/java', '/opt/jdk'])
+        roots.append(os.path.expanduser('~/.jdks'))
+
+        # 去重并保持顺序
+        result = []
+        for root in roots:
+            root = os.path.normpath(root)
+            if root not in result:
+                result.append(root)
+        return result
+
+    def get_java_root_mtimes(self, roots):
+        """获取查找目录的修改时间，用于判断缓存是否失效"""
+        mtimes = {}
+        for root in roots:
+            try:
+                mtimes[root] = os.stat(root).st_mtime
+            except OSError:
+                mtimes[root] = None
+        return mtimes
+
+    def read_java_release(self, java_home):
+        """读取Java目录中的release文件，返回(主版本号, 架构)"""
+        major = None
+        arch = None
+        release_path = os.path.join(java_home, 'release')
+        if os.path.isfile(release_path):
+            with open(release_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    key, _, value = line.partition('=')
+                    value = value.strip().strip('"')
+                    if key == 'JAVA_VERSION':
+                        major = self.parse_java_major(value)
+                    elif key == 'OS_ARCH':
+                        arch = value
+        else:
+            # 没有release文件时运行java -version
+            import subprocess
+            import re
+            try:
+                result = subprocess.run([self.get_java_executable(java_home), '-version'], capture_output=True, text=True, timeout=10)
+                match = re.search(r'version "([^"]+)"', result.stderr + result.stdout)
+                if match:
+                    major = self.parse_java_major(match.group(1))
+            except Exception:
+                pass
+        return major, arch
+
+    def parse_java_major(self, version):
+        """将Java版本字符串转换为主版本号，例如1.8.0_51 -> 8, 17.0.8 -> 17"""
+        parts = version.split('.')
+        try:
+            if parts[0] == '1' and len(parts) > 1:
+                return int(parts[1])
+            return int(parts[0].split('-')[0].split('+')[0])
+        except ValueError:
+            return None
+
+    def get_java_executable(self, java_home):
+        """返回Java目录中的java可执行文件路径"""
+        java_exe = 'java.exe' if platform.system().lower() == 'windows' else 'java'
+        return os.path.join(java_home, 'bin', java_exe)
+
+    def scan_java_runtimes(self, roots):
+        """在查找目录中查找Java，返回运行时列表"""
+        runtimes = []
+        found_homes = set()
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+            # 只查找有限的深度，runtime目录的结构为 <组件>/<平台>/<组件>/bin/java
+            for current, dirs, files in os.walk(root):
+                depth = os.path.relpath(current, root).count(os.sep) if current != root else 0
+                if os.path.isfile(self.get_java_executable(current)):
+                    real_home = os.path.realpath(current)
+                    if real_home not in found_homes:
+                        found_homes.add(real_home)
+                        major, arch = self.read_java_release(current)
+                        runtimes.append({
+                            'path': self.get_java_executable(current),
+                            'home': current,
+                            'major': major,
+                            'arch': arch
+                        })
+                    dirs[:] = []
+                elif depth >= 4:
+                    dirs[:] = []
+                else:
+                    # 跳过JDK内部的目录，macOS的JDK位于Contents/Home，可以在限定深度内找到
+                    dirs[:] = [d for d in dirs if d not in ('legal', 'lib', 'include', 'jmods', 'man', 'conf')]
+        return runtimes
+
+    def load_java_runtimes(self, refresh=False):
+        """加载Java运行时索引，查找目录变化时重新扫描"""
+        with self.java_runtimes_lock:
+            roots = self.get_java_search_roots()
+            mtimes = self.get_java_root_mtimes(roots)
+            cache_path = os.path.join(self.minecraft_directory, 'pmcl_java_runtimes.json')
+
+            if not refresh and self.java_runtimes is not None and self.java_runtimes.get('mtimes') == mtimes:
+                return self.java_runtimes
+
+            cache = None
+            if not refresh and os.path.exists(cache_path):
+                try:
+                    with open(cache_path, 'r', encoding='utf-8') as f:
+                        cache = json.load(f)
+                    if cache.get('mtimes') != mtimes or not all(os.path.isfile(runtime['path']) for runtime in cache.get('runtimes', [])):
+                        cache = None
+                except Exception:
+                    cache = None
+
+            if cache is None:
+                cache = {'mtimes': mtimes, 'runtimes': self.scan_java_runtimes(roots)}
+                try:
+                    with open(f"{cache_path}.tmp", 'w', encoding='utf-8') as f:
+                        json.dump(cache, f, ensure_ascii=False, indent=4)
+                    os.replace(f"{cache_path}.tmp", cache_path)
+                except OSError as e:
+                    self.log(f"保存Java索引失败: {str(e)}", "WARN")
+
+            # 按主版本号建立索引，同一版本中架构与系统一致的优先
+            machine = platform.machine().lower()
+            machine_arch = {'x86_64': 'amd64', 'amd64': 'amd64', 'aarch64': 'aarch64', 'arm64': 'aarch64'}.get(machine, machine)
+            by_major = {}
+            for runtime in cache['runtimes']:
+                if runtime['major'] is not None:
+                    by_major.setdefault(runtime['major'], []).append(runtime)
+            for major in by_major:
+                by_major[major].sort(key=lambda runtime: (runtime['arch'] or '').lower() not in (machine_arch, machine))
+            cache['by_major'] = {major: runtimes[0]['path'] for major, runtimes in by_major.items()}
+            cache['majors'] = sorted(by_major)
+
+            self.java_runtimes = cache
+            return cache
+
+    def find_java_runtime(self, major=None, refresh=False):
+        """查找最适合指定Java主版本的运行时，找不到时返回None"""
+        runtimes = self.load_java_runtimes(refresh)
+        if not runtimes['majors']:
+            return None
+        if major is None:
+            return runtimes['by_major'][runtimes['majors'][-1]]
+        if major in runtimes['by_major']:
+            return runtimes['by_major'][major]
+        # 没有完全匹配时使用更新的最低版本
+        for candidate in runtimes['majors']:
+            if candidate > major:
+                return runtimes['by_major'][candidate]
+        return None
+
+    def get_version_java_major(self, version):
+        """从版本文件中读取需要的Java主版本号"""
+        while version:
+            version_json = os.path.join(self.minecraft_directory, 'versions', version, f'{version}.json')
+            if not os.path.exists(version_json):
+                return None
+            try:
+                with open(version_json, 'r', encoding='utf-8') as f:
+                    version_data = json.load(f)
+            except Exception:
+                return None
+            if 'javaVersion' in version_data:
+                return version_data['javaVersion'].get('majorVersion')
+            version = version_data.get('inheritsFrom')
+        return None
+
+    def get_install_java_version(self, version):
+        """获取版本需要的Java（版本文件中的javaVersion），版本还未安装时从版本清单中读取"""
+        java_major = self.get_version_java_major(version)
+        if java_major is not None:
+            return {'majorVersion': java_major}
+        try:
+            for entry in self.get_minecraft_version_list():
+                if entry['id'] == version:
+                    return json.loads(self.http_request(entry['url']).decode('utf-8')).get('javaVersion', {})
+        except Exception as e:
+            self.log(f"获取 {version} 需要的Java版本失败: {str(e)}", "WARN")
+        return {}
+
+    def get_java_for_install(self, version, log_func, callback):
+        """获取安装版本使用的Java，没有时自动安装"""
+        java_version = self.get_install_java_version(version)
+        java_major = java_version.get('majorVersion')
+        java_path = self.find_java_runtime(java_major)
+        if not java_path:
+            log_func("没有检测到Java，正在安装……", "INFO")
+            # 优先安装版本指定的Java运行时
+            runtimes = minecraft_launcher_lib.runtime.get_jvm_runtimes()
+            runtime = java_version.get('component') if java_version.get('component') in runtimes else runtimes[0]
+            minecraft_launcher_lib.runtime.install_jvm_runtime(runtime, self.minecraft_directory, callback=callback)
+            java_path = self.find_java_runtime(java_major, refresh=True) or self.find_java_runtime()
+        if java_path:
+            log_func(f"使用Java: {java_path}", "INFO")
+        return java_path
+
+    # 元数据缓存
+    METADATA_TTL = 3600
+    METADATA_SOURCES = {
+        'minecraft_versions': 'https://launchermeta.mojang.com/mc/game/version_manifest_v2.json',
+        'forge_versions': 'https://maven.minecraftforge.net/net/minecraftforge/forge/maven-metadata.xml',
+        'fabric_loader_versions': 'https://meta.fabricmc.net/v2/versions/loader',
+        'fabric_game_versions': 'https://meta.fabricmc.net/v2/versions/game',
+        'quilt_loader_versions': 'https://meta.quiltmc.org/v3/versions/loader',
+        'quilt_game_versions': 'https://meta.quiltmc.org/v3/versions/game'
+    }
+
+    def fetch_metadata(self, url, etag=None, last_modified=None):
+        """请求元数据，未修改时返回None，否则返回(内容, ETag, Last-Modified)"""
+        headers = {'Accept-Encoding': 'gzip'}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        with self.http_open(url, headers=headers) as response:
+            body = response.read()
+            if response.status == 304:
+                return None
+            if response.getheader('Content-Encoding') == 'gzip':
+                import gzip
+                body = gzip.decompress(body)
+            return body.decode('utf-8'), response.getheader('ETag'), response.getheader('Last-Modified')
+
+    def parse_metadata(self, name, text):
+        """解析元数据内容"""
+        if name == 'forge_versions':
+            import xml.etree.ElementTree as ET
+            return [version.text for version in ET.fromstring(text).iter('version')]
+        data = json.loads(text)
+        if name == 'minecraft_versions':
+            return data['versions']
+        return data
+
+    def load_metadata_entry(self, name):
+        """读取磁盘上的元数据缓存，返回缓存条目或None"""
+        cache_path = os.path.join(self.minecraft_directory, 'pmcl_cache', f'{name}.json')
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            entry['data'] = self.parse_metadata(name, entry['text'])
+            return entry
+        except Exception as e:
+            self.log(f"读取元数据缓存失败: {str(e)}", "WARN")
+            return None
+
+    def save_metadata_entry(self, name, entry):
+        """将元数据缓存写入磁盘"""
+        cache_dir = os.path.join(self.minecraft_directory, 'pmcl_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, f'{name}.json')
+        with open(f'{cache_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({key: value for key, value in entry.items() if key != 'data'}, f, ensure_ascii=False)
+        os.replace(f'{cache_path}.tmp', cache_path)
+
+    def revalidate_metadata(self, name, entry=None):
+        """向服务器确认元数据是否更新，返回(新条目, 是否变化)"""
+        url = self.METADATA_SOURCES[name]
+        if entry:
+            result = self.fetch_metadata(url, entry.get('etag'), entry.get('last_modified'))
+        else:
+            result = self.fetch_metadata(url)
+
+        if result is None:
+            # 未修改，只更新时间
+            entry = dict(entry, time=time.time())
+            changed = False
+        else:
+            text, etag, last_modified = result
+            changed = not entry or entry['text'] != text
+            entry = {
+                'url': url,
+                'time': time.time(),
+                'etag': etag,
+                'last_modified': last_modified,
+                'text': text,
+                'data': entry['data'] if entry and not changed else self.parse_metadata(name, text)
+            }
+        try:
+            self.save_metadata_entry(name, entry)
+        except OSError as e:
+            self.log(f"保存元数据缓存失败: {str(e)}", "WARN")
+        return entry, changed
+
+    def get_metadata(self, name, on_update=None):
+        """获取缓存的元数据，过期时先返回旧数据并在后台刷新，数据变化后调用on_update"""
+        with self.metadata_lock:
+            entry = self.metadata_cache.get(name)
+            if entry is None:
+                entry = self.load_metadata_entry(name)
+                if entry is not None:
+                    self.metadata_cache[name] = entry
+
+            if entry is not None:
+                if time.time() - entry['time'] < self.METADATA_TTL or name in self.metadata_refreshing:
+                    return entry['data']
+                self.metadata_refreshing.add(name)
+
+        if entry is None:
+            # 没有缓存时只能等待下载
+            entry, changed = self.revalidate_metadata(name)
+            with self.metadata_lock:
+                self.metadata_cache[name] = entry
+            return entry['data']
+
+        def _refresh_metadata_thread():
+            try:
+                new_entry, changed = self.revalidate_metadata(name, entry)
+                with self.metadata_lock:
+                    self.metadata_cache[name] = new_entry
+                if changed and on_update:
+                    self.root.after(0, on_update)
+            except Exception as e:
+                self.log(f"刷新元数据失败: {str(e)}", "WARN")
+            finally:
+                with self.metadata_lock:
+                    self.metadata_refreshing.discard(name)
+
+        refresh_thread = threading.Thread(target=_refresh_metadata_thread)
+        refresh_thread.daemon = True
+        refresh_thread.start()
+        return entry['data']
+
+    def refresh_widget(self, widget, func):
+        """返回一个仅在控件仍然存在时调用func的回调，用于后台刷新后更新窗口"""
+        def _refresh():
+            try:
+                if widget.winfo_exists():
+                    func()
+            except tk.TclError:
+                pass
+        return _refresh
+
+    def call_in_main_thread(self, func, *args):
+        """在主线程中调用func（如创建窗口），阻塞当前线程直到调用结束并返回结果"""
+        future = concurrent.futures.Future()
+        def _call():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+        self.root.after(0, _call)
+        return future.result()
+
+    def get_minecraft_version_list(self, on_update=None):
+        """获取Minecraft版本列表"""
+        return self.get_metadata('minecraft_versions', on_update)
+
+    def get_forge_version_list(self, on_update=None):
+        """获取Forge版本列表"""
+        return self.get_metadata('forge_versions', on_update)
+
+    def get_forge_index(self, on_update=None):
+        """获取按MC版本分组的Forge版本索引"""
+        forge_versions = self.get_forge_version_list(on_update)
+        with self.metadata_lock:
+            if self.forge_index is not None and self.forge_index[0] is forge_versions:
+                return self.forge_index
+
+            # Forge版本格式为 <MC版本>-<Forge版本>[-<分支>]
+            by_minecraft = {}
+            by_pair = {}
+            for forge_id in forge_versions:
+                minecraft_version, _, forge_version = forge_id.partition('-')
+                if not forge_version:
+                    continue
+                by_minecraft.setdefault(minecraft_version, []).append(forge_id)
+                by_pair.setdefault((minecraft_version, forge_version), forge_id)
+                by_pair.setdefault((minecraft_version, forge_version.split('-')[0]), forge_id)
+
+            self.forge_index = (forge_versions, by_minecraft, by_pair)
+            return self.forge_index
+
+    def get_forge_versions_for(self, minecraft_version, on_update=None):
+        """获取指定MC版本的所有Forge版本"""
+        return self.get_forge_index(on_update)[1].get(minecraft_version, [])
+
+    def find_forge_version(self, minecraft_version, forge_version):
+        """根据MC版本和Forge版本查找完整的Forge版本号，找不到时返回None"""
+        return self.get_forge_index()[2].get((minecraft_version, forge_version))
+
+    def get_modloader_versions(self, modloader, version, on_update=None):
+        """获取支持指定MC版本的Fabric或Quilt加载器版本列表"""
+        game_versions = self.get_metadata(f'{modloader}_game_versions', on_update)
+        if version not in {game_version['version'] for game_version in game_versions}:
+            return []
+        return [loader_version.get('version', '') for loader_version in self.get_metadata(f'{modloader}_loader_versions', on_update)]
+
     def check_update(self, from_menu):
         """检查更新"""
         try:
@@ -210,26 +1544,24 @@ class MinecraftLauncherGUI:
                         headers = {
                             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
                         }
-                        req = urllib.request.Request('https://pmcldownloadserver.dpdns.org/PMCL.exe', headers=headers)
-                        response = urllib.request.urlopen(req)
-                        
-                        # 获取文件大小
-                        total_size = int(response.info().get('Content-Length', '0'))
-                        progress_bar["maximum"] = total_size
 
                         # 下载文件并更新进度条
                         def download_with_progress():
-                            downloaded = 0
-                            with open('update.exe', 'wb') as f:
-                                while True:
-                                    chunk = response.read(8192)
-                                    if not chunk:
-                                        break
-                                    f.write(chunk)
-                                    downloaded += len(chunk)
+                            def update_progress(downloaded, total_size):
+                                if total_size:
+                                    progress_bar["maximum"] = total_size
                                     progress_info_label["text"] = f"{self.format_file_size(downloaded)}/{self.format_file_size(total_size)} {downloaded / total_size * 100:.1f}%"
-                                    progress_bar["value"] = downloaded
-                                    progress_window.update_idletasks()
+                                progress_bar["value"] = downloaded
+                                progress_window.update_idletasks()
+
+                            try:
+                                # 中断后再次更新时从update.exe.part继续下载
+                                self.download_file('https://pmcldownloadserver.dpdns.org/PMCL.exe', 'update.exe', update_progress, headers=headers)
+                            except Exception as e:
+                                progress_window.destroy()
+                                self.log(f"下载更新失败：{e}", "ERROR")
+                                messagebox.showerror("错误", f"下载更新失败：{e}")
+                                return
 
                             # 下载完成后关闭进度窗口并继续更新过程
                             progress_window.destroy()
@@ -331,16 +1663,132 @@ class MinecraftLauncherGUI:
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
         
+    # 日志
+    LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "WARNING": 30, "ERROR": 40}
+    # 日志区域最多保留的消息数，超出后一次删除多余的部分，完整日志只保存在文件中
+    LOG_VIEW_CAPACITY = 1000
+    LOG_VIEW_TRIM = 200
+    # 进度消息只在日志区域保留最新的一条
+    LOG_PROGRESS_PREFIXES = ("进度：", "下载进度:")
+
+    def start_logger(self):
+        """启动后台日志线程"""
+        self.log_queue = queue.Queue()
+        self.log_widget_pending = {}
+        self.log_widget_lock = threading.Lock()
+        self.log_widget_scheduled = False
+        self.log_views = {}
+
+        self.log_thread = threading.Thread(target=self._log_writer_thread)
+        self.log_thread.daemon = True
+        self.log_thread.start()
+
+    def _log_writer_thread(self):
+        """将日志批量写入文件"""
+        with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
+            while True:
+                lines = [self.log_queue.get()]
+                # 取出队列中已有的日志，一次写入
+                while len(lines) < 1000:
+                    try:
+                        lines.append(self.log_queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = None in lines
+                lines = [line for line in lines if line is not None]
+                if lines:
+                    text = "\n".join(lines)
+                    print(text)
+                    f.write(text + "\n")
+                    f.flush()
+                if stop:
+                    break
+
+    def stop_logger(self):
+        """写入剩余日志并停止日志线程"""
+        if getattr(self, 'log_thread', None) and self.log_thread.is_alive():
+            self.log_queue.put(None)
+            self.log_thread.join(timeout=5)
+
+    def write_log(self, source, message, level, widgets):
+        """记录日志并在日志区域显示消息"""
+        if self.LOG_LEVELS.get(level, 20) < self.LOG_LEVELS.get(self.log_level, 20):
+            return
+        self.log_queue.put(f"[{time.asctime()}] [{source}/{level}] {message}")
+
+        # 日志区域在主线程中批量更新
+        with self.log_widget_lock:
+            for widget in widgets:
+                self.log_widget_pending.setdefault(widget, []).append(message)
+            if self.log_widget_scheduled:
+                return
+            self.log_widget_scheduled = True
+        try:
+            self.root.after(50, self.flush_log_widgets)
+        except Exception:
+            with self.log_widget_lock:
+                self.log_widget_scheduled = False
+
+    def flush_log_widgets(self):
+        """将等待显示的日志插入日志区域"""
+        with self.log_widget_lock:
+            pending = self.log_widget_pending
+            self.log_widget_pending = {}
+            self.log_widget_scheduled = False
+
+        for widget_name, messages in pending.items():
+            widget = getattr(self, widget_name, None)
+            try:
+                if widget is None or not widget.winfo_exists():
+                    continue
+                self.update_log_view(widget_name, widget, messages)
+            except tk.TclError:
+                pass
+
+    def update_log_view(self, widget_name, widget, messages):
+        """将消息追加到日志区域，合并进度消息并删除过旧的消息"""
+        view = self.log_views.get(widget_name)
+        if view is None or view['widget'] is not widget:
+            # 窗口重新打开后日志区域是新的
+            view = {'widget': widget, 'entries': collections.deque(maxlen=self.LOG_VIEW_CAPACITY), 'lines': 0}
+            self.log_views[widget_name] = view
+        entries = view['entries']
+
+        # 连续的进度消息只保留最后一条
+        new_entries = []
+        replace_last = False
+        for message in messages:
+            is_progress = message.startswith(self.LOG_PROGRESS_PREFIXES)
+            if is_progress and new_entries and new_entries[-1][1]:
+                new_entries[-1] = (message, True)
+            elif is_progress and not new_entries and entries and entries[-1][1]:
+                new_entries.append((message, True))
+                replace_last = True
+            else:
+                new_entries.append((message, is_progress))
+
+        widget.config(state=tk.NORMAL)
+        if replace_last:
+            # 覆盖日志区域中的最后一条进度消息
+            last_lines = entries.pop()[0].count("\n") + 1
+            widget.delete(f"{view['lines'] - last_lines + 1}.0", f"{view['lines'] + 1}.0")
+            view['lines'] -= last_lines
+        widget.insert(tk.END, "".join(message + "\n" for message, is_progress in new_entries))
+        entries.extend(new_entries)
+        view['lines'] += sum(message.count("\n") + 1 for message, is_progress in new_entries)
+
+        # 超出容量时一次删除旧的行
+        keep_lines = sum(message.count("\n") + 1 for message, is_progress in entries)
+        if view['lines'] > keep_lines + self.LOG_VIEW_TRIM:
+            widget.delete("1.0", f"{view['lines'] - keep_lines + 1}.0")
+            view['lines'] = keep_lines
+        widget.config(state=tk.DISABLED)
+        widget.see(tk.END)
+
     def log(self, message, level):
         """在日志区域显示消息"""
-        print(f"[{time.asctime()}] [root/{level}] {message}")
-        with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
-            f.write(f"[{time.asctime()}] [root/{level}] {message}\n")
-        
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.config(state=tk.DISABLED)
-        self.log_text.see(tk.END)
+        self.write_log("root", message, level, ['log_text'])
         
     def on_login_method_change(self, event=None):
         """当登录方式改变时"""
@@ -409,18 +1857,12 @@ class MinecraftLauncherGUI:
             data = json.dumps(auth_data).encode('utf-8')
             
             # 创建请求
-            req = urllib.request.Request(
+            # 发送请求并获取响应
+            response_data = json.loads(self.http_request(
                 auth_url,
                 data=data,
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'PMCL/1.2 (Python Minecraft Launcher)'
-                }
-            )
-            
-            # 发送请求并获取响应
-            response = urllib.request.urlopen(req)
-            response_data = json.loads(response.read().decode('utf-8'))
+                headers={'Content-Type': 'application/json'}
+            ).decode('utf-8'))
             
             # 检查是否有错误
             if "error" in response_data:
@@ -569,7 +2011,7 @@ class MinecraftLauncherGUI:
             
         self.version_settings_window = tk.Toplevel(self.root)
         self.version_settings_window.title(f"{version} 设置")
-        self.version_settings_window.geometry(f"300x430+{int((self.root.winfo_screenwidth()-300)/2)}+{int((self.root.winfo_screenheight()-430)/2)}")
+        self.version_settings_window.geometry(f"300x470+{int((self.root.winfo_screenwidth()-300)/2)}+{int((self.root.winfo_screenheight()-470)/2)}")
         
         self.version_settings_window.grab_set()
         self.version_settings_window.resizable(False, False)
@@ -608,6 +2050,10 @@ class MinecraftLauncherGUI:
         # 模组管理按钮
         mod_manager_button = ttk.Button(button_frame, text="模组管理", command=lambda: self.open_mod_manager(version))
         mod_manager_button.pack(fill=tk.X, pady=5)
+
+        # JVM设置按钮
+        jvm_profile_button = ttk.Button(button_frame, text="JVM设置", command=lambda: self.create_jvm_profile_widgets(version))
+        jvm_profile_button.pack(fill=tk.X, pady=5)
         
         # 版本隔离选项
         isolation_checkbox = ttk.Checkbutton(button_frame, text="启用版本隔离", variable=self.isolation_var, 
@@ -643,6 +2089,133 @@ class MinecraftLauncherGUI:
                 self.log(f"无法打开或创建文件夹: {str(e)}", "ERROR")
                 messagebox.showerror("错误", f"无法打开或创建文件夹: {str(e)}")
                 
+    # 本地模组索引
+    def get_mod_index(self, mods_dir):
+        """获取模组目录的元数据索引，只重新解析新增或变化的文件，返回{文件名: 元数据}"""
+        index_path = os.path.join(os.path.dirname(os.path.abspath(mods_dir)), 'pmcl_mods_index.json')
+        old_mods = {}
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    old_mods = json.load(f).get('mods', {})
+            except Exception:
+                old_mods = {}
+
+        # 启用或禁用模组只增删.disabled后缀，按原文件名、大小和修改时间找到原来的记录
+        def base_name(file_name):
+            return file_name[:-len('.disabled')] if file_name.endswith('.disabled') else file_name
+        old_by_stat = {(base_name(file_name), entry['size'], entry['mtime']): (file_name, entry) for file_name, entry in old_mods.items()}
+
+        mods = {}
+        changed_files = []
+        if os.path.isdir(mods_dir):
+            entries = [entry for entry in os.scandir(mods_dir) if entry.is_file() and (entry.name.endswith('.jar') or entry.name.endswith('.disabled'))]
+            names = {entry.name for entry in entries}
+            for entry in entries:
+                stat = entry.stat()
+                old_entry = old_mods.get(entry.name)
+                if not (old_entry and old_entry['size'] == stat.st_size and old_entry['mtime'] == stat.st_mtime_ns):
+                    old_name, old_entry = old_by_stat.get((base_name(entry.name), stat.st_size, stat.st_mtime_ns), (None, None))
+                    # 原来的文件仍然存在时不是重命名
+                    if old_name in names:
+                        old_entry = None
+                if old_entry:
+                    mods[entry.name] = old_entry
+                else:
+                    changed_files.append((entry.name, entry.path, stat))
+
+        # 同时解析变化的文件
+        if changed_files:
+            def parse(file_name, file_path, stat):
+                metadata = self.parse_mod_metadata(file_path)
+                metadata.update({'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha1': self.hash_file(file_path, 'sha1')})
+                return file_name, metadata
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.download_threads, len(changed_files))) as executor:
+                for file_name, metadata in executor.map(lambda item: parse(*item), changed_files):
+                    mods[file_name] = metadata
+
+        if changed_files or len(mods) != len(old_mods):
+            try:
+                with open(f'{index_path}.tmp', 'w', encoding='utf-8') as f:
+                    json.dump({'mods': mods}, f, ensure_ascii=False)
+                os.replace(f'{index_path}.tmp', index_path)
+            except OSError as e:
+                self.log(f"保存模组索引失败: {str(e)}", "WARN")
+
+        return mods
+
+    def parse_mod_metadata(self, file_path):
+        """读取模组文件中的元数据，返回{'id', 'name', 'version', 'loader', 'dependencies'}"""
+        import zipfile
+        import re
+        metadata = {'id': '', 'name': '', 'version': '', 'loader': '', 'dependencies': []}
+        try:
+            with zipfile.ZipFile(file_path, 'r') as zip_ref:
+                names = set(zip_ref.namelist())
+
+                if 'fabric.mod.json' in names:
+                    data = json.loads(zip_ref.read('fabric.mod.json').decode('utf-8', errors='ignore'), strict=False)
+                    metadata.update({
+                        'id': data.get('id', ''),
+                        'name': data.get('name', ''),
+                        'version': data.get('version', ''),
+                        'loader': 'fabric',
+                        'dependencies': [dependency for dependency in data.get('depends', {}) if dependency not in ('minecraft', 'java', 'fabricloader')]
+                    })
+
+                elif 'quilt.mod.json' in names:
+                    data = json.loads(zip_ref.read('quilt.mod.json').decode('utf-8', errors='ignore'), strict=False).get('quilt_loader', {})
+                    dependencies = [dependency if isinstance(dependency, str) else dependency.get('id', '') for dependency in data.get('depends', [])]
+                    metadata.update({
+                        'id': data.get('id', ''),
+                        'name': data.get('metadata', {}).get('name', ''),
+                        'version': data.get('version', ''),
+                        'loader': 'quilt',
+                        'dependencies': [dependency for dependency in dependencies if dependency not in ('minecraft', 'java', 'quilt_loader')]
+                    })
+
+                elif 'META-INF/neoforge.mods.toml' in names or 'META-INF/mods.toml' in names:
+                    toml_name = 'META-INF/neoforge.mods.toml' if 'META-INF/neoforge.mods.toml' in names else 'META-INF/mods.toml'
+                    text = zip_ref.read(toml_name).decode('utf-8', errors='ignore')
+
+                    # 只读取第一个[[mods]]中的字段
+                    mods_block = re.split(r'^\s*\[\[mods\]\]\s*$', text, maxsplit=1, flags=re.M)
+                    mods_block = re.split(r'^\s*\[', mods_block[1], maxsplit=1, flags=re.M)[0] if len(mods_block) > 1 else ''
+                    def toml_value(key):
+                        match = re.search(r'^\s*%s\s*=\s*["\']([^"\']*)["\']' % key, mods_block, re.M)
+                        return match.group(1) if match else ''
+
+                    version = toml_value('version')
+                    if version == '${file.jarVersion}' and 'META-INF/MANIFEST.MF' in names:
+                        match = re.search(r'^Implementation-Version:\s*(\S+)', zip_ref.read('META-INF/MANIFEST.MF').decode('utf-8', errors='ignore'), re.M)
+                        version = match.group(1) if match else version
+
+                    dependencies = re.findall(r'^\s*modId\s*=\s*["\']([^"\']*)["\']', '\n'.join(re.split(r'^\s*\[\[dependencies\.[^\]]*\]\]\s*$', text, flags=re.M)[1:]), re.M)
+                    metadata.update({
+                        'id': toml_value('modId'),
+                        'name': toml_value('displayName'),
+                        'version': version,
+                        'loader': 'neoforge' if toml_name == 'META-INF/neoforge.mods.toml' else 'forge',
+                        'dependencies': [dependency for dependency in dict.fromkeys(dependencies) if dependency not in ('minecraft', 'forge', 'neoforge')]
+                    })
+
+                elif 'mcmod.info' in names:
+                    data = json.loads(zip_ref.read('mcmod.info').decode('utf-8', errors='ignore'), strict=False)
+                    if isinstance(data, dict):
+                        data = data.get('modList', [])
+                    if data:
+                        metadata.update({
+                            'id': data[0].get('modid', ''),
+                            'name': data[0].get('name', ''),
+                            'version': data[0].get('version', ''),
+                            'loader': 'forge',
+                            'dependencies': data[0].get('requiredMods', []) or data[0].get('dependencies', [])
+                        })
+        except Exception as e:
+            self.log(f"读取模组信息失败 {os.path.basename(file_path)}: {str(e)}", "WARN")
+        return metadata
+
     def open_mod_manager(self, version):
         """打开模组管理窗口"""
         self.init_isolation_state(version)
@@ -651,6 +2224,8 @@ class MinecraftLauncherGUI:
         # 如果模组文件夹不存在，创建它
         if not os.path.exists(mods_dir):
             os.makedirs(mods_dir)
+        self.mod_manager_dir = mods_dir
+        self.mod_manager_entries = {}
         
         # 创建模组管理窗口
         self.mod_manager_window = tk.Toplevel(self.root)
@@ -681,6 +2256,7 @@ class MinecraftLauncherGUI:
         # 搜索输入框
         ttk.Label(search_frame, text="搜索模组:").pack(side=tk.LEFT)
         self.mod_search_var = tk.StringVar()
+        self.mod_manager_search_var = self.mod_search_var
         self.mod_search_entry = ttk.Entry(search_frame, textvariable=self.mod_search_var, width=30)
         self.mod_search_entry.pack(side=tk.LEFT, padx=(5, 0))
         
@@ -697,18 +2273,22 @@ class MinecraftLauncherGUI:
         mod_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
         # 创建Treeview来显示模组列表
-        columns = ('name', 'status', 'size')
+        columns = ('name', 'status', 'size', 'mod_id', 'mod_version')
         self.mods_tree = ttk.Treeview(mod_list_frame, columns=columns, show='headings', height=15, selectmode='extended')
         
         # 定义列标题
         self.mods_tree.heading('name', text='模组名称')
         self.mods_tree.heading('status', text='状态')
         self.mods_tree.heading('size', text='大小')
+        self.mods_tree.heading('mod_id', text='模组ID')
+        self.mods_tree.heading('mod_version', text='模组版本')
         
         # 设置列宽
-        self.mods_tree.column('name', width=400)
-        self.mods_tree.column('status', width=100)
-        self.mods_tree.column('size', width=100)
+        self.mods_tree.column('name', width=300)
+        self.mods_tree.column('status', width=70)
+        self.mods_tree.column('size', width=80)
+        self.mods_tree.column('mod_id', width=140)
+        self.mods_tree.column('mod_version', width=120)
         
         # 添加滚动条
         mods_scrollbar_y = ttk.Scrollbar(mod_list_frame, orient=tk.VERTICAL, command=self.mods_tree.yview)
@@ -744,6 +2324,10 @@ class MinecraftLauncherGUI:
         refresh_button = ttk.Button(button_frame, text="刷新", command=lambda: self.load_mods_list(mods_dir))
         refresh_button.pack(side=tk.RIGHT)
         
+        # 检查更新按钮
+        self.check_updates_button = ttk.Button(button_frame, text="检查更新", command=lambda: self.check_mod_updates(version, mods_dir))
+        self.check_updates_button.pack(side=tk.RIGHT, padx=(0, 5))
+        
         # 配置网格权重
         mod_manager_main_frame.columnconfigure(0, weight=1)
         mod_manager_main_frame.rowconfigure(1, weight=1)
@@ -761,57 +2345,251 @@ class MinecraftLauncherGUI:
         
     def load_mods_list(self, mods_dir):
         """加载模组列表"""
+        def _load_mods_thread():
+            try:
+                mods = self.get_mod_index(mods_dir)
+            except Exception as e:
+                self.log(f"加载模组列表失败: {str(e)}", "ERROR")
+                return
+
+            def update_tree():
+                if not self.mods_tree.winfo_exists():
+                    return
+                self.mod_manager_entries = mods
+                self.show_mods_in_manager(self.mod_manager_search_var.get().lower())
+            self.mod_manager_window.after(0, update_tree)
+
+        load_mods_thread = threading.Thread(target=_load_mods_thread)
+        load_mods_thread.daemon = True
+        load_mods_thread.start()
+
+    def show_mods_in_manager(self, search_term=''):
+        """在模组列表中显示匹配搜索词的模组"""
         # 清空现有数据
-        for item in self.mods_tree.get_children():
-            self.mods_tree.delete(item)
-            
-        # 获取模组文件
-        if os.path.exists(mods_dir):
-            for file in os.listdir(mods_dir):
-                file_path = os.path.join(mods_dir, file)
-                if os.path.isfile(file_path) and (file.endswith('.jar') or file.endswith('.disabled')):
-                    # 获取文件大小
-                    size = os.path.getsize(file_path)
-                    size_str = self.format_file_size(size)
-                    
-                    # 获取模组状态
-                    status = "已禁用" if file.endswith('.disabled') else "已启用"
-                    
-                    # 添加到Treeview
-                    self.mods_tree.insert('', tk.END, values=(file, status, size_str), tags=(file_path,))
+        self.mods_tree.delete(*self.mods_tree.get_children())
+
+        for file in sorted(self.mod_manager_entries, key=str.lower):
+            metadata = self.mod_manager_entries[file]
+
+            # 同时匹配文件名、模组ID和模组名称
+            if search_term and not any(search_term in text.lower() for text in (file, metadata.get('id', ''), metadata.get('name', ''))):
+                continue
+
+            # 获取模组状态
+            status = "已禁用" if file.endswith('.disabled') else "已启用"
+
+            # 添加到Treeview
+            file_path = os.path.join(self.mod_manager_dir, file)
+            self.mods_tree.insert('', tk.END, values=(file, status, self.format_file_size(metadata['size']), metadata.get('id', ''), metadata.get('version', '')), tags=(file_path,))
                     
     def search_mods_in_manager(self):
         """在模组管理器中搜索模组"""
         search_term = self.mod_search_var.get().lower()
         if not search_term:
             return
-            
-        # 获取当前版本的模组目录
-        version = self.launch_version_var.get()
-        self.init_isolation_state(version)
-        mods_dir = f"{self.isolation_dir}/mods"
-        
-        # 清空现有数据
-        for item in self.mods_tree.get_children():
-            self.mods_tree.delete(item)
-            
-        # 获取模组文件并过滤
-        if os.path.exists(mods_dir):
-            for file in os.listdir(mods_dir):
-                file_path = os.path.join(mods_dir, file)
-                if os.path.isfile(file_path) and (file.endswith('.jar') or file.endswith('.disabled')):
-                    # 检查是否匹配搜索词
-                    if search_term in file.lower():
-                        # 获取文件大小
-                        size = os.path.getsize(file_path)
-                        size_str = self.format_file_size(size)
-                        
-                        # 获取模组状态
-                        status = "已禁用" if file.endswith('.disabled') else "已启用"
-                        
-                        # 添加到Treeview
-                        self.mods_tree.insert('', tk.END, values=(file, status, size_str), tags=(file_path,))
+        self.show_mods_in_manager(search_term)
                         
+    # 模组更新
+    def check_mod_updates(self, version, mods_dir):
+        """检查实例中所有模组的更新"""
+        self.check_updates_button.config(state=tk.DISABLED, text="正在检查...")
+
+        def _check_mod_updates_thread():
+            error = None
+            updates = []
+            try:
+                updates = self.find_mod_updates(version, mods_dir)
+            except Exception as e:
+                error = str(e)
+                self.log(f"检查模组更新失败: {error}", "ERROR")
+
+            def show_result():
+                if self.check_updates_button.winfo_exists():
+                    self.check_updates_button.config(state=tk.NORMAL, text="检查更新")
+                if error:
+                    messagebox.showerror("错误", f"检查模组更新失败: {error}")
+                elif not updates:
+                    messagebox.showinfo("提示", "所有模组都已是最新版本")
+                else:
+                    self.show_mod_updates(mods_dir, updates)
+            self.root.after(0, show_result)
+
+        check_mod_updates_thread = threading.Thread(target=_check_mod_updates_thread)
+        check_mod_updates_thread.daemon = True
+        check_mod_updates_thread.start()
+
+    def find_mod_updates(self, version, mods_dir):
+        """根据缓存的哈希批量查找可更新的模组，返回[{'file', 'version', 'new_version', 'file_info'}]"""
+        instance_info = self.get_instance_info(version)
+        if not instance_info['loader'] or not instance_info['minecraft_version']:
+            raise Exception("无法确定实例的Minecraft版本或模组加载器")
+        loaders = [instance_info['loader']]
+        if instance_info['loader'] == 'quilt':
+            loaders.append('fabric')
+
+        mods = self.get_mod_index(mods_dir)
+        files_by_hash = {metadata['sha1']: file for file, metadata in mods.items()}
+        latest_versions = self.get_modrinth_updates_by_hash(list(files_by_hash), loaders, [instance_info['minecraft_version']])
+
+        updates = []
+        for sha1, new_version in latest_versions.items():
+            file = files_by_hash.get(sha1)
+            file_info = self.get_primary_file(new_version)
+            # 最新版本的文件与本地文件相同时无需更新
+            if not file or not file_info or not file_info.get('url') or not file_info.get('filename'):
+                continue
+            if (file_info.get('hashes') or {}).get('sha1') == sha1:
+                continue
+            updates.append({
+                'file': file,
+                'version': mods[file].get('version', ''),
+                'new_version': new_version,
+                'file_info': file_info
+            })
+        return sorted(updates, key=lambda update: update['file'].lower())
+
+    def show_mod_updates(self, mods_dir, updates):
+        """显示可更新的模组列表"""
+        update_window = tk.Toplevel(self.mod_manager_window)
+        update_window.title("模组更新")
+        update_window.geometry(f"700x450+{int((self.root.winfo_screenwidth()-700)/2)}+{int((self.root.winfo_screenheight()-450)/2)}")
+        update_window.transient(self.mod_manager_window)
+        update_window.grab_set()
+        update_window.resizable(False, False)
+
+        update_main_frame = ttk.Frame(update_window, padding="10")
+        update_main_frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(update_main_frame, text=f"有 {len(updates)} 个模组可以更新", font=("微软雅黑", 14)).pack(pady=(0, 10))
+
+        # 可更新的模组列表
+        update_list_frame = ttk.Frame(update_main_frame)
+        update_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+
+        columns = ('name', 'current', 'latest')
+        updates_tree = ttk.Treeview(update_list_frame, columns=columns, show='headings', height=12, selectmode='extended')
+        updates_tree.heading('name', text='模组文件')
+        updates_tree.heading('current', text='当前版本')
+        updates_tree.heading('latest', text='最新版本')
+        updates_tree.column('name', width=320)
+        updates_tree.column('current', width=150)
+        updates_tree.column('latest', width=150)
+
+        updates_scrollbar = ttk.Scrollbar(update_list_frame, orient=tk.VERTICAL, command=updates_tree.yview)
+        updates_tree.configure(yscrollcommand=updates_scrollbar.set)
+        updates_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        updates_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        for i, update in enumerate(updates):
+            updates_tree.insert('', tk.END, iid=str(i), values=(update['file'], update['version'], update['new_version'].get('version_number', '')))
+        # 默认选中全部
+        updates_tree.selection_set(updates_tree.get_children())
+
+        button_frame = ttk.Frame(update_main_frame)
+        button_frame.pack(fill=tk.X)
+
+        def start_update():
+            selected_updates = [updates[int(item)] for item in updates_tree.selection()]
+            if not selected_updates:
+                messagebox.showwarning("警告", "请先选择要更新的模组")
+                return
+            update_button.config(state=tk.DISABLED, text="正在更新...")
+
+            def _update_mods_thread():
+                error = None
+                failed = []
+                try:
+                    failed = self.update_mods(mods_dir, selected_updates)
+                except Exception as e:
+                    error = str(e)
+                    self.log(f"更新模组失败: {error}", "ERROR")
+
+                def show_result():
+                    update_window.destroy()
+                    if error:
+                        messagebox.showerror("错误", f"更新模组失败，已恢复原来的模组: {error}")
+                    elif failed:
+                        messagebox.showwarning("警告", f"{len(selected_updates) - len(failed)} 个模组已更新，以下模组下载失败：\n" + "\n".join(failed))
+                    else:
+                        messagebox.showinfo("成功", f"{len(selected_updates)} 个模组已更新")
+                    if self.mods_tree.winfo_exists():
+                        self.load_mods_list(mods_dir)
+                self.root.after(0, show_result)
+
+            update_mods_thread = threading.Thread(target=_update_mods_thread)
+            update_mods_thread.daemon = True
+            update_mods_thread.start()
+
+        update_button = ttk.Button(button_frame, text="更新所选", command=start_update)
+        update_button.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="全选", command=lambda: updates_tree.selection_set(updates_tree.get_children())).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(button_frame, text="关闭", command=update_window.destroy).pack(side=tk.RIGHT)
+
+    def update_mods(self, mods_dir, updates):
+        """同时下载模组的新版本，全部下载完成后一起替换旧文件，返回下载失败的模组列表"""
+        import shutil
+        staging_dir = os.path.join(os.path.dirname(os.path.abspath(mods_dir)), 'pmcl_mod_updates')
+        os.makedirs(staging_dir, exist_ok=True)
+
+        download_tasks = []
+        for update in updates:
+            file_info = update['file_info']
+            download_tasks.append({
+                'urls': [file_info['url']],
+                'path': os.path.join(staging_dir, file_info['filename']),
+                'name': file_info['filename'],
+                'hashes': file_info.get('hashes'),
+                'size': file_info.get('size'),
+                'store': True,
+                'update': update
+            })
+
+        self.log(f"正在下载 {len(download_tasks)} 个模组更新...", "INFO")
+        failed_tasks = self.download_files(download_tasks, self.log)
+        failed_paths = {task['path'] for task in failed_tasks}
+
+        # 先备份旧文件再移入新文件，任何一步失败都回滚所有替换
+        journal = []
+        replaced_tasks = []
+        try:
+            for task in download_tasks:
+                if task['path'] in failed_paths:
+                    continue
+                old_path = os.path.join(mods_dir, task['update']['file'])
+                # 保持模组原来的启用状态
+                new_path = os.path.join(mods_dir, task['name'] + ('.disabled' if old_path.endswith('.disabled') else ''))
+                for path in dict.fromkeys((old_path, new_path)):
+                    if os.path.exists(path):
+                        backup_path = os.path.join(staging_dir, f"{os.path.basename(path)}.pmcl-backup")
+                        os.replace(path, backup_path)
+                        journal.append(('backup', path, backup_path))
+                os.replace(task['path'], new_path)
+                journal.append(('move', task['path'], new_path))
+                replaced_tasks.append((task, new_path))
+        except OSError:
+            self.rollback_migration(journal)
+            raise
+
+        for entry in journal:
+            if entry[0] == 'backup':
+                try:
+                    os.remove(entry[2])
+                except OSError:
+                    pass
+
+        # 共享存储中的引用改为指向模组文件夹中的文件
+        if self.use_shared_store:
+            for task, new_path in replaced_tasks:
+                sha1 = (task.get('hashes') or {}).get('sha1')
+                object_path = self.get_store_object_path(sha1) if sha1 else None
+                if object_path and os.path.exists(object_path) and os.path.samefile(object_path, new_path):
+                    self.add_store_ref(sha1, task.get('size'), new_path, 'link')
+            self.save_store_index()
+
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        self.log(f"{len(replaced_tasks)} 个模组已更新", "INFO")
+        return [task['update']['file'] for task in failed_tasks]
+
     def toggle_select_all(self):
         """全选/取消全选模组"""
         current_text = self.select_all_button.cget('text')
@@ -931,6 +2709,7 @@ class MinecraftLauncherGUI:
         if messagebox.askyesno("确认操作", f"确定要{operation}选中的 {len(selection)} 个模组吗？"):
             success_count = 0
             error_count = 0
+            store_changed = False
             
             # 执行操作
             for item_id in selection:
@@ -953,12 +2732,14 @@ class MinecraftLauncherGUI:
                             # 禁用模组（添加.disabled后缀）
                             new_file_path = file_path + ".disabled"
                             os.rename(file_path, new_file_path)
+                            store_changed = self.move_store_ref(file_path, new_file_path) or store_changed
                             success_count += 1
                         elif operation == "启用" and status == "已禁用":
                             # 启用模组（移除.disabled后缀）
                             if file_name.endswith('.disabled'):
                                 new_file_path = os.path.join(dir_name, file_name[:-9])  # 移除.disabled后缀
                                 os.rename(file_path, new_file_path)
+                                store_changed = self.move_store_ref(file_path, new_file_path) or store_changed
                                 success_count += 1
                         else:
                             # 状态已经正确，不需要操作
@@ -970,6 +2751,13 @@ class MinecraftLauncherGUI:
                     error_count += 1
                     self.mod_manager_window.after(0, lambda: messagebox.showerror("错误", f"无法找到模组文件: {mod_name}"))
             
+            # 共享存储中的引用跟随文件改名
+            if store_changed:
+                try:
+                    self.save_store_index()
+                except OSError as e:
+                    self.log(f"保存共享存储索引失败: {str(e)}", "WARN")
+
             # 显示结果
             if error_count == 0:
                 self.log(f"成功: {operation} {success_count} 个模组", "INFO")
@@ -992,10 +2780,7 @@ class MinecraftLauncherGUI:
         self.mod_search_var.set("")
         
         # 重新加载所有模组
-        version = self.launch_version_var.get()
-        self.init_isolation_state(version)
-        mods_dir = f"{self.isolation_dir}/mods"
-        self.load_mods_list(mods_dir)
+        self.load_mods_list(self.mod_manager_dir)
         
     def format_file_size(self, size):
         """格式化文件大小"""
@@ -1141,6 +2926,8 @@ class MinecraftLauncherGUI:
                         # 禁用模组（添加.disabled后缀）
                         new_file_path = file_path + ".disabled"
                         os.rename(file_path, new_file_path)
+                        if self.move_store_ref(file_path, new_file_path):
+                            self.save_store_index()
                         self.log(f"模组 {mod_name} 已禁用", "INFO")
                         messagebox.showinfo("成功", f"模组 {mod_name} 已禁用")
                     else:
@@ -1148,6 +2935,8 @@ class MinecraftLauncherGUI:
                         if file_name.endswith('.disabled'):
                             new_file_path = os.path.join(dir_name, file_name[:-9])  # 移除.disabled后缀
                             os.rename(file_path, new_file_path)
+                            if self.move_store_ref(file_path, new_file_path):
+                                self.save_store_index()
                             self.log(f"模组 {mod_name} 已启用", "INFO")
                             messagebox.showinfo("成功", f"模组 {mod_name} 已启用")
                         else:
@@ -1230,6 +3019,11 @@ class MinecraftLauncherGUI:
                     # 如果更新.json文件失败，仅记录日志但不中断重命名过程
                     self.log(f"警告: 更新版本配置文件失败: {str(e)}", "ERROR")
 
+                # 版本的JVM设置跟随新名称
+                if version in self.jvm_profiles:
+                    self.jvm_profiles[new_name] = self.jvm_profiles.pop(version)
+                    self.save_settings()
+
                 # 重新加载版本列表
                 self.load_installed_versions()
                 
@@ -1269,6 +3063,8 @@ class MinecraftLauncherGUI:
                 if os.path.exists(version_path):
                     import shutil
                     shutil.rmtree(version_path)
+                    if self.jvm_profiles.pop(version, None) is not None:
+                        self.save_settings()
                     self.log(f"版本 {version} 已删除", "INFO")
                     messagebox.showinfo("成功", f"版本 {version} 已删除")
                     # 重新加载版本列表
@@ -1280,6 +3076,66 @@ class MinecraftLauncherGUI:
                 self.log(f"删除版本失败: {str(e)}", "ERROR")
                 messagebox.showerror("错误", f"删除版本失败: {str(e)}")
                 
+    def get_instance_info(self, version):
+        """从版本文件中读取实例的Minecraft版本和模组加载器，返回{'minecraft_version', 'loader', 'loader_version'}"""
+        info = {'minecraft_version': None, 'loader': None, 'loader_version': None}
+
+        # 依次读取继承链上的版本文件
+        chain = []
+        while version and len(chain) < 10:
+            version_json = os.path.join(self.minecraft_directory, 'versions', version, f'{version}.json')
+            if not os.path.exists(version_json):
+                break
+            try:
+                with open(version_json, 'r', encoding='utf-8') as f:
+                    chain.append(json.load(f))
+            except Exception:
+                break
+            version = chain[-1].get('inheritsFrom')
+        if not chain:
+            return info
+
+        # 根据库文件判断加载器
+        loader_libraries = {
+            'net.fabricmc:fabric-loader': 'fabric',
+            'org.quiltmc:quilt-loader': 'quilt',
+            'net.neoforged:neoforge': 'neoforge',
+            'net.minecraftforge:forge': 'forge',
+            'net.minecraftforge:fmlloader': 'forge'
+        }
+        for version_data in chain:
+            for library in version_data.get('libraries', []):
+                group_artifact, _, library_version = library.get('name', '').rpartition(':')
+                if group_artifact in loader_libraries and not info['loader']:
+                    info['loader'] = loader_libraries[group_artifact]
+                    info['loader_version'] = library_version
+                    if info['loader'] == 'forge' and '-' in library_version:
+                        info['minecraft_version'], info['loader_version'] = library_version.split('-', 1)[0], library_version.split('-', 1)[1]
+                elif group_artifact in ('net.fabricmc:intermediary', 'org.quiltmc:hashed') and not info['minecraft_version']:
+                    info['minecraft_version'] = library_version
+
+        if not info['minecraft_version']:
+            # 原版的版本ID可能被重命名，通过发布时间在版本列表中查找
+            root_data = chain[-1]
+            info['minecraft_version'] = root_data.get('inheritsFrom') or root_data.get('id')
+            try:
+                versions = self.get_minecraft_version_list()
+                if info['minecraft_version'] not in {item['id'] for item in versions}:
+                    for item in versions:
+                        if item.get('releaseTime') == root_data.get('releaseTime'):
+                            info['minecraft_version'] = item['id']
+                            break
+            except Exception:
+                pass
+
+        return info
+
+    def get_isolation_dir(self, version):
+        """获取版本的游戏目录，不改变当前的版本隔离状态"""
+        if os.path.exists(f'{self.minecraft_directory}/versions/{version}/config'):
+            return f'{self.minecraft_directory}/versions/{version}'
+        return self.minecraft_directory
+
     def init_isolation_state(self, version):
         """初始化版本隔离状态"""
         if os.path.exists(f'{self.minecraft_directory}/versions/{version}/config'):
@@ -1296,58 +3152,191 @@ class MinecraftLauncherGUI:
         
         if self.isolation_var.get():
             # 启用版本隔离
-            try:
-                self.isolation_dir = f'{self.minecraft_directory}/versions/{version}'
-                
-                # 创建基本的目录结构
-                directories = ['saves', 'mods', 'config', 'screenshots', 'resourcepacks', 'shaderpacks']
-                if messagebox.askyesno("提示", "是否复制版本的数据？"):
-                    import shutil
-                    for directory in directories:
-                        if os.path.exists(f'{self.minecraft_directory}/{directory}'):
-                            shutil.copytree(f'{self.minecraft_directory}/{directory}', f'{self.isolation_dir}/{directory}', dirs_exist_ok=True)
-
-                for directory in directories:
-                    os.makedirs(f"{self.isolation_dir}/{directory}", exist_ok=True)
-                
-                messagebox.showinfo("成功", f"版本 {version} 的隔离环境已创建")
-                self.log(f"版本 {version} 的隔离环境已创建", "INFO")
-            except Exception as e:
-                self.log(f"创建隔离环境失败: {str(e)}", "ERROR")
-                messagebox.showerror("错误", f"创建隔离环境失败: {str(e)}")
-                self.isolation_var.set(False)
+            self.isolation_dir = f'{self.minecraft_directory}/versions/{version}'
+            copy_data = messagebox.askyesno("提示", "是否复制版本的数据？")
+            self.start_isolation_migration(version, True, copy_data)
         else:
             # 禁用版本隔离
             if os.path.exists(self.isolation_dir):
                 if messagebox.askyesno("确认", f"确定要移除版本 {version} 的隔离环境吗？"):
-                    try:
-                        directories = ['saves', 'mods', 'config', 'screenshots', 'resourcepacks']
-                        
-                        import shutil
-                        if messagebox.askyesno("提示", "是否复制版本的数据？"):
-                            for directory in directories:
-                                if os.path.exists(f'{self.isolation_dir}/{directory}'):
-                                    shutil.copytree(f'{self.isolation_dir}/{directory}', f'{self.minecraft_directory}/{directory}', dirs_exist_ok=True)
-                        
-                        for directory in directories:
-                            for directory in directories:
-                                if os.path.exists(f'{self.isolation_dir}/{directory}'):
-                                    shutil.rmtree(f'{self.isolation_dir}/{directory}')
-                        
-                        self.isolation_dir = ''.join(self.minecraft_directory)
-                        messagebox.showinfo("成功", f"版本 {version} 的隔离环境已移除")
-                        self.log(f"版本 {version} 的隔离环境已移除", "INFO")
-                    except Exception as e:
-                        self.log(f"移除隔离环境失败: {str(e)}", "ERROR")
-                        messagebox.showerror("错误", f"移除隔离环境失败: {str(e)}")
-                        self.isolation_var.set(True)
+                    copy_data = messagebox.askyesno("提示", "是否复制版本的数据？")
+                    self.start_isolation_migration(version, False, copy_data)
                 else:
                     # 用户取消操作，恢复复选框状态
                     self.isolation_var.set(True)
                     return
-        
-    def launch_minecraft(self):
-        """启动Minecraft"""
+
+    def start_isolation_migration(self, version, enable, copy_data):
+        """在后台线程中迁移版本隔离数据并显示进度"""
+        isolation_dir = f'{self.minecraft_directory}/versions/{version}'
+        directories = ['saves', 'mods', 'config', 'screenshots', 'resourcepacks', 'shaderpacks']
+
+        # 创建进度窗口
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("迁移数据")
+        progress_window.geometry(f"300x100+{int((self.root.winfo_screenwidth()-300)/2)}+{int((self.root.winfo_screenheight()-100)/2)}")
+        progress_window.resizable(False, False)
+        progress_window.transient(self.root)
+        progress_window.grab_set()
+        progress_window.protocol("WM_DELETE_WINDOW", lambda: None)
+
+        progress_label = ttk.Label(progress_window, text="正在迁移数据...")
+        progress_label.pack(pady=5)
+
+        progress_bar = ttk.Progressbar(progress_window, orient="horizontal", length=280, mode="determinate")
+        progress_bar.pack(pady=10)
+
+        last_percent = [-1]
+
+        def update_progress(current, total):
+            """在主线程中更新进度条"""
+            percent = int(current * 100 / total) if total else 100
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                self.root.after(0, lambda: (progress_bar.config(value=percent), progress_label.config(text=f"正在迁移数据... {current}/{total}")))
+
+        def on_finished(error):
+            """在主线程中显示结果"""
+            progress_window.destroy()
+            if enable:
+                if error:
+                    self.log(f"创建隔离环境失败: {str(error)}", "ERROR")
+                    messagebox.showerror("错误", f"创建隔离环境失败: {str(error)}")
+                    self.isolation_var.set(False)
+                    self.isolation_dir = ''.join(self.minecraft_directory)
+                else:
+                    messagebox.showinfo("成功", f"版本 {version} 的隔离环境已创建")
+                    self.log(f"版本 {version} 的隔离环境已创建", "INFO")
+            else:
+                if error:
+                    self.log(f"移除隔离环境失败: {str(error)}", "ERROR")
+                    messagebox.showerror("错误", f"移除隔离环境失败: {str(error)}")
+                    self.isolation_var.set(True)
+                else:
+                    self.isolation_dir = ''.join(self.minecraft_directory)
+                    messagebox.showinfo("成功", f"版本 {version} 的隔离环境已移除")
+                    self.log(f"版本 {version} 的隔离环境已移除", "INFO")
+
+        def _migrate_thread():
+            error = None
+            try:
+                import shutil
+                if enable:
+                    if copy_data:
+                        count = self.migrate_directories(self.minecraft_directory, isolation_dir, directories, False, update_progress)
+                        self.log(f"已迁移 {count} 个文件", "INFO")
+                    for directory in directories:
+                        os.makedirs(f"{isolation_dir}/{directory}", exist_ok=True)
+                else:
+                    if copy_data:
+                        # 隔离目录随后会被删除，直接移动文件
+                        count = self.migrate_directories(isolation_dir, self.minecraft_directory, directories, True, update_progress)
+                        self.log(f"已迁移 {count} 个文件", "INFO")
+                    for directory in directories:
+                        if os.path.exists(f'{isolation_dir}/{directory}'):
+                            shutil.rmtree(f'{isolation_dir}/{directory}')
+            except Exception as e:
+                error = e
+            self.root.after(0, on_finished, error)
+
+        migrate_thread = threading.Thread(target=_migrate_thread)
+        migrate_thread.daemon = True
+        migrate_thread.start()
+
+    def migrate_directories(self, src_root, dst_root, directories, move, progress_callback=None):
+        """迁移数据目录或文件（移动或快速复制），失败时回滚，返回迁移的文件数"""
+        import shutil
+
+        # 内容不会被原地修改的目录可以使用硬链接
+        hardlink_directories = ('mods', 'resourcepacks', 'shaderpacks', 'screenshots')
+
+        # 收集需要迁移的目录和文件
+        dir_list = []
+        file_list = []
+        for directory in directories:
+            src_dir = os.path.join(src_root, directory)
+            if os.path.isfile(src_dir):
+                # 根目录下的单个文件
+                dir_list.append(dst_root)
+                file_list.append((src_dir, os.path.join(dst_root, directory), directory in hardlink_directories))
+                continue
+            if not os.path.isdir(src_dir):
+                continue
+            for root, dirs, files in os.walk(src_dir):
+                dir_list.append(os.path.join(dst_root, os.path.relpath(root, src_root)))
+                for file in files:
+                    src_path = os.path.join(root, file)
+                    file_list.append((src_path, os.path.join(dst_root, os.path.relpath(src_path, src_root)), directory in hardlink_directories))
+
+        # 记录每一步操作以便回滚
+        journal = []
+        try:
+            for dir_path in dir_list:
+                # 记录新创建的每一级目录
+                created_dirs = []
+                parent = dir_path
+                while not os.path.exists(parent):
+                    created_dirs.append(parent)
+                    parent = os.path.dirname(parent)
+                for created_dir in reversed(created_dirs):
+                    os.mkdir(created_dir)
+                    journal.append(('mkdir', created_dir))
+
+            for i, (src_path, dst_path, allow_hardlink) in enumerate(file_list):
+                # 先备份将被覆盖的文件
+                if os.path.lexists(dst_path):
+                    backup_path = f"{dst_path}.pmcl-backup"
+                    os.replace(dst_path, backup_path)
+                    journal.append(('backup', dst_path, backup_path))
+
+                if move:
+                    shutil.move(src_path, dst_path)
+                    journal.append(('move', src_path, dst_path))
+                else:
+                    if allow_hardlink:
+                        self.link_file(src_path, dst_path)
+                    else:
+                        try:
+                            self.reflink_file(src_path, dst_path)
+                        except (OSError, ImportError):
+                            shutil.copy2(src_path, dst_path)
+                    journal.append(('create', dst_path))
+
+                if progress_callback:
+                    progress_callback(i + 1, len(file_list))
+        except Exception:
+            self.rollback_migration(journal)
+            raise
+
+        # 迁移成功，删除备份
+        for entry in journal:
+            if entry[0] == 'backup':
+                try:
+                    os.remove(entry[2])
+                except OSError:
+                    pass
+
+        return len(file_list)
+
+    def rollback_migration(self, journal):
+        """按相反顺序撤销迁移操作"""
+        import shutil
+        for entry in reversed(journal):
+            try:
+                if entry[0] == 'move':
+                    os.makedirs(os.path.dirname(entry[1]), exist_ok=True)
+                    shutil.move(entry[2], entry[1])
+                elif entry[0] == 'create':
+                    os.remove(entry[1])
+                elif entry[0] == 'backup':
+                    os.replace(entry[2], entry[1])
+                elif entry[0] == 'mkdir':
+                    os.rmdir(entry[1])
+            except OSError as e:
+                self.log(f"回滚迁移操作失败: {str(e)}", "ERROR")
+        
+    def launch_minecraft(self):
+        """启动Minecraft"""
         version = self.launch_version_var.get()
         if not version:
             messagebox.showwarning("警告", "请先选择一个版本")
@@ -1384,18 +3373,14 @@ class MinecraftLauncherGUI:
                 messagebox.showwarning("警告", "请输入Java路径！")
                 return
         
-        # 添加内存设置
-        if hasattr(self, 'memory_var'):
-            memory = self.memory_var.get()
-            if memory and memory.isdigit():
-                options["jvmArguments"] = [f"-Xmx{memory}m"]
-        
         options["customResolution"] = True
         options["resolutionWidth"] = "854"
         options["resolutionHeight"] = "480"
             
         # 初始化版本隔离状态
-        self.init_isolation_state(version)
+        profile = self.start_launch_profile(version, login_method)
+        with self.launch_phase(profile, "版本隔离"):
+            self.init_isolation_state(version)
         
         options["gameDirectory"] = self.isolation_dir
         
@@ -1407,121 +3392,916 @@ class MinecraftLauncherGUI:
         
         # 在新线程中启动Minecraft
         if login_method == "LittleSkin":
-            launch_thread = threading.Thread(target=self._launch_minecraft_with_littleskin, args=(version, options))
+            launch_thread = threading.Thread(target=self._launch_minecraft_with_littleskin, args=(version, options, profile))
         else:
-            launch_thread = threading.Thread(target=self._launch_minecraft_thread, args=(version, options))
+            launch_thread = threading.Thread(target=self._launch_minecraft_thread, args=(version, options, profile))
         launch_thread.daemon = True
         launch_thread.start()
+    
+    # JVM参数
+    # 预设: (最低Java版本, 参数)，G1参数来自Aikar的推荐参数
+    JVM_PRESETS = {
+        "G1": (8, ["-XX:+UseG1GC", "-XX:+ParallelRefProcEnabled", "-XX:MaxGCPauseMillis=200", "-XX:+UnlockExperimentalVMOptions",
+                   "-XX:+DisableExplicitGC", "-XX:G1HeapWastePercent=5", "-XX:G1MixedGCCountTarget=4", "-XX:G1MixedGCLiveThresholdPercent=90",
+                   "-XX:G1RSetUpdatingPauseTimePercent=5", "-XX:SurvivorRatio=32", "-XX:+PerfDisableSharedMem", "-XX:MaxTenuringThreshold=1"]),
+        "ZGC": (15, ["-XX:+UseZGC", "-XX:+DisableExplicitGC", "-XX:+PerfDisableSharedMem"]),
+        "Shenandoah": (12, ["-XX:+UseShenandoahGC", "-XX:+DisableExplicitGC", "-XX:+ParallelRefProcEnabled", "-XX:+PerfDisableSharedMem"]),
+    }
+    JVM_DEFAULT_PROFILE = {'preset': "G1", 'memory': "", 'large_pages': False, 'extra': ""}
+    # 自动内存: 基础内存加上每个模组的内存，最多使用物理内存的3/4并给系统保留2GB
+    JVM_BASE_MEMORY = 2048
+    JVM_MEMORY_PER_MOD = 32
+    JVM_MAX_AUTO_MEMORY = 16384
+
+    def get_jvm_profile(self, version):
+        """获取版本的JVM设置，没有单独设置时使用默认设置"""
+        return dict(self.JVM_DEFAULT_PROFILE, **self.jvm_profiles.get(version, {}))
+
+    def get_launch_java_major(self, version):
+        """获取启动版本时使用的Java主版本号，无法确定时返回None"""
+        if self.use_custom_java:
+            # 自动选择Java时使用版本要求的Java
+            return self.get_version_java_major(version)
+        if not self.java_path:
+            return None
+        for runtime in self.load_java_runtimes()['runtimes']:
+            if os.path.realpath(runtime['path']) == os.path.realpath(self.java_path):
+                return runtime['major']
+        return self.read_java_release(os.path.dirname(os.path.dirname(self.java_path)))[0]
+
+    def get_auto_memory(self, version):
+        """根据物理内存和模组数量计算最大内存（MB）"""
+        mods_dir = os.path.join(self.get_isolation_dir(version), 'mods')
+        try:
+            mod_count = sum(1 for file in os.listdir(mods_dir) if file.endswith('.jar'))
+        except OSError:
+            mod_count = 0
+        total = psutil.virtual_memory().total // (1024 * 1024)
+        limit = max(1024, min(total * 3 // 4, total - 2048))
+        # 按512MB取整
+        memory = -(-(self.JVM_BASE_MEMORY + mod_count * self.JVM_MEMORY_PER_MOD) // 512) * 512
+        return min(memory, limit, self.JVM_MAX_AUTO_MEMORY)
+
+    def get_large_pages_arguments(self):
+        """获取启用大页内存的参数，系统不支持时返回空列表"""
+        system = platform.system().lower()
+        if system == 'windows':
+            # 需要"锁定内存页"权限，没有权限时Java会忽略并给出警告
+            return ["-XX:+UseLargePages"]
+        if system == 'linux':
+            try:
+                with open('/sys/kernel/mm/transparent_hugepage/enabled', 'r') as f:
+                    mode = f.read()
+            except OSError:
+                return []
+            if '[always]' in mode or '[madvise]' in mode:
+                return ["-XX:+UseTransparentHugePages"]
+        return []
+
+    def build_jvm_arguments(self, version):
+        """根据版本的JVM设置生成JVM参数"""
+        profile = self.get_jvm_profile(version)
+        java_major = self.get_launch_java_major(version)
+
+        memory = str(profile['memory'] or self.memory or "")
+        if memory.isdigit():
+            memory = int(memory)
+        else:
+            memory = self.get_auto_memory(version)
+            self.log(f"自动分配内存: {memory}MB", "INFO")
+        # 初始内存为最大内存的一半，避免启动时占用全部内存
+        arguments = [f"-Xms{min(memory, max(512, memory // 2 // 256 * 256))}m", f"-Xmx{memory}m"]
+
+        preset = profile['preset']
+        if preset in self.JVM_PRESETS:
+            min_java, preset_arguments = self.JVM_PRESETS[preset]
+            if java_major is None or java_major < min_java:
+                # 不支持的垃圾回收器会导致Java无法启动，改用G1
+                if preset != "G1":
+                    self.log(f"{preset}需要Java {min_java}及以上版本，当前Java版本{java_major or '未知'}，已改用G1", "WARN")
+                preset, (min_java, preset_arguments) = "G1", self.JVM_PRESETS["G1"]
+            arguments += preset_arguments
+            if preset == "G1":
+                # 大内存时增大新生代和区域大小
+                if memory >= 12288:
+                    arguments += ["-XX:G1NewSizePercent=40", "-XX:G1MaxNewSizePercent=50", "-XX:G1HeapRegionSize=16M", "-XX:G1ReservePercent=15", "-XX:InitiatingHeapOccupancyPercent=20"]
+                else:
+                    arguments += ["-XX:G1NewSizePercent=30", "-XX:G1MaxNewSizePercent=40", "-XX:G1HeapRegionSize=8M", "-XX:G1ReservePercent=20", "-XX:InitiatingHeapOccupancyPercent=15"]
+            elif preset == "ZGC" and java_major in (21, 22):
+                # Java 23开始分代ZGC是默认模式
+                arguments.append("-XX:+ZGenerational")
+
+        if profile['large_pages']:
+            arguments += self.get_large_pages_arguments()
+        if profile['extra']:
+            arguments += profile['extra'].split()
+        return arguments
+
+    def create_jvm_profile_widgets(self, version):
+        """创建版本JVM设置窗口"""
+        jvm_window = tk.Toplevel(self.version_settings_window)
+        jvm_window.title(f"{version} JVM设置")
+        jvm_window.geometry(f"360x330+{int((self.root.winfo_screenwidth()-360)/2)}+{int((self.root.winfo_screenheight()-330)/2)}")
+        jvm_window.grab_set()
+        jvm_window.resizable(False, False)
+
+        main_frame = ttk.Frame(jvm_window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        profile = self.get_jvm_profile(version)
+
+        ttk.Label(main_frame, text="垃圾回收器:").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        preset_var = tk.StringVar(value=profile['preset'])
+        ttk.Combobox(main_frame, textvariable=preset_var, values=list(self.JVM_PRESETS) + ["默认"], state="readonly", width=20).grid(row=0, column=1, sticky=tk.W, pady=(0, 5))
+
+        ttk.Label(main_frame, text="最大内存 (MB，留空为自动):").grid(row=1, column=0, sticky=tk.W, pady=(0, 5))
+        memory_var = tk.StringVar(value=str(profile['memory']))
+        ttk.Entry(main_frame, textvariable=memory_var, width=22).grid(row=1, column=1, sticky=tk.W, pady=(0, 5))
+
+        large_pages_var = tk.BooleanVar(value=profile['large_pages'])
+        ttk.Checkbutton(main_frame, text="使用大页内存", variable=large_pages_var).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+
+        ttk.Label(main_frame, text="额外参数:").grid(row=3, column=0, sticky=tk.W, pady=(0, 5))
+        extra_var = tk.StringVar(value=profile['extra'])
+        ttk.Entry(main_frame, textvariable=extra_var, width=22).grid(row=3, column=1, sticky=tk.W, pady=(0, 5))
+
+        java_major = self.get_launch_java_major(version)
+        ttk.Label(main_frame, text=f"Java版本: {java_major or '未知'}，自动内存: {self.get_auto_memory(version)}MB").grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=(5, 5))
+        ttk.Label(main_frame, text="ZGC需要Java 15及以上版本，Shenandoah需要Java 12及以上版本，\n不支持时会自动改用G1", wraplength=330).grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+
+        def save_profile():
+            memory = memory_var.get().strip()
+            if memory and (not memory.isdigit() or int(memory) < 512):
+                messagebox.showwarning("警告", "最大内存应为不小于512的整数！", parent=jvm_window)
+                return
+            preset = preset_var.get()
+            if preset in self.JVM_PRESETS and java_major is not None and java_major < self.JVM_PRESETS[preset][0]:
+                if not messagebox.askyesno("提示", f"{preset}需要Java {self.JVM_PRESETS[preset][0]}及以上版本，当前Java版本为{java_major}，启动时将改用G1，是否继续保存？", parent=jvm_window):
+                    return
+            self.jvm_profiles[version] = {'preset': preset, 'memory': memory, 'large_pages': large_pages_var.get(), 'extra': extra_var.get().strip()}
+            self.save_settings()
+            self.log(f"{version} 的JVM设置已保存", "INFO")
+            jvm_window.destroy()
 
-        # Minecraft进程特征
-        self.process_indicators = [
-            'net.minecraft.client.main.Main',
-            'net.minecraft.launchwrapper.Launch',
-            'com.mojang.',
-            '--gameDir', '--version', '--assetsDir'
-        ]
-        
-        # Minecraft窗口类特征
-        self.window_class_indicators = ['LWJGL', 'GLFW', 'SunAwtFrame']
-        
-        # 已知的Minecraft相关进程名
-        self.minecraft_process_names = ['javaw.exe', 'java.exe', 'minecraft.exe']
+        def reset_profile():
+            self.jvm_profiles.pop(version, None)
+            self.save_settings()
+            self.log(f"{version} 的JVM设置已恢复默认", "INFO")
+            jvm_window.destroy()
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        ttk.Button(button_frame, text="保存", command=save_profile).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(button_frame, text="取消", command=jvm_window.destroy).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="恢复默认", command=reset_profile).pack(side=tk.LEFT)
+
+    # 启动计时
+    LAUNCH_HISTORY_KEEP = 100
+    # (名称, 游戏输出中的标志)，每个节点只记录第一次出现的时间，标志为None时是游戏的第一行输出
+    LAUNCH_MILESTONES = (
+        ('首次输出', None),
+        ('加载器启动', ('with Fabric Loader', 'with Quilt Loader', 'ModLauncher running')),
+        ('设置用户', ('Setting user:',)),
+        ('初始化渲染', ('Backend library: LWJGL', 'LWJGL Version')),
+        ('加载资源', ('Created: ',)),
+        ('声音引擎', ('Sound engine started',)),
+    )
+    # 出现这个节点时游戏启动完成，总耗时为点击启动到这个节点的时间
+    LAUNCH_COMPLETE_MILESTONE = '声音引擎'
+
+    def start_launch_profile(self, version, login_method):
+        """开始记录一次启动的耗时"""
+        mods_dir = os.path.join(self.get_isolation_dir(version), 'mods')
+        try:
+            mod_count = sum(1 for file in os.listdir(mods_dir) if file.endswith('.jar'))
+        except OSError:
+            mod_count = 0
+        return {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'version': version,
+            'login': login_method,
+            'mods': mod_count,
+            'start': time.perf_counter(),
+            'phases': [],
+            'milestones': [],
+            'saved': False,
+        }
 
-        if platform.system().lower() == 'windows': 
-            import pygetwindow as gw
-            # 初始化窗口数量
-            self.window_counter = len(gw.getAllWindows())
-    
-    def check_process_by_cmdline(self):
-        """通过命令行参数检测"""
-        for process in psutil.process_iter(['pid', 'name', 'cmdline']):
+    @contextlib.contextmanager
+    def launch_phase(self, profile, name):
+        """记录启动过程中一个阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile['phases'].append([name, round(time.perf_counter() - start, 3)])
+
+    def mark_launch_milestone(self, profile, name):
+        """记录从点击启动到游戏输出某个节点的时间"""
+        if profile is not None and all(milestone[0] != name for milestone in profile['milestones']):
+            profile['milestones'].append([name, round(time.perf_counter() - profile['start'], 3)])
+
+    def check_launch_milestones(self, profile, line):
+        """检查游戏输出中的启动节点"""
+        if profile is None or profile['saved']:
+            return
+        recorded = {milestone[0] for milestone in profile['milestones']}
+        for name, markers in self.LAUNCH_MILESTONES:
+            if name not in recorded and (markers is None or any(marker in line for marker in markers)):
+                self.mark_launch_milestone(profile, name)
+        # 启动完成时立即保存，不等待游戏退出
+        if any(milestone[0] == self.LAUNCH_COMPLETE_MILESTONE for milestone in profile['milestones']):
+            self.save_launch_profile(profile)
+
+    def get_launch_history_path(self):
+        """获取启动耗时记录文件的路径"""
+        return os.path.join(self.get_game_log_dir(), 'launch_history.json')
+
+    def load_launch_history(self):
+        """读取启动耗时记录"""
+        try:
+            with open(self.get_launch_history_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def save_launch_profile(self, profile):
+        """将一次启动的耗时追加到记录文件中"""
+        if profile is None or profile['saved']:
+            return
+        profile['saved'] = True
+        entry = {key: value for key, value in profile.items() if key not in ('start', 'saved')}
+        # 没有启动完成（崩溃或提前退出）的记录没有总耗时，不参与比较
+        entry['total'] = next((seconds for name, seconds in profile['milestones'] if name == self.LAUNCH_COMPLETE_MILESTONE), None)
+        entry['completed'] = entry['total'] is not None
+        with self.launch_history_lock:
+            history = self.load_launch_history()
+            history.append(entry)
+            history = history[-self.LAUNCH_HISTORY_KEEP:]
+            history_path = self.get_launch_history_path()
             try:
-                if not process.info['cmdline']:
+                os.makedirs(os.path.dirname(history_path), exist_ok=True)
+                with open(f'{history_path}.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(history, f, ensure_ascii=False, indent=1)
+                os.replace(f'{history_path}.tmp', history_path)
+            except OSError as e:
+                self.log(f"保存启动耗时失败: {str(e)}", "WARN")
+                return
+        details = ', '.join(f'{name} {seconds:.1f}s' for name, seconds in profile['phases'] + profile['milestones'])
+        if entry['completed']:
+            self.log(f"本次启动耗时{entry['total']:.1f}秒（{details}）", "INFO")
+        else:
+            self.log(f"本次启动没有完成（{details}）", "INFO")
+
+    def create_launch_history_widgets(self):
+        """创建启动耗时对比窗口"""
+        history_window = tk.Toplevel(self.root)
+        history_window.title("启动耗时")
+        history_window.geometry(f"900x450+{int((self.root.winfo_screenwidth()-900)/2)}+{int((self.root.winfo_screenheight()-450)/2)}")
+
+        main_frame = ttk.Frame(history_window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 版本筛选
+        filter_frame = ttk.Frame(main_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(filter_frame, text="版本:").pack(side=tk.LEFT)
+        version_var = tk.StringVar(value="全部")
+        version_combobox = ttk.Combobox(filter_frame, textvariable=version_var, state="readonly", width=30)
+        version_combobox.pack(side=tk.LEFT, padx=(5, 0))
+
+        history = self.load_launch_history()
+        # 所有记录中出现过的阶段和节点作为列
+        columns = []
+        for entry in history:
+            for name, _ in entry['phases'] + entry['milestones']:
+                if name not in columns:
+                    columns.append(name)
+
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        history_tree = ttk.Treeview(tree_frame, columns=['time', 'version', 'mods', 'total', 'change'] + columns, show='headings')
+        for column, text, width in [('time', "时间", 130), ('version', "版本", 120), ('mods', "模组数", 50), ('total', "总耗时", 60), ('change', "变化", 60)]:
+            history_tree.heading(column, text=text)
+            history_tree.column(column, width=width, anchor=tk.W if column in ('time', 'version') else tk.E)
+        for column in columns:
+            history_tree.heading(column, text=column)
+            history_tree.column(column, width=80, anchor=tk.E)
+        # 比同一版本上一次启动慢20%以上的记录标红
+        history_tree.tag_configure('slower', foreground='red')
+        history_tree.tag_configure('faster', foreground='green')
+        history_tree.tag_configure('incomplete', foreground='gray')
+
+        scrollbar_y = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=history_tree.yview)
+        scrollbar_x = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=history_tree.xview)
+        history_tree.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        def show_history(event=None):
+            history_tree.delete(*history_tree.get_children())
+            previous = {}
+            rows = []
+            for entry in history:
+                completed = entry.get('completed') and entry['total']
+                last = previous.get(entry['version'])
+                # 只和同一版本上一次完成的启动比较
+                if completed:
+                    previous[entry['version']] = entry
+                if version_var.get() not in ("全部", entry['version']):
                     continue
-                    
-                cmdline = ' '.join(process.info['cmdline']).lower()
-                process_name = process.info['name'].lower() if process.info['name'] else ''
-                
-                # 检查是否是Java进程
-                if any(name in process_name for name in ['java', 'javaw']):
-                    # 检查Minecraft特征
-                    minecraft_indicators = 0
-                    
-                    # 检查主类
-                    if any(indicator in cmdline for indicator in 
-                          ['net.minecraft.client.main.main', 'net.minecraft.launchwrapper.launch']):
-                        minecraft_indicators += 2
-                    
-                    # 检查启动参数
-                    if any(param in cmdline for param in 
-                          ['--gamedir', '--version', '--assetsdir']):
-                        minecraft_indicators += 1
-                    
-                    # 检查JVM参数（Minecraft通常有内存设置）
-                    if any(param in cmdline for param in ['-xmx', '-xms']):
-                        minecraft_indicators += 1
-                    
-                    if minecraft_indicators >= 2:
-                        return True
-                        
-            except (psutil.AccessDenied, psutil.NoSuchProcess):
-                continue
-        return False
-    
-    def check_by_window(self):
-        """通过窗口数量检测"""
-        if platform.system().lower() == 'windows':
-            import pygetwindow as gw
-            if (len(gw.getAllWindows()) - self.window_counter) > 0:
-                return True
-            self.window_counter = len(gw.getAllWindows())
-            return False
+                times = dict(entry['phases'] + entry['milestones'])
+                change = ""
+                tags = ()
+                if not completed:
+                    tags = ('incomplete',)
+                elif last:
+                    ratio = entry['total'] / last['total'] - 1
+                    change = f"{ratio:+.0%}"
+                    if entry['mods'] != last['mods']:
+                        change += f" ({entry['mods'] - last['mods']:+d}模组)"
+                    if ratio > 0.2:
+                        tags = ('slower',)
+                    elif ratio < -0.2:
+                        tags = ('faster',)
+                rows.append(([entry['time'], entry['version'], entry['mods'], f"{entry['total']:.1f}" if completed else "未完成", change] + [f"{times[column]:.1f}" if column in times else "" for column in columns], tags))
+            # 最近的记录显示在最上面
+            for values, tags in reversed(rows):
+                history_tree.insert('', tk.END, values=values, tags=tags)
+
+        version_combobox['values'] = ["全部"] + sorted({entry['version'] for entry in history})
+        version_combobox.bind("<<ComboboxSelected>>", show_history)
+        show_history()
+
+    # 启动命令缓存
+    # 每次启动不同的字段使用占位符，缓存的命令在启动时替换为实际的值
+    LAUNCH_PLACEHOLDERS = {'username': '${pmcl_username}', 'uuid': '${pmcl_uuid}', 'token': '${pmcl_token}'}
+
+    def get_launch_fingerprint(self, version, options, jvm_arguments):
+        """根据版本JSON（包括inheritsFrom的版本）和启动选项计算指纹"""
+        fingerprint = hashlib.sha1()
+        fingerprint.update(json.dumps({
+            'options': {key: value for key, value in options.items() if key not in self.LAUNCH_PLACEHOLDERS},
+            'jvm_arguments': list(jvm_arguments),
+            'use_java': self.use_java,
+            'library_version': minecraft_launcher_lib.utils.get_library_version(),
+        }, sort_keys=True).encode('utf-8'))
+
+        # 依次读取版本JSON和它继承的版本JSON
+        while version:
+            json_path = os.path.join(self.minecraft_directory, 'versions', version, f'{version}.json')
+            stat = os.stat(json_path)
+            fingerprint.update(f'{json_path}|{stat.st_size}|{stat.st_mtime_ns}'.encode('utf-8'))
+            with open(json_path, 'r', encoding='utf-8') as f:
+                version = json.load(f).get('inheritsFrom')
+        return fingerprint.hexdigest()
+
+    def get_launch_files_state(self, command):
+        """获取启动命令中Java和类路径文件的大小和修改时间"""
+        files = [command[0]]
+        for i, arg in enumerate(command[:-1]):
+            if arg in ('-cp', '-classpath'):
+                files.extend(command[i + 1].split(os.pathsep))
+                break
+        state = {}
+        for file in files:
+            try:
+                stat = os.stat(file)
+                state[file] = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                state[file] = None
+        return state
+
+    def build_launch_command(self, version, options, jvm_arguments):
+        """生成带有占位符的启动命令"""
+        template_options = dict(options, **self.LAUNCH_PLACEHOLDERS)
+        command = minecraft_launcher_lib.command.get_minecraft_command(version, self.minecraft_directory, template_options)
+        if '--versionType' in command[:-1]:
+            command[command.index('--versionType') + 1] = "PMCL"
+
+        # 额外的JVM参数放在类路径之前
+        if jvm_arguments:
+            if '-cp' in command:
+                index = command.index('-cp')
+            elif '-classpath' in command:
+                index = command.index('-classpath')
+            else:
+                index = 1
+            command[index:index] = list(jvm_arguments)
+
+        if not self.use_java:
+            command[0] = 'javaw'.join(command[0].rsplit('java', 1))
+        return command
+
+    def get_launch_command(self, version, options, jvm_arguments=()):
+        """获取启动命令，版本、库文件和选项都没有变化时使用缓存的命令"""
+        cache_path = os.path.join(self.minecraft_directory, 'pmcl_cache', 'launch_commands.json')
+        fingerprint = self.get_launch_fingerprint(version, options, jvm_arguments)
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+        entry = cache.get(version)
+        if entry and entry['fingerprint'] == fingerprint and self.get_launch_files_state(entry['command']) == entry['files']:
+            self.log("使用缓存的启动命令", "INFO")
+            command = entry['command']
         else:
-            return True
-    
-    def check_by_memory_usage(self):
-        """通过内存使用模式检测（Minecraft通常使用大量内存）"""
-        for process in psutil.process_iter(['pid', 'name', 'memory_info']):
+            command = self.build_launch_command(version, options, jvm_arguments)
+            cache[version] = {'fingerprint': fingerprint, 'command': command, 'files': self.get_launch_files_state(command)}
             try:
-                if process.info['name'] and 'java' in process.info['name'].lower():
-                    memory_mb = process.info['memory_info'].rss / 1024 / 1024
-                    # Minecraft通常使用超过512MB内存
-                    if memory_mb > 512:
-                        # 进一步验证是否是Minecraft
-                        cmdline = ' '.join(process.cmdline()).lower()
-                        if 'net.minecraft' in cmdline or 'mojang' in cmdline:
-                            return True
-            except:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                with open(f'{cache_path}.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, ensure_ascii=False)
+                os.replace(f'{cache_path}.tmp', cache_path)
+            except OSError as e:
+                self.log(f"保存启动命令缓存失败: {str(e)}", "WARN")
+
+        # 替换每次启动不同的字段
+        values = {placeholder: options.get(key, '') for key, placeholder in self.LAUNCH_PLACEHOLDERS.items()}
+        launch_command = []
+        for arg in command:
+            if '${pmcl_' in arg:
+                for placeholder, value in values.items():
+                    arg = arg.replace(placeholder, value)
+            launch_command.append(arg)
+        return launch_command
+
+    # 游戏日志
+    GAME_LOG_KEEP = 20
+    GAME_CONSOLE_CAPACITY = 5000
+    GAME_CONSOLE_TRIM = 500
+    GAME_SESSIONS_KEEP = 5
+    GAME_LOG_LEVEL_PATTERN = re.compile(r'/(DEBUG|INFO|WARN|WARNING|ERROR|FATAL)\]')
+
+    def get_game_log_dir(self):
+        """获取保存游戏日志的目录"""
+        return os.path.join(self.minecraft_directory, 'pmcl_logs')
+
+    def start_game_session(self, version):
+        """为一次启动创建日志会话，返回会话记录"""
+        log_dir = self.get_game_log_dir()
+        os.makedirs(log_dir, exist_ok=True)
+
+        # 只保留最近的游戏日志，仍在运行的游戏正在写入的日志不删除
+        with self.game_sessions_lock:
+            running_logs = {os.path.basename(path) for path, session in self.game_sessions.items() if session['running']}
+        logs = sorted((file for file in os.listdir(log_dir) if file.endswith('.log.gz') and file not in running_logs), key=lambda file: os.path.getmtime(os.path.join(log_dir, file)))
+        for file in logs[:max(0, len(logs) - self.GAME_LOG_KEEP + 1)]:
+            try:
+                os.remove(os.path.join(log_dir, file))
+            except OSError:
+                pass
+
+        safe_version = re.sub(r'[\\/:*?"<>|]', '_', version)
+        log_path = os.path.join(log_dir, f"{time.strftime('%Y-%m-%d_%H-%M-%S')}_{safe_version}.log.gz")
+        session = {
+            'version': version,
+            'log_path': log_path,
+            'log_file': gzip.open(log_path, 'wt', encoding='utf-8'),
+            'lines': collections.deque(maxlen=self.GAME_CONSOLE_CAPACITY),
+            'count': 0,
+            'level': 'INFO',
+            'lock': threading.Lock(),
+            'running': True
+        }
+        with self.game_sessions_lock:
+            self.game_sessions[log_path] = session
+            # 内存中只保留最近几次启动的输出，仍在运行的会话不移除
+            finished = [path for path, old_session in self.game_sessions.items() if not old_session['running']]
+            for path in finished[:max(0, len(self.game_sessions) - self.GAME_SESSIONS_KEEP)]:
+                del self.game_sessions[path]
+        return session
+
+    def append_game_output(self, session, line):
+        """记录游戏输出的一行，没有级别的行（如异常堆栈）沿用上一行的级别"""
+        if session.get('log_file'):
+            session['log_file'].write(line + '\n')
+        match = self.GAME_LOG_LEVEL_PATTERN.search(line)
+        if match:
+            session['level'] = {'WARNING': 'WARN', 'FATAL': 'ERROR'}.get(match.group(1), match.group(1))
+        with session['lock']:
+            session['lines'].append((session['count'], session['level'], line))
+            session['count'] += 1
+
+    def end_game_session(self, session):
+        """游戏退出后关闭日志文件"""
+        session['running'] = False
+        session['log_file'].close()
+
+    def load_game_session(self, log_path):
+        """获取日志对应的会话，已不在内存中的日志从文件读取最后的部分"""
+        with self.game_sessions_lock:
+            if log_path in self.game_sessions:
+                return self.game_sessions[log_path]
+
+        session = {'version': '', 'log_path': log_path, 'lines': collections.deque(maxlen=self.GAME_CONSOLE_CAPACITY), 'count': 0, 'level': 'INFO', 'lock': threading.Lock(), 'running': False}
+        try:
+            with gzip.open(log_path, 'rt', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    self.append_game_output(session, line.rstrip('\n'))
+        except (OSError, EOFError) as e:
+            # 启动器异常退出时日志文件可能不完整
+            self.log(f"读取游戏日志不完整: {str(e)}", "WARN")
+        return session
+
+    def create_game_console_widgets(self, log_path=None):
+        """创建游戏控制台窗口"""
+        log_dir = self.get_game_log_dir()
+        os.makedirs(log_dir, exist_ok=True)
+        logs = sorted((file for file in os.listdir(log_dir) if file.endswith('.log.gz')), reverse=True)
+        if log_path is None:
+            with self.game_sessions_lock:
+                log_path = next(reversed(self.game_sessions), None)
+        if log_path is None and logs:
+            log_path = os.path.join(log_dir, logs[0])
+
+        console_window = tk.Toplevel(self.root)
+        console_window.title("游戏控制台")
+        console_window.geometry(f"900x550+{int((self.root.winfo_screenwidth()-900)/2)}+{int((self.root.winfo_screenheight()-550)/2)}")
+
+        # 游戏控制台窗口主框架
+        console_main_frame = ttk.Frame(console_window, padding="10")
+        console_main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 顶部框架
+        top_frame = ttk.Frame(console_main_frame)
+        top_frame.pack(fill=tk.X, pady=(0, 10))
+
+        # 选择日志
+        ttk.Label(top_frame, text="日志:").pack(side=tk.LEFT)
+        log_var = tk.StringVar(value=os.path.basename(log_path) if log_path else "")
+        log_combobox = ttk.Combobox(top_frame, textvariable=log_var, values=logs, state="readonly", width=40)
+        log_combobox.pack(side=tk.LEFT, padx=(5, 10))
+
+        # 搜索
+        ttk.Label(top_frame, text="搜索:").pack(side=tk.LEFT)
+        filter_var = tk.StringVar()
+        filter_entry = ttk.Entry(top_frame, textvariable=filter_var, width=20)
+        filter_entry.pack(side=tk.LEFT, padx=(5, 10))
+
+        # 最低日志级别
+        level_var = tk.StringVar(value="全部")
+        level_combobox = ttk.Combobox(top_frame, textvariable=level_var, values=("全部", "INFO", "WARN", "ERROR"), state="readonly", width=8)
+        level_combobox.pack(side=tk.LEFT)
+
+        ttk.Button(top_frame, text="打开日志文件夹", command=lambda: self.open_folder(log_dir)).pack(side=tk.RIGHT)
+
+        # 输出区域
+        console_text = scrolledtext.ScrolledText(console_main_frame, wrap=tk.NONE, state=tk.DISABLED, font=("Consolas", 9))
+        console_text.pack(fill=tk.BOTH, expand=True)
+        console_text.tag_config('WARN', foreground='#b8860b')
+        console_text.tag_config('ERROR', foreground='red')
+
+        view = {'session': None, 'shown': -1, 'lines': 0}
+
+        def matches(level, line):
+            """判断一行是否符合筛选条件"""
+            if level_var.get() != "全部" and self.LOG_LEVELS.get(level, 20) < self.LOG_LEVELS[level_var.get()]:
+                return False
+            search_term = filter_var.get().lower()
+            return not search_term or search_term in line.lower()
+
+        def show_lines(reset=False):
+            """追加新的输出，reset为True时按筛选条件重新显示全部缓冲的行"""
+            session = view['session']
+            console_text.config(state=tk.NORMAL)
+            if reset:
+                console_text.delete("1.0", tk.END)
+                view['shown'] = -1
+                view['lines'] = 0
+            if session:
+                with session['lock']:
+                    new_lines = [entry for entry in session['lines'] if entry[0] > view['shown']]
+                if new_lines:
+                    view['shown'] = new_lines[-1][0]
+                # 相同级别的连续行一次插入
+                chunk_level, chunk = None, []
+                for seq, level, line in new_lines:
+                    if not matches(level, line):
+                        continue
+                    if level != chunk_level and chunk:
+                        console_text.insert(tk.END, "".join(chunk), (chunk_level,))
+                        chunk = []
+                    chunk_level = level
+                    chunk.append(line + "\n")
+                    view['lines'] += 1
+                if chunk:
+                    console_text.insert(tk.END, "".join(chunk), (chunk_level,))
+
+                # 超出容量时一次删除旧的行
+                if view['lines'] > self.GAME_CONSOLE_CAPACITY + self.GAME_CONSOLE_TRIM:
+                    console_text.delete("1.0", f"{view['lines'] - self.GAME_CONSOLE_CAPACITY + 1}.0")
+                    view['lines'] = self.GAME_CONSOLE_CAPACITY
+                if new_lines:
+                    console_text.see(tk.END)
+            console_text.config(state=tk.DISABLED)
+
+        def select_log(event=None):
+            """切换显示的日志"""
+            if log_var.get():
+                view['session'] = self.load_game_session(os.path.join(log_dir, log_var.get()))
+            show_lines(reset=True)
+
+        def refresh():
+            """游戏运行时定时显示新的输出"""
+            if not console_text.winfo_exists():
+                return
+            if view['session'] and view['session']['running']:
+                show_lines()
+            console_window.after(300, refresh)
+
+        log_combobox.bind("<<ComboboxSelected>>", select_log)
+        level_combobox.bind("<<ComboboxSelected>>", lambda event: show_lines(reset=True))
+        filter_entry.bind('<KeyRelease>', lambda event: show_lines(reset=True))
+
+        select_log()
+        refresh()
+
+    # 崩溃分析
+    # (规则, 标题, 建议, 权重, 关键字, 正则表达式)，只有包含关键字的行才会使用正则表达式匹配，正则表达式的第一个捕获组作为详细信息
+    CRASH_RULES = [
+        ('java_version', "Java版本不正确", "请在设置中选择自动选择Java，或安装游戏要求的Java版本", 100,
+         (b'UnsupportedClassVersionError', b'class file', b'requires Java', b' is required'),
+         rb'(?:UnsupportedClassVersionError|compiled by a more recent version of the Java Runtime|Unsupported class file major version)\D*?(?:class file version |major version )?(\d+)|requires Java (\d+)|Java (\d+) or (?:newer|higher|later) is required'),
+        ('out_of_memory', "内存不足", "请在设置中增大最大内存，或减少模组和光影", 90,
+         (b'OutOfMemoryError', b'Could not reserve', b'insufficient memory'),
+         rb'java\.lang\.OutOfMemoryError(?:: ([^\r\n]+))?|Could not reserve enough space for (\S+ ?object heap)|(insufficient memory) for the Java Runtime Environment'),
+        ('duplicate_mod', "模组重复", "请在模组管理中删除重复的模组，只保留一个版本", 80,
+         (b'provided by', b'same id', b'uplicate'),
+         rb'Mod ID:? \'?([\w-]+)\'? (?:is )?provided by (?:multiple|\d+) |Found \d+ mods? with the same id:? \'?([\w-]+)|DuplicateModsFoundException|Found duplicate mods'),
+        ('missing_dependency', "缺少前置模组", "请下载缺少的前置模组，或删除需要它的模组", 70,
+         (b'which is missing', b'mandatory dependencies', b'Requested by', b' requires '),
+         rb'requires (?:any version|version [^\r\n]*?) of \'?([\w-]+)\'?, which is missing|Missing or unsupported mandatory dependencies|Mod ID: \'([\w-]+)\', Requested by|Mod ([\w-]+) requires \S+|requires mod ([\w-]+)'),
+        ('mixin_conflict', "Mixin冲突", "多个模组修改了同一处代码，请尝试逐个禁用最近添加的模组", 60,
+         (b'Mixin', b'InjectionE', b'InvalidInjection'),
+         rb'Mixin apply(?: for mod ([\w-]+))? failed|MixinApplyError|InvalidInjectionException|InjectionError|Mixin transformation of (\S+) failed'),
+        ('crash_report', "游戏崩溃", "请查看崩溃报告的详细内容", 10,
+         (b'Description: ',),
+         rb'^Description: ([^\r\n]+)'),
+    ]
+    CRASH_PATTERN = re.compile(b'|'.join(b'(?P<%s>%s)' % (rule[0].encode(), rule[5]) for rule in CRASH_RULES), re.M)
+    CRASH_KEYWORDS = tuple(keyword for rule in CRASH_RULES for keyword in rule[4])
+    CRASH_MATCHES_PER_RULE = 5
+    CRASH_SCAN_CHUNK = 4 * 1024 * 1024
+
+    def scan_crash_text(self, data, matches):
+        """在文本中匹配崩溃特征，结果追加到matches{规则: [详细信息]}中"""
+        # 先用关键字找出可能匹配的行，避免对整个文件使用正则表达式
+        lines = {}
+        for keyword in self.CRASH_KEYWORDS:
+            position = data.find(keyword)
+            while position != -1:
+                line_start = data.rfind(b'\n', 0, position) + 1
+                line_end = data.find(b'\n', position)
+                if line_end == -1:
+                    line_end = len(data)
+                lines[line_start] = line_end
+                position = data.find(keyword, line_end)
+
+        for line_start in sorted(lines):
+            for match in self.CRASH_PATTERN.finditer(data, line_start, lines[line_start]):
+                key = match.lastgroup
+                details = matches.setdefault(key, [])
+                if len(details) >= self.CRASH_MATCHES_PER_RULE:
+                    continue
+                # 规则中第一个匹配到的捕获组
+                detail = next((group for group in match.groups()[self.CRASH_PATTERN.groupindex[key]:] if group is not None), b'')
+                detail = detail.decode('utf-8', errors='replace').strip()
+                if detail not in details:
+                    details.append(detail)
+
+    def scan_crash_file(self, path, state, final=False):
+        """从上次读取的位置继续扫描文件，文件被替换或截断时从头扫描，返回{规则: [详细信息]}
+
+        final为True表示文件已经写完，最后没有换行符的一行也会被扫描。
+        """
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            head = hashlib.sha1(f.read(256)).hexdigest()
+            if state.get('ino') != stat.st_ino or state.get('head') != head or stat.st_size < state.get('offset', 0):
+                state.clear()
+                state.update({'ino': stat.st_ino, 'head': head, 'offset': 0, 'matches': {}})
+
+            # 只处理到最后一个换行符，剩下的部分留到下次
+            f.seek(state['offset'])
+            while True:
+                data = f.read(self.CRASH_SCAN_CHUNK)
+                if not data:
+                    break
+                end = data.rfind(b'\n') + 1
+                if not end:
+                    if len(data) < self.CRASH_SCAN_CHUNK and not final:
+                        break
+                    end = len(data)
+                self.scan_crash_text(data[:end], state['matches'])
+                state['offset'] += end
+                f.seek(state['offset'])
+        return state['matches']
+
+    def analyze_crash(self, version, since=None, output_lines=None):
+        """分析游戏目录中的崩溃报告和latest.log（以及本次启动的游戏输出），返回按可能性排序的诊断结果"""
+        game_dir = self.get_isolation_dir(version)
+        index_path = os.path.join(game_dir, 'pmcl_crash_index.json')
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+        # 本次启动之后写入的文件
+        sources = []
+        crash_reports_dir = os.path.join(game_dir, 'crash-reports')
+        if os.path.isdir(crash_reports_dir):
+            for file in os.listdir(crash_reports_dir):
+                if file.endswith('.txt'):
+                    sources.append(os.path.join(crash_reports_dir, file))
+        sources.append(os.path.join(game_dir, 'logs', 'latest.log'))
+        sources = [path for path in sources if os.path.isfile(path) and (since is None or os.path.getmtime(path) >= since)]
+        if since is None:
+            # 没有指定时间时只分析最新的崩溃报告
+            crash_reports = sorted((path for path in sources if path.startswith(crash_reports_dir)), key=os.path.getmtime)
+            sources = crash_reports[-1:] + [path for path in sources if not path.startswith(crash_reports_dir)]
+
+        # 游戏仍在运行时latest.log可能还没写完，崩溃报告总是完整的
+        with self.game_sessions_lock:
+            running = any(session['running'] and session['version'] == version for session in self.game_sessions.values())
+
+        results = []
+        for path in sources:
+            state = index.setdefault(os.path.relpath(path, game_dir), {})
+            try:
+                matches = self.scan_crash_file(path, state, path.startswith(crash_reports_dir) or not running)
+            except OSError as e:
+                self.log(f"读取 {path} 失败: {str(e)}", "WARN")
                 continue
-        return False
-    
-    def is_minecraft_running(self):
-        """综合检测Minecraft是否运行"""
-        methods = [
-            self.check_process_by_cmdline,
-            self.check_by_memory_usage
-        ]
-        
-        # 如果任一方法检测到Minecraft，返回True
-        for method in methods:
-            if method() and self.check_by_window():
-                return True
-        return False
-        
-    def _launch_minecraft_thread(self, version, options):
+            results.append((os.path.basename(path), matches))
+
+        if output_lines:
+            matches = {}
+            self.scan_crash_text('\n'.join(output_lines).encode('utf-8', errors='replace'), matches)
+            results.append(("游戏输出", matches))
+
+        # 不再存在的文件不保留记录
+        index = {name: state for name, state in index.items() if os.path.isfile(os.path.join(game_dir, name))}
+        try:
+            with open(f"{index_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(f"{index_path}.tmp", index_path)
+        except OSError:
+            pass
+
+        # 合并各个来源的结果，出现在越多来源中的问题越靠前
+        rules = {rule[0]: rule for rule in self.CRASH_RULES}
+        diagnoses = {}
+        for source, matches in results:
+            for key, details in matches.items():
+                diagnosis = diagnoses.setdefault(key, {'key': key, 'title': rules[key][1], 'suggestion': rules[key][2], 'score': rules[key][3], 'details': [], 'sources': []})
+                diagnosis['score'] += 5
+                diagnosis['sources'].append(source)
+                for detail in details:
+                    if detail and detail not in diagnosis['details']:
+                        diagnosis['details'].append(detail)
+
+        # 根据class文件版本计算需要的Java版本
+        if 'java_version' in diagnoses:
+            diagnoses['java_version']['details'] = [f"需要Java {int(detail) - 44 if int(detail) > 44 else detail}" if detail.isdigit() else detail for detail in diagnoses['java_version']['details']]
+
+        return sorted(diagnoses.values(), key=lambda diagnosis: diagnosis['score'], reverse=True)
+
+    def format_crash_diagnoses(self, diagnoses):
+        """将诊断结果转换为显示的文本"""
+        lines = []
+        for i, diagnosis in enumerate(diagnoses, 1):
+            line = f"{i}. {diagnosis['title']}"
+            if diagnosis['details']:
+                line += f"（{', '.join(diagnosis['details'][:3])}）"
+            lines.append(f"{line}\n   {diagnosis['suggestion']}")
+        return "\n".join(lines)
+
+    def show_crash_analysis(self):
+        """分析当前选择的版本最近一次崩溃"""
+        version = self.launch_version_var.get()
+        if not version:
+            messagebox.showwarning("警告", "请先选择一个版本")
+            return
+
+        def _analyze_crash_thread():
+            try:
+                diagnoses = self.analyze_crash(version)
+            except Exception as e:
+                self.log(f"分析崩溃失败: {str(e)}", "ERROR")
+                self.root.after(0, lambda error=str(e): messagebox.showerror("错误", f"分析崩溃失败: {error}"))
+                return
+            if diagnoses:
+                self.root.after(0, lambda: messagebox.showinfo("崩溃分析", f"{version} 可能的崩溃原因：\n\n{self.format_crash_diagnoses(diagnoses)}"))
+            else:
+                self.root.after(0, lambda: messagebox.showinfo("崩溃分析", f"没有在 {version} 的崩溃报告和日志中发现已知的问题"))
+
+        analyze_crash_thread = threading.Thread(target=_analyze_crash_thread)
+        analyze_crash_thread.daemon = True
+        analyze_crash_thread.start()
+
+    # 启动监视
+    LAUNCH_TIMEOUT = 300
+    LAUNCH_SUCCESS_MARKERS = ('Setting user:', 'LWJGL Version', 'Backend library: LWJGL', '[Render thread/', 'Created: ')
+
+    def decode_game_output(self, raw_line):
+        """解码游戏输出的一行，不是UTF-8时使用系统编码"""
+        try:
+            return raw_line.decode('utf-8')
+        except UnicodeDecodeError:
+            import locale
+            return raw_line.decode(locale.getpreferredencoding(False), errors='replace')
+
+    def run_minecraft(self, version, minecraft_command, on_output=None, profile=None):
+        """启动游戏进程并读取其输出检测是否启动成功，游戏退出后返回退出代码"""
+        print(str(minecraft_command))
+        session = self.start_game_session(version)
+        launch_time = time.time()
+        try:
+            with self.launch_phase(profile, "创建进程"):
+                process = subprocess.Popen(minecraft_command, cwd=self.minecraft_directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except Exception as e:
+            # 进程没有启动时结束日志会话，控制台中不再显示为运行中
+            self.append_game_output(session, f"启动进程失败: {str(e)}")
+            self.end_game_session(session)
+            self.save_launch_profile(profile)
+            raise
+        self.log("Minecraft已启动，请等待窗口出现", "INFO")
+
+        # 重新启用启动按钮
+        self.launch_button.config(state=tk.NORMAL)
+
+        started = threading.Event()
+
+        def watch_timeout():
+            """超时后停止等待启动"""
+            if not started.wait(self.LAUNCH_TIMEOUT) and process.poll() is None:
+                self.log(f"Minecraft {version} 在{self.LAUNCH_TIMEOUT}秒内没有启动，已自动超时", "WARN")
+
+        watch_timeout_thread = threading.Thread(target=watch_timeout)
+        watch_timeout_thread.daemon = True
+        watch_timeout_thread.start()
+
+        # 读取游戏输出直到进程结束，同时写入日志文件
+        try:
+            for raw_line in process.stdout:
+                line = self.decode_game_output(raw_line).rstrip('\r\n')
+                self.append_game_output(session, line)
+                self.check_launch_milestones(profile, line)
+                if not started.is_set() and any(marker in line for marker in self.LAUNCH_SUCCESS_MARKERS):
+                    started.set()
+                    self.log(f"Minecraft {version} 启动成功！", "INFO")
+                if on_output:
+                    on_output(line)
+            returncode = process.wait()
+        finally:
+            started.set()
+            self.end_game_session(session)
+            self.save_launch_profile(profile)
+
+        if returncode:
+            self.log(f"游戏以错误代码{returncode}退出，日志已保存至: {session['log_path']}", "WARN")
+
+            # 分析本次启动之后的崩溃报告、latest.log和游戏输出
+            with session['lock']:
+                output_lines = [line for _, _, line in session['lines']]
+            try:
+                diagnoses = self.analyze_crash(version, launch_time - 2, output_lines)
+            except Exception as e:
+                self.log(f"分析崩溃失败: {str(e)}", "WARN")
+                diagnoses = []
+            message = f"游戏以错误代码{returncode}退出"
+            if diagnoses:
+                self.log(f"可能的崩溃原因: {', '.join(diagnosis['title'] for diagnosis in diagnoses)}", "WARN")
+                message += f"，可能的原因：\n\n{self.format_crash_diagnoses(diagnoses)}\n\n"
+            else:
+                message += "，"
+
+            def show_error():
+                if messagebox.askyesno("错误", f"{message}是否查看游戏日志？"):
+                    self.create_game_console_widgets(session['log_path'])
+            self.root.after(0, show_error)
+        else:
+            self.log("游戏正常退出", "INFO")
+        return returncode
+        
+    def _launch_minecraft_thread(self, version, options, profile=None):
         """在后台线程中启动Minecraft（离线模式）"""
         try:
             self.log("正在启动Minecraft...", "INFO")
             version = self.launch_version_var.get()
 
             # 保存用户名
-            self.save_settings()
+            with self.launch_phase(profile, "保存设置"):
+                self.save_settings()
             
-            # 应用内存设置
-            if hasattr(self, 'memory_var'):
-                memory = self.memory_var.get()
-                if memory and memory.isdigit():
-                    options["jvmArguments"] = [f"-Xmx{memory}m"]
+            # 应用内存和JVM设置
+            with self.launch_phase(profile, "JVM参数"):
+                options["jvmArguments"] = self.build_jvm_arguments(version)
             
             # 设置中文
             if not os.path.exists(f'{self.isolation_dir}/options.txt'):
@@ -1530,75 +4310,34 @@ class MinecraftLauncherGUI:
             
             # 如果设置了皮肤路径，则复制皮肤文件
             username = self.username_var.get()
-            if self.skin_path and os.path.exists(self.skin_path):
-                try:
-                    import shutil
-                    skins_dir = f'{self.isolation_dir}/CustomSkinLoader'
-                    if os.path.exists(skins_dir):
-                        if os.path.exists(f'{skins_dir}/LocalSkin/skins/{username}.png'):
-                            os.remove(f'{skins_dir}/LocalSkin/skins/{username}.png')
-                        shutil.copy2(self.skin_path, f'{skins_dir}/LocalSkin/skins/{username}.png')
-                        self.log(f"皮肤已应用: {self.skin_path}", "INFO")
-                    else:
-                        skins_dir = f'{self.minecraft_directory}/cachedImages/skins'
+            with self.launch_phase(profile, "应用皮肤"):
+                if self.skin_path and os.path.exists(self.skin_path):
+                    try:
+                        import shutil
+                        skins_dir = f'{self.isolation_dir}/CustomSkinLoader'
                         if os.path.exists(skins_dir):
-                            if os.path.exists(f'{skins_dir}/cachedImages/skins/{username}.png'):
-                                os.remove(f'{skins_dir}/cachedImages/skins/{username}.png')
-                            shutil.copy2(self.skin_path, f'{skins_dir}/{username}.png')
+                            if os.path.exists(f'{skins_dir}/LocalSkin/skins/{username}.png'):
+                                os.remove(f'{skins_dir}/LocalSkin/skins/{username}.png')
+                            shutil.copy2(self.skin_path, f'{skins_dir}/LocalSkin/skins/{username}.png')
                             self.log(f"皮肤已应用: {self.skin_path}", "INFO")
                         else:
-                            self.log("应用皮肤失败: 未找到CustomSkinLoader或OfflineSkins", "WARN")
-                except Exception as e:
-                    self.log(f"应用皮肤失败: {str(e)}", "ERROR")
+                            skins_dir = f'{self.minecraft_directory}/cachedImages/skins'
+                            if os.path.exists(skins_dir):
+                                if os.path.exists(f'{skins_dir}/cachedImages/skins/{username}.png'):
+                                    os.remove(f'{skins_dir}/cachedImages/skins/{username}.png')
+                                shutil.copy2(self.skin_path, f'{skins_dir}/{username}.png')
+                                self.log(f"皮肤已应用: {self.skin_path}", "INFO")
+                            else:
+                                self.log("应用皮肤失败: 未找到CustomSkinLoader或OfflineSkins", "WARN")
+                    except Exception as e:
+                        self.log(f"应用皮肤失败: {str(e)}", "ERROR")
             
             # 获取启动命令
-            minecraft_command = minecraft_launcher_lib.command.get_minecraft_command(
-                version, 
-                self.minecraft_directory, 
-                options
-            )
-            for i, arg in enumerate(minecraft_command):
-                if arg == "--versionType":
-                    minecraft_command[i + 1] = "PMCL"
-                    break
-            
-            if not self.use_java:
-                minecraft_command[0] = 'javaw'.join(minecraft_command[0].rsplit('java', 1))
-                
-            print(str(minecraft_command))
-            self.log("Minecraft已启动，请等待窗口出现", "INFO")
-
-            # 重新启用启动按钮
-            self.launch_button.config(state=tk.NORMAL)
+            with self.launch_phase(profile, "生成启动命令"):
+                minecraft_command = self.get_launch_command(version, options)
 
-            result = None
-
-            def detect_launch():
-                """检测Minecraft启动"""
-                # 记录时间
-                launch_time = time.time()
-                while True:
-                    if self.is_minecraft_running():
-                        self.log(f"Minecraft {version} 启动成功！", "INFO")
-                        return
-                    if (time.time() - launch_time) > 300: # 5分钟后自动超时
-                        self.log(f"Minecraft {version} 没有启动，已自动超时", "WARN")
-                    if result:
-                        return
-                    time.sleep(0.1)
-
-            # 检测启动
-            detect_launch_thread = threading.Thread(target=detect_launch)
-            detect_launch_thread.daemon = True
-            detect_launch_thread.start()
-            
-            # 启动Minecraft
-            result = subprocess.run(minecraft_command, cwd=self.minecraft_directory)
-            if result.returncode:
-                self.log(f"游戏以错误代码{result.returncode}退出", "WARN")
-                messagebox.showerror("错误", f"游戏以错误代码{result.returncode}退出")
-            else:
-                self.log("游戏正常退出", "INFO")
+            # 启动Minecraft并等待游戏退出
+            self.run_minecraft(version, minecraft_command, profile=profile)
         except Exception as e:
             self.log(f"启动失败: {str(e)}", "ERROR")
             messagebox.showerror("错误", f"启动失败: {str(e)}")
@@ -1606,20 +4345,22 @@ class MinecraftLauncherGUI:
             # 重新启用启动按钮
             self.launch_button.config(state=tk.NORMAL)
             
-    def _launch_minecraft_with_littleskin(self, version, options):
+    def _launch_minecraft_with_littleskin(self, version, options, profile=None):
         """在后台线程中启动Minecraft（LittleSkin模式）"""
         try:
             self.log("正在通过LittleSkin启动Minecraft...", "INFO")
             
             # 保存LittleSkin邮箱（不保存密码）
-            self.save_littleskin_credentials()
+            with self.launch_phase(profile, "保存设置"):
+                self.save_littleskin_credentials()
             
             # 获取LittleSkin凭证
             email = self.littleskin_email_var.get()
             password = self.littleskin_password_var.get()
             
             # 使用LittleSkin进行认证
-            auth_data = self.authenticate_with_littleskin(email, password)
+            with self.launch_phase(profile, "LittleSkin认证"):
+                auth_data = self.authenticate_with_littleskin(email, password)
             if not auth_data:
                 return
                 
@@ -1628,11 +4369,9 @@ class MinecraftLauncherGUI:
             options["uuid"] = auth_data["uuid"]
             options["token"] = auth_data["access_token"]
             
-            # 添加内存设置
-            if hasattr(self, 'memory_var'):
-                memory = self.memory_var.get()
-                if memory and memory.isdigit():
-                    options["jvmArguments"] = [f"-Xmx{memory}m"]
+            # 应用内存和JVM设置
+            with self.launch_phase(profile, "JVM参数"):
+                options["jvmArguments"] = self.build_jvm_arguments(version)
             
             # 添加Yggdrasil服务器参数
             options["customResolution"] = True
@@ -1647,78 +4386,25 @@ class MinecraftLauncherGUI:
             username = auth_data["username"]
             self.log("正在使用littleskin启动，不使用本地皮肤", "INFO")
             
-            # 获取启动命令（添加Yggdrasil参数）
-            minecraft_command = minecraft_launcher_lib.command.get_minecraft_command(
-                version, 
-                self.minecraft_directory, 
-                options
-            )
-            
             # 添加authlib-injector参数以使用LittleSkin
             authlib_injector_path = f"{self.minecraft_directory}/authlib-injector.jar"
             if not os.path.exists(authlib_injector_path):
                 self.log("正在下载authlib-injector.jar...", "INFO")
                 # 下载authlib-injector.jar
-                with open(authlib_injector_path, 'wb') as f:
+                with self.launch_phase(profile, "下载authlib-injector"), open(authlib_injector_path, 'wb') as f:
                     f.write(self.get_from_server('https://pmcldownloadserver.dpdns.org/authlib-injector.jar'))
             if os.path.exists(authlib_injector_path):
-                # 在命令中添加-javaagent参数
-                java_agent_index = -1
-                for i, arg in enumerate(minecraft_command):
-                    if arg == "-cp" or arg == "-classpath":
-                        java_agent_index = i
-                    if arg == "--versionType":
-                        minecraft_command[i + 1] = "PMCL"
-                
-                if java_agent_index != -1:
-                    minecraft_command.insert(java_agent_index, f"-javaagent:{authlib_injector_path}=https://littleskin.cn/api/yggdrasil")
-                    minecraft_command.insert(java_agent_index, "-Dauthlibinjector.side=client")
-                else:
-                    # 如果没有找到-cp参数，则在java命令后直接添加
-                    if "java" in minecraft_command[0].lower():
-                        minecraft_command.insert(1, f"-javaagent:{authlib_injector_path}=https://littleskin.cn/api/yggdrasil")
-                        minecraft_command.insert(1, "-Dauthlibinjector.side=client")
+                jvm_arguments = ["-Dauthlibinjector.side=client", f"-javaagent:{authlib_injector_path}=https://littleskin.cn/api/yggdrasil"]
             else:
                 self.log("警告: 未找到authlib-injector.jar，将使用默认认证", "WARN")
+                jvm_arguments = []
 
-            if not self.use_java:
-                minecraft_command[0] = 'javaw'.join(minecraft_command[0].rsplit('java', 1))
-                
-            print(str(minecraft_command))
-            self.log("Minecraft已启动，请等待窗口出现", "INFO")
-
-            # 重新启用启动按钮
-            self.launch_button.config(state=tk.NORMAL)
+            # 获取启动命令（添加Yggdrasil参数）
+            with self.launch_phase(profile, "生成启动命令"):
+                minecraft_command = self.get_launch_command(version, options, jvm_arguments)
 
-            result = None
-
-            def detect_launch():
-                """检测Minecraft启动"""
-                # 记录时间
-                launch_time = time.time()
-                while True:
-                    if self.is_minecraft_running():
-                        self.log(f"Minecraft {version} 启动成功！", "INFO")
-                        return
-                    if (time.time() - launch_time) > 300: # 5分钟后自动超时
-                        self.log(f"Minecraft {version} 没有启动，已自动超时", "WARN")
-                    if result:
-                        return
-                    time.sleep(0.1)
-
-            # 检测启动
-            detect_launch_thread = threading.Thread(target=detect_launch)
-            detect_launch_thread.daemon = True
-            detect_launch_thread.start()
-
-            # 启动Minecraft
-            result = subprocess.run(minecraft_command, cwd=self.minecraft_directory)
-            
-            if result.returncode:
-                self.log(f"游戏以错误代码{result.returncode}退出", "WARN")
-                messagebox.showerror("错误", f"游戏以错误代码{result.returncode}退出")
-            else:
-                self.log("游戏正常退出", "INFO")
+            # 启动Minecraft并等待游戏退出
+            self.run_minecraft(version, minecraft_command, profile=profile)
         except Exception as e:
             self.log(f"启动失败: {str(e)}", "ERROR")
             messagebox.showerror("错误", f"启动失败: {str(e)}")
@@ -1835,7 +4521,7 @@ class MinecraftLauncherGUI:
         self.log("正在获取版本列表...", "INFO")
         try:
             # 获取所有可用版本
-            versions = minecraft_launcher_lib.utils.get_version_list()
+            versions = self.get_minecraft_version_list(self.refresh_widget(self.download_version_combobox, self.load_version_list))
             if self.show_non_release_var.get():
                 self.version_list = [version['id'] for version in versions]
             else:
@@ -1865,10 +4551,9 @@ class MinecraftLauncherGUI:
         version = self.download_version_var.get()
         modloader = self.download_modloader_var.get()
         version_list = []
+        on_update = self.refresh_widget(self.download_version_combobox, lambda: self.load_minecraft_modloader_version(None))
         if modloader == "Forge":
-            for forge_version in minecraft_launcher_lib.forge.list_forge_versions():
-                if f' {version}-' in f' {forge_version}':
-                    version_list.append(forge_version)
+            version_list = self.get_forge_versions_for(version, on_update)
 
             self.forge_version_combobox['value'] = version_list
             if version_list:
@@ -1877,9 +4562,7 @@ class MinecraftLauncherGUI:
                 self.forge_version_var.set('')
 
         elif modloader == "Fabric":
-            if minecraft_launcher_lib.fabric.is_minecraft_version_supported(version):
-                for fabric_version in minecraft_launcher_lib.fabric.get_all_loader_versions():
-                    version_list.append(fabric_version.get('version', ''))
+            version_list = self.get_modloader_versions('fabric', version, on_update)
 
             self.fabric_version_combobox['value'] = version_list
             if version_list:
@@ -1888,9 +4571,7 @@ class MinecraftLauncherGUI:
                 self.fabric_version_var.set('')
 
         elif modloader == "Quilt":
-            if minecraft_launcher_lib.fabric.is_minecraft_version_supported(version):
-                for quilt_version in minecraft_launcher_lib.quilt.get_all_loader_versions():
-                    version_list.append(quilt_version.get('version', ''))
+            version_list = self.get_modloader_versions('quilt', version, on_update)
 
             self.quilt_version_combobox['value'] = version_list
             if version_list:
@@ -1963,18 +4644,7 @@ class MinecraftLauncherGUI:
             "setMax": set_max
         }
 
-        java_exe = 'java.exe' if platform.system().lower() == 'windows' else 'java'
-        java_path = None
-        for root, dirs, files in os.walk(self.minecraft_directory):
-            if java_exe in files:
-                java_path = os.path.join(root, java_exe)
-
-        if not java_path:
-            self.log("没有检测到Java，正在安装……", "INFO")
-            minecraft_launcher_lib.runtime.install_jvm_runtime(minecraft_launcher_lib.runtime.get_jvm_runtimes()[0], self.minecraft_directory, callback=callback)
-            for root, dirs, files in os.walk(self.minecraft_directory):
-                if java_exe in files:
-                    java_path = os.path.join(root, java_exe)
+        java_path = self.get_java_for_install(version, self.log, callback)
 
         if modloader == '原版':
             try:
@@ -2190,9 +4860,8 @@ class MinecraftLauncherGUI:
     def _exit(self):
         try:
             if messagebox.askyesno("提示","你是否要退出启动器？"):
-                print(f"[{time.asctime()}] 程序正常退出")
-                with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
-                    f.write(f"[{time.asctime()}] 程序正常退出\n")
+                self.log_queue.put(f"[{time.asctime()}] 程序正常退出")
+                self.stop_logger()
                 sys.exit(0)
         except:
             sys.exit(0)
@@ -2210,10 +4879,17 @@ class MinecraftLauncherGUI:
         download_menu.add_command(label="下载光影包", command=self.create_shader_download_widgets)
         download_menu.add_command(label="下载数据包", command=self.create_datapack_download_widgets)
         download_menu.add_command(label="下载整合包", command=self.create_modpack_download_widgets)
+        download_menu.add_separator()
+        download_menu.add_command(label="下载管理", command=self.create_download_manager_widgets)
         
-        # 工具菜单 (仅Windows可见)
+        # 工具菜单
         tools_menu = tk.Menu(menu, tearoff=False)
-        tools_menu.add_command(label="清理游戏垃圾", command=self.clean_game)
+        if platform.system().lower() == 'windows':
+            tools_menu.add_command(label="清理游戏垃圾", command=self.clean_game)
+        tools_menu.add_command(label="清理共享存储", command=self.clean_store)
+        tools_menu.add_command(label="游戏控制台", command=self.create_game_console_widgets)
+        tools_menu.add_command(label="分析崩溃", command=self.show_crash_analysis)
+        tools_menu.add_command(label="启动耗时", command=self.create_launch_history_widgets)
 
         # 帮助菜单
         help_menu = tk.Menu(menu, tearoff = False)
@@ -2231,8 +4907,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         # 主菜单
         menu.add_cascade(label="下载", menu=download_menu)
         menu.add_command(label="设置", command=self.create_settings_widgets)
-        if platform.system().lower() == 'windows':
-            menu.add_cascade(label="工具", menu=tools_menu)
+        menu.add_cascade(label="工具", menu=tools_menu)
         menu.add_cascade(label="帮助", menu=help_menu)
 
         # 配置菜单
@@ -2252,6 +4927,13 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                     self.username_var.set(settings.get("offline_username", ""))
                     self.littleskin_email_var.set(settings.get("littleskin_email", ""))
                     self.memory = settings.get("memory", None)
+                    self.jvm_profiles = settings.get("jvm_profiles", {})
+                    self.download_threads = settings.get("download_threads", 8)
+                    self.use_shared_store = settings.get("use_shared_store", True)
+                    self.max_downloads = settings.get("max_downloads", 16)
+                    self.max_downloads_per_host = settings.get("max_downloads_per_host", 8)
+                    self.download_speed_limit = settings.get("download_speed_limit", 0)
+                    self.log_level = settings.get("log_level", "INFO")
             
             if platform.system().lower() != 'windows':
                 self.use_java = True
@@ -2269,7 +4951,14 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 "skin_path": self.skin_path,
                 "offline_username": self.username_var.get(),
                 "littleskin_email": self.littleskin_email_var.get(),
-                "memory": self.memory
+                "memory": self.memory,
+                "jvm_profiles": self.jvm_profiles,
+                "download_threads": self.download_threads,
+                "use_shared_store": self.use_shared_store,
+                "max_downloads": self.max_downloads,
+                "max_downloads_per_host": self.max_downloads_per_host,
+                "download_speed_limit": self.download_speed_limit,
+                "log_level": self.log_level
             }
             with open(settings_file, "w") as f:
                 json.dump(settings, f, indent=2)
@@ -2321,13 +5010,43 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         memory_frame = ttk.LabelFrame(smain_frame, text="内存设置", padding="10")
         memory_frame.pack(fill=tk.X, pady=(0, 10))
         
-        ttk.Label(memory_frame, text="最大内存 (可选，以MB为单位):").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        ttk.Label(memory_frame, text="最大内存 (以MB为单位，留空为根据模组数量自动分配):").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
         self.memory_var = tk.StringVar(value=self.memory if self.memory else "")
         self.memory_entry = ttk.Entry(memory_frame, textvariable=self.memory_var, width=30)
         self.memory_entry.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 5))
         ttk.Label(memory_frame, text="建议: 2048(2GB), 4096(4GB), 8192(8GB)").grid(row=2, column=0, sticky=tk.W, pady=(0, 5))
         
         memory_frame.columnconfigure(0, weight=1)
+
+        # 下载设置框架
+        download_settings_frame = ttk.LabelFrame(smain_frame, text="下载设置", padding="10")
+        download_settings_frame.pack(fill=tk.X, pady=(0, 10))
+
+        ttk.Label(download_settings_frame, text="同时下载的文件数:").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        self.download_threads_var = tk.StringVar(value=str(self.download_threads))
+        self.download_threads_spinbox = ttk.Spinbox(download_settings_frame, from_=1, to=64, textvariable=self.download_threads_var, width=28)
+        self.download_threads_spinbox.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 5))
+
+        self.use_shared_store_var = tk.BooleanVar(value=self.use_shared_store)
+        ttk.Checkbutton(download_settings_frame, text="使用共享存储（不同版本的相同模组和资源包只保存一份）", variable=self.use_shared_store_var).grid(row=2, column=0, sticky=tk.W, pady=(0, 5))
+
+        # 下载队列限制
+        download_limits_frame = ttk.Frame(download_settings_frame)
+        download_limits_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(0, 5))
+
+        ttk.Label(download_limits_frame, text="全局最大下载数:").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        self.max_downloads_var = tk.StringVar(value=str(self.max_downloads))
+        ttk.Spinbox(download_limits_frame, from_=1, to=64, textvariable=self.max_downloads_var, width=8).grid(row=0, column=1, sticky=tk.W, padx=(5, 15), pady=(0, 5))
+
+        ttk.Label(download_limits_frame, text="每个服务器最大下载数:").grid(row=0, column=2, sticky=tk.W, pady=(0, 5))
+        self.max_downloads_per_host_var = tk.StringVar(value=str(self.max_downloads_per_host))
+        ttk.Spinbox(download_limits_frame, from_=1, to=64, textvariable=self.max_downloads_per_host_var, width=8).grid(row=0, column=3, sticky=tk.W, padx=(5, 0), pady=(0, 5))
+
+        ttk.Label(download_limits_frame, text="限速 (KB/s，0为不限速):").grid(row=1, column=0, columnspan=2, sticky=tk.W)
+        self.download_speed_limit_var = tk.StringVar(value=str(self.download_speed_limit))
+        ttk.Entry(download_limits_frame, textvariable=self.download_speed_limit_var, width=10).grid(row=1, column=2, sticky=tk.W)
+
+        download_settings_frame.columnconfigure(0, weight=1)
         
         # 皮肤设置框架
         skin_frame = ttk.LabelFrame(smain_frame, text="皮肤设置", padding="10")
@@ -2358,7 +5077,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         self.load_settings()
 
         # 根据是否使用自定义Java调整窗口大小
-        self.settings_window.geometry(f"500x{470 if self.use_custom_java_var.get() else 560}+{int((self.root.winfo_screenwidth()-500)/2)}+{int((self.root.winfo_screenheight()-(470 if self.use_custom_java_var.get() else 560))/2)}")
+        self.settings_window.geometry(f"500x{660 if self.use_custom_java_var.get() else 750}+{int((self.root.winfo_screenwidth()-500)/2)}+{int((self.root.winfo_screenheight()-(660 if self.use_custom_java_var.get() else 750))/2)}")
 
         if self.use_custom_java_var.get():
             self.use_java_var.set(self.use_java)
@@ -2383,12 +5102,39 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 return
             
         # 获取内存设置
-        memory = self.memory_var.get()
+        memory = self.memory_var.get().strip()
+        if memory and (not memory.isdigit() or int(memory) < 512):
+            messagebox.showwarning("警告", "最大内存应为不小于512的整数！")
+            return
         if memory:
             self.memory = memory
         else:
             self.memory = None
             
+        # 获取下载设置
+        download_threads = self.download_threads_var.get()
+        if not download_threads.isdigit() or not 1 <= int(download_threads) <= 64:
+            messagebox.showwarning("警告", "同时下载的文件数应为1~64之间的整数！")
+            return
+        max_downloads = self.max_downloads_var.get()
+        max_downloads_per_host = self.max_downloads_per_host_var.get()
+        if not max_downloads.isdigit() or not 1 <= int(max_downloads) <= 64 or not max_downloads_per_host.isdigit() or not 1 <= int(max_downloads_per_host) <= 64:
+            messagebox.showwarning("警告", "最大下载数应为1~64之间的整数！")
+            return
+        download_speed_limit = self.download_speed_limit_var.get()
+        if not download_speed_limit.isdigit():
+            messagebox.showwarning("警告", "限速应为不小于0的整数！")
+            return
+        self.download_threads = int(download_threads)
+        self.use_shared_store = self.use_shared_store_var.get()
+
+        # 等待中的下载按新的限制重新排队
+        with self.download_condition:
+            self.max_downloads = int(max_downloads)
+            self.max_downloads_per_host = int(max_downloads_per_host)
+            self.download_speed_limit = int(download_speed_limit)
+            self.download_condition.notify_all()
+            
         # 获取皮肤路径
         skin_path = self.skin_path_var.get()
         if skin_path:
@@ -2411,12 +5157,12 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             self.use_java_checkbox.config(state=tk.NORMAL if platform.system().lower() == 'windows' else tk.DISABLED)
             self.use_java_var.set(self.use_java if platform.system().lower() == 'windows' else True)
             self.custom_java_frame.grid_remove()
-            self.settings_window.geometry(f"500x470+{int((self.root.winfo_screenwidth()-500)/2)}+{int((self.root.winfo_screenheight()-470)/2)}")
+            self.settings_window.geometry(f"500x660+{int((self.root.winfo_screenwidth()-500)/2)}+{int((self.root.winfo_screenheight()-660)/2)}")
         else:
             self.use_java_checkbox.config(state=tk.DISABLED)
             self.use_java_var.set(True)
             self.custom_java_frame.grid()
-            self.settings_window.geometry(f"500x560+{int((self.root.winfo_screenwidth()-500)/2)}+{int((self.root.winfo_screenheight()-560)/2)}")
+            self.settings_window.geometry(f"500x750+{int((self.root.winfo_screenwidth()-500)/2)}+{int((self.root.winfo_screenheight()-750)/2)}")
             
     # 创建数据包下载窗口
     def create_datapack_download_widgets(self):
@@ -2520,7 +5266,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         self.datapack_log("正在获取版本列表...", "INFO")
         try:
             # 获取所有可用版本
-            versions = minecraft_launcher_lib.utils.get_version_list()
+            versions = self.get_minecraft_version_list(self.refresh_widget(self.datapack_mc_version_combobox, self.load_datapack_version_list))
             if self.show_non_release_datapack_var.get():
                 self.version_list = [version['id'] for version in versions]
             else:
@@ -2534,12 +5280,6 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             # 更新下拉列表
             self.datapack_mc_version_combobox['value'] = self.version_list
 
-            try:
-                self.datapack_minecraft_version_combobox['value'] = self.version_list
-                if self.version_list:
-                    self.datapack_minecraft_version_var.set(self.version_list[0])
-            except:
-                pass
             
             # 设置默认选中版本为最新版本
             if self.version_list:
@@ -2552,13 +5292,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
     def datapack_log(self, message, level):
         """在数据包日志区域显示消息"""
-        print(f"[{time.asctime()}] [datapack/{level}] {message}")
-        with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
-            f.write(f"[{time.asctime()}] [datapack/{level}] {message}\n")
-        self.datapack_log_text.config(state=tk.NORMAL)
-        self.datapack_log_text.insert(tk.END, message + "\n")
-        self.datapack_log_text.config(state=tk.DISABLED)
-        self.datapack_log_text.see(tk.END)
+        self.write_log("datapack", message, level, ['datapack_log_text'])
         
     def search_datapacks(self):
         """搜索数据包"""
@@ -2613,10 +5347,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             url = base_url + '?' + urllib.parse.urlencode(params)
             
             # 发送请求
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            data = json.loads(response.read().decode())
+            data = json.loads(self.http_request(url).decode())
             
             # 在主线程中更新UI
             self.datapack_window.after(0, self._update_datapacks_tree, data)
@@ -2699,8 +5430,8 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         download_thread.start()
         
     def select_datapack_version(self, versions_data, project_name):
-        """选择数据包版本"""
-        self.versions_data = versions_data
+        """选择数据包版本（在主线程中调用），返回Future，确认后结果为{'version_id', 'instance', 'world'}，取消时为None"""
+        future = concurrent.futures.Future()
 
         # 创建版本选择窗口
         version_window = tk.Toplevel(self.datapack_window)
@@ -2722,32 +5453,57 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         top_frame = ttk.Frame(version_main_frame, padding="0")
         top_frame.pack(fill=tk.BOTH, expand=True)
 
+        # 加载已安装的版本
+        self.load_installed_versions()
+
         # 选择想要安装数据包的已安装版本
-        self.install_datapack_version_var = tk.StringVar()
-        self.install_datapack_version_combobox = ttk.Combobox(top_frame, textvariable=self.install_datapack_version_var, state="readonly", width=20)
-        self.install_datapack_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.install_datapack_version_combobox['values'] = self.installed_versions
-        self.install_datapack_version_var.set(self.installed_versions[0])
-        self.install_datapack_version_combobox.bind("<<ComboboxSelected>>", self.load_world_list)
+        install_version_var = tk.StringVar()
+        install_version_combobox = ttk.Combobox(top_frame, textvariable=install_version_var, state="readonly", width=20)
+        install_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        install_version_combobox['values'] = self.installed_versions
+        install_version_var.set(self.installed_versions[0])
+        install_version_combobox.bind("<<ComboboxSelected>>", lambda event: load_world_list())
 
         # 选择想要安装数据包的MC版本
-        self.datapack_minecraft_version_var = tk.StringVar()
-        self.datapack_minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=self.datapack_minecraft_version_var, state="readonly", width=20)
-        self.datapack_minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.datapack_minecraft_version_combobox['values'] = self.installed_versions
-        self.datapack_minecraft_version_var.set(self.installed_versions[0])
-        self.datapack_minecraft_version_combobox.bind("<<ComboboxSelected>>", self.load_datapack_list)
-
-        self.load_datapack_version_list()
+        minecraft_version_var = tk.StringVar()
+        minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=minecraft_version_var, state="readonly", width=20)
+        minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        minecraft_version_combobox['values'] = self.datapack_mc_version_combobox['values']
+        minecraft_version_var.set("全部")
+        minecraft_version_combobox.bind("<<ComboboxSelected>>", lambda event: load_version_list())
         
         # 选择想要安装数据包的世界    
-        self.install_datapack_world_var = tk.StringVar()
-        self.install_datapack_world_combobox = ttk.Combobox(version_main_frame, textvariable=self.install_datapack_world_var, state="readonly", width=40)
-        self.install_datapack_world_combobox.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        
-        # 加载版本和世界列表
-        self.load_installed_versions()
-        self.load_world_list()
+        world_var = tk.StringVar()
+        world_combobox = ttk.Combobox(version_main_frame, textvariable=world_var, state="readonly", width=40)
+        world_combobox.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+
+        def load_world_list():
+            """加载世界列表"""
+            try:
+                # 获取存档目录
+                saves_dir = f"{self.get_isolation_dir(install_version_var.get())}/saves"
+                if not os.path.exists(saves_dir):
+                    os.makedirs(saves_dir)
+                    
+                # 获取世界列表
+                worlds = []
+                for item in os.listdir(saves_dir):
+                    item_path = os.path.join(saves_dir, item)
+                    if os.path.isdir(item_path):
+                        # 检查是否是有效的Minecraft世界
+                        if os.path.exists(os.path.join(item_path, "level.dat")):
+                            worlds.append(item)
+                
+                # 更新下拉列表
+                world_combobox['values'] = worlds
+                
+                # 设置默认选中世界
+                world_var.set(worlds[0] if worlds else "")
+            except Exception as e:
+                self.datapack_log(f"加载世界列表失败: {str(e)}", "ERROR")
+
+        # 加载世界列表
+        load_world_list()
         
         # 版本列表框架
         version_list_frame = ttk.Frame(version_main_frame)
@@ -2755,62 +5511,53 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         
         # 创建Treeview来显示版本列表
         version_columns = ('version', 'datapack_filename', 'mc_version', 'type', 'date')
-        self.version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
+        version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
         
         # 定义列标题
-        self.version_tree.heading('version', text='版本')
-        self.version_tree.heading('datapack_filename', text='文件名')
-        self.version_tree.heading('mc_version', text='MC版本')
-        self.version_tree.heading('type', text='类型')
-        self.version_tree.heading('date', text='发布日期')
+        version_tree.heading('version', text='版本')
+        version_tree.heading('datapack_filename', text='文件名')
+        version_tree.heading('mc_version', text='MC版本')
+        version_tree.heading('type', text='类型')
+        version_tree.heading('date', text='发布日期')
         
         # 设置列宽
-        self.version_tree.column('version', width=70)
-        self.version_tree.column('datapack_filename', width=200)
-        self.version_tree.column('mc_version', width=360)
-        self.version_tree.column('type', width=50)
-        self.version_tree.column('date', width=120)
+        version_tree.column('version', width=70)
+        version_tree.column('datapack_filename', width=200)
+        version_tree.column('mc_version', width=360)
+        version_tree.column('type', width=50)
+        version_tree.column('date', width=120)
         
         # 添加滚动条
-        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=self.version_tree.yview)
-        self.version_tree.configure(yscrollcommand=version_scrollbar.set)
+        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=version_tree.yview)
+        version_tree.configure(yscrollcommand=version_scrollbar.set)
         
         # 布局
-        self.version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         version_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 填充版本数据
-        for version in versions_data:
-            if self.datapack_minecraft_version_var.get() in version.get('game_versions', []) or self.datapack_minecraft_version_var.get() == "全部":
-                self.version_tree.insert('', tk.END, values=(
-                    version.get('version_number', '未知'),
-                    version.get('files', [])[0].get('filename', '未知'),
-                    ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                    version.get('version_type', '未知'),
-                    version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                ), tags=(version.get('id'),))
-        
-        # 选择的版本变量
-        selected_version = [None]  # 使用列表以便在内部函数中修改
-
-        def on_version_select(event):
-            """当选择版本时"""
-            selection = self.version_tree.selection()
-            if selection:
-                item = self.version_tree.item(selection[0])
-                tags = item['tags']
-                if tags:
-                    selected_version[0] = tags[0]
+        def load_version_list():
+            """按筛选条件填充版本数据"""
+            version_tree.delete(*version_tree.get_children())
+            for version in versions_data:
+                if minecraft_version_var.get() in version.get('game_versions', []) or minecraft_version_var.get() == "全部":
+                    version_tree.insert('', tk.END, values=(
+                        version.get('version_number', '未知'),
+                        version.get('files', [])[0].get('filename', '未知'),
+                        ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
+                        version.get('version_type', '未知'),
+                        version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
+                    ), tags=(version.get('id'),))
+
+        load_version_list()
         
         def confirm_selection():
             """确认选择"""
-            if selected_version[0] is None:
+            selection = version_tree.selection()
+            if not selection or not version_tree.item(selection[0])['tags']:
                 messagebox.showwarning("警告", "请先选择一个版本")
                 return
-            version_window.destroy()   
-        
-        # 绑定选择事件
-        self.version_tree.bind('<<TreeviewSelect>>', on_version_select)
+            future.set_result({'version_id': version_tree.item(selection[0])['tags'][0], 'instance': install_version_var.get(), 'world': world_var.get()})
+            version_window.destroy()
         
         # 按钮框架
         button_frame = ttk.Frame(version_main_frame)
@@ -2822,62 +5569,20 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
 
         def cancel():
             """取消"""
-            selected_version[0] = 'not_selected'
+            future.set_result(None)
             version_window.destroy()
 
-
         # 取消按钮
         cancel_button = ttk.Button(button_frame, text="取消", command=cancel)
         cancel_button.pack(side=tk.RIGHT, padx=(0, 5))
+        version_window.protocol("WM_DELETE_WINDOW", cancel)
+        # 窗口随父窗口一起关闭时也视为取消
+        version_window.bind("<Destroy>", lambda event: event.widget is version_window and not future.done() and future.set_result(None))
 
         # 重新启用下载按钮
         self.download_datapack_button.config(state=tk.NORMAL)
         
-        # 等待窗口关闭
-        version_window.wait_window()
-        
-        # 返回选择的版本ID
-        return selected_version[0]
-    
-    def load_datapack_list(self, event):
-        """加载数据包列表"""
-        self.version_tree.delete(*self.version_tree.get_children())
-        for version in self.versions_data:
-            if self.datapack_minecraft_version_var.get() in version.get('game_versions', []) or self.datapack_minecraft_version_var.get() == "全部":
-                self.version_tree.insert('', tk.END, values=(
-                    version.get('version_number', '未知'),
-                    version.get('files', [])[0].get('filename', '未知'),
-                    ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                    version.get('version_type', '未知'),
-                    version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                ), tags=(version.get('id'),))
-        
-    def load_world_list(self, event=None):
-        """加载世界列表"""
-        try:
-            self.init_isolation_state(self.install_datapack_version_var.get())
-            # 获取存档目录
-            saves_dir = f"{self.isolation_dir}/saves"
-            if not os.path.exists(saves_dir):
-                os.makedirs(saves_dir)
-                
-            # 获取世界列表
-            worlds = []
-            for item in os.listdir(saves_dir):
-                item_path = os.path.join(saves_dir, item)
-                if os.path.isdir(item_path):
-                    # 检查是否是有效的Minecraft世界
-                    if os.path.exists(os.path.join(item_path, "level.dat")):
-                        worlds.append(item)
-            
-            # 更新下拉列表
-            self.install_datapack_world_combobox['values'] = worlds
-            
-            # 设置默认选中世界
-            if worlds:
-                self.install_datapack_world_var.set(worlds[0])
-        except Exception as e:
-            self.datapack_log(f"加载世界列表失败: {str(e)}", "ERROR")
+        return future
 
     def _download_datapack_thread(self, project_id):
         """在后台线程中下载数据包"""
@@ -2890,43 +5595,27 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
             # 获取项目详细信息
             project_url = f'https://api.modrinth.com/v2/project/{project_id}'
-            req = urllib.request.Request(project_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            project_data = json.loads(response.read().decode())
+            project_data = json.loads(self.http_request(project_url).decode())
             
             # 获取项目版本信息
             versions_url = f'https://api.modrinth.com/v2/project/{project_id}/version'
-            req = urllib.request.Request(versions_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            versions_data = json.loads(response.read().decode())
+            versions_data = json.loads(self.http_request(versions_url).decode())
             
             # 选择版本
             if not versions_data:
                 self.datapack_log("未找到可用版本", "WARN")
                 return
             
-            # 在主线程中显示版本选择窗口
-            selected_version_id = [None]
-            def show_version_selector():
-                selected_version_id[0] = self.select_datapack_version(versions_data, project_data.get('title', '未知数据包'))
-            
-            show_version_selector()
-            
-            # 等待用户选择版本
-            while selected_version_id[0] is None:
-                import time
-                time.sleep(0.1)
-            
-            if selected_version_id[0] == 'not_selected':
+            # 在主线程中显示版本选择窗口，等待用户确认或取消
+            selection = self.call_in_main_thread(self.select_datapack_version, versions_data, project_data.get('title', '未知数据包')).result()
+            if selection is None:
                 self.datapack_log("用户取消了版本选择", "WARN")
                 return
                 
             # 获取选中版本的详细信息
             selected_version = None
             for version in versions_data:
-                if version.get('id') == selected_version_id[0]:
+                if version.get('id') == selection['version_id']:
                     selected_version = version
                     break
             
@@ -2950,12 +5639,12 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 return
                 
             # 确定保存路径
-            world_name = self.install_datapack_world_var.get()
+            world_name = selection['world']
             if not world_name:
                 self.datapack_log("未选择世界", "WARN")
                 return
                 
-            datapacks_dir = f"{self.isolation_dir}/saves/{world_name}/datapacks"
+            datapacks_dir = f"{self.get_isolation_dir(selection['instance'])}/saves/{world_name}/datapacks"
             if not os.path.exists(datapacks_dir):
                 os.makedirs(datapacks_dir)
                 
@@ -2964,11 +5653,8 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             self.datapack_log(f"正在下载: {file_name}", "INFO")
             
             # 下载文件
-            def progress_callback(block_num, block_size, total_size):
-                percent = min(100, int(block_num * block_size * 100 / total_size))
-                self.datapack_window.after(0, lambda: self.datapack_log(f"下载进度: {percent}%", "INFO"))
-                
-            urllib.request.urlretrieve(file_url, save_path, reporthook=progress_callback)
+            if self.download_files([{'urls': [file_url], 'path': save_path, 'name': file_name, 'hashes': file_info.get('hashes'), 'size': file_info.get('size')}], self.datapack_log):
+                raise Exception(f"{file_name} 下载失败")
             
             self.datapack_log(f"数据包下载完成: {save_path}", "INFO")
             
@@ -2976,7 +5662,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
         except Exception as e:
             self.datapack_log(f"下载失败: {str(e)}", "ERROR")
-            messagebox.showerror("错误", f"下载失败: {str(e)}")
+            self.datapack_window.after(0, lambda error=str(e): messagebox.showerror("错误", f"下载失败: {error}"))
         finally:
             # 重新启用下载按钮
             self.datapack_window.after(0, lambda: self.download_datapack_button.config(state=tk.NORMAL))
@@ -3083,7 +5769,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         self.resourcepack_log("正在获取版本列表...", "INFO")
         try:
             # 获取所有可用版本
-            versions = minecraft_launcher_lib.utils.get_version_list()
+            versions = self.get_minecraft_version_list(self.refresh_widget(self.resourcepack_mc_version_combobox, self.load_resourcepack_version_list))
             if self.show_non_release_resourcepack_var.get():
                 self.version_list = [version['id'] for version in versions]
             else:
@@ -3097,12 +5783,6 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             # 更新下拉列表
             self.resourcepack_mc_version_combobox['value'] = self.version_list
 
-            try:
-                self.resourcepack_minecraft_version_combobox['value'] = self.version_list
-                if self.version_list:
-                    self.resourcepack_minecraft_version_var.set(self.version_list[0])
-            except:
-                pass
             
             # 设置默认选中版本为最新版本
             if self.version_list:
@@ -3115,13 +5795,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
     def resourcepack_log(self, message, level):
         """在资源包日志区域显示消息"""
-        print(f"[{time.asctime()}] [resourcepack/{level}] {message}")
-        with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
-            f.write(f"[{time.asctime()}] [resourcepack/{level}] {message}\n")
-        self.resourcepack_log_text.config(state=tk.NORMAL)
-        self.resourcepack_log_text.insert(tk.END, message + "\n")
-        self.resourcepack_log_text.config(state=tk.DISABLED)
-        self.resourcepack_log_text.see(tk.END)
+        self.write_log("resourcepack", message, level, ['resourcepack_log_text'])
         
     def search_resourcepacks(self):
         """搜索资源包"""
@@ -3176,10 +5850,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             url = base_url + '?' + urllib.parse.urlencode(params)
             
             # 发送请求
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            data = json.loads(response.read().decode())
+            data = json.loads(self.http_request(url).decode())
             
             # 在主线程中更新UI
             self.resourcepack_window.after(0, self._update_resourcepacks_tree, data)
@@ -3262,13 +5933,14 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         download_thread.start()
         
     def select_resourcepack_version(self, versions_data, project_name):
-        """选择资源包版本"""
-        self.versions_data = versions_data
+        """选择资源包版本（在主线程中调用），返回Future，确认后结果为{'version_id', 'instance'}，取消时为None"""
+        future = concurrent.futures.Future()
 
         # 创建版本选择窗口
         version_window = tk.Toplevel(self.resourcepack_window)
         version_window.title(f"选择 {project_name} 的版本")
         version_window.geometry(f"800x500+{int((self.resourcepack_window.winfo_screenwidth()-800)/2)}+{int((self.resourcepack_window.winfo_screenheight()-500)/2)}")
+        
         version_window.grab_set()  # 模态窗口
         version_window.resizable(False, False)
         
@@ -3285,19 +5957,19 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         top_frame.pack(fill=tk.BOTH, expand=True)
 
         # 选择想要安装资源包的MC版本
-        self.install_resourcepack_version_var = tk.StringVar()
-        self.install_resourcepack_version_combobox = ttk.Combobox(top_frame, textvariable=self.install_resourcepack_version_var, state="readonly", width=20)
-        self.install_resourcepack_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.install_resourcepack_version_combobox['values'] = self.installed_versions
-        self.install_resourcepack_version_var.set(self.installed_versions[0])
+        install_version_var = tk.StringVar()
+        install_version_combobox = ttk.Combobox(top_frame, textvariable=install_version_var, state="readonly", width=20)
+        install_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        install_version_combobox['values'] = self.installed_versions
+        install_version_var.set(self.installed_versions[0])
 
         # 选择资源包的MC版本
-        self.resourcepack_minecraft_version_var = tk.StringVar()
-        self.resourcepack_minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=self.resourcepack_minecraft_version_var, state="readonly", width=20)
-        self.resourcepack_minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.resourcepack_minecraft_version_combobox.bind("<<ComboboxSelected>>", self.load_resourcepack_version)
-
-        self.load_resourcepack_version_list()
+        minecraft_version_var = tk.StringVar()
+        minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=minecraft_version_var, state="readonly", width=20)
+        minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        minecraft_version_combobox['values'] = self.resourcepack_mc_version_combobox['values']
+        minecraft_version_var.set("全部")
+        minecraft_version_combobox.bind("<<ComboboxSelected>>", lambda event: load_version_list())
 
         # 版本列表框架
         version_list_frame = ttk.Frame(version_main_frame)
@@ -3305,63 +5977,54 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         
         # 创建Treeview来显示版本列表
         version_columns = ('version', 'resourcepack_filename', 'mc_version', 'type', 'date')
-        self.version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
+        version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
         
         # 定义列标题
-        self.version_tree.heading('version', text='版本')
-        self.version_tree.heading('resourcepack_filename', text='文件名')
-        self.version_tree.heading('mc_version', text='MC版本')
-        self.version_tree.heading('type', text='类型')
-        self.version_tree.heading('date', text='发布日期')
+        version_tree.heading('version', text='版本')
+        version_tree.heading('resourcepack_filename', text='文件名')
+        version_tree.heading('mc_version', text='MC版本')
+        version_tree.heading('type', text='类型')
+        version_tree.heading('date', text='发布日期')
         
         # 设置列宽
-        self.version_tree.column('version', width=70)
-        self.version_tree.column('resourcepack_filename', width=200)
-        self.version_tree.column('mc_version', width=360)
-        self.version_tree.column('type', width=50)
-        self.version_tree.column('date', width=120)
+        version_tree.column('version', width=70)
+        version_tree.column('resourcepack_filename', width=200)
+        version_tree.column('mc_version', width=360)
+        version_tree.column('type', width=50)
+        version_tree.column('date', width=120)
         
         # 添加滚动条
-        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=self.version_tree.yview)
-        self.version_tree.configure(yscrollcommand=version_scrollbar.set)
+        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=version_tree.yview)
+        version_tree.configure(yscrollcommand=version_scrollbar.set)
         
         # 布局
-        self.version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         version_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 填充版本数据
-        for version in versions_data:
-            if self.resourcepack_minecraft_version_var.get() == "全部" or self.resourcepack_minecraft_version_var.get() in version.get('game_versions', []):
-                self.version_tree.insert('', tk.END, values=(
-                    version.get('version_number', '未知'),
-                    version.get('files', [])[0].get('filename', '未知'),
-                    ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                    version.get('version_type', '未知'),
-                    version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                ), tags=(version.get('id'),))
-        
-        # 选择的版本变量
-        selected_version = [None]  # 使用列表以便在内部函数中修改
-
-        def on_version_select(event):
-            """当选择版本时"""
-            selection = self.version_tree.selection()
-            if selection:
-                item = self.version_tree.item(selection[0])
-                tags = item['tags']
-                if tags:
-                    selected_version[0] = tags[0]
+        def load_version_list():
+            """按筛选条件填充版本数据"""
+            version_tree.delete(*version_tree.get_children())
+            for version in versions_data:
+                if minecraft_version_var.get() == "全部" or minecraft_version_var.get() in version.get('game_versions', []):
+                    version_tree.insert('', tk.END, values=(
+                        version.get('version_number', '未知'),
+                        version.get('files', [])[0].get('filename', '未知'),
+                        ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
+                        version.get('version_type', '未知'),
+                        version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
+                    ), tags=(version.get('id'),))
+
+        load_version_list()
         
         def confirm_selection():
             """确认选择"""
-            if selected_version[0] is None:
+            selection = version_tree.selection()
+            if not selection or not version_tree.item(selection[0])['tags']:
                 messagebox.showwarning("警告", "请先选择一个版本")
                 return
+            future.set_result({'version_id': version_tree.item(selection[0])['tags'][0], 'instance': install_version_var.get()})
             version_window.destroy()
         
-        # 绑定选择事件
-        self.version_tree.bind('<<TreeviewSelect>>', on_version_select)
-        
         # 按钮框架
         button_frame = ttk.Frame(version_main_frame)
         button_frame.pack(fill=tk.X)
@@ -3372,37 +6035,20 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
 
         def cancel():
             """取消"""
-            selected_version[0] = 'not_installed'
+            future.set_result(None)
             version_window.destroy()
 
-
         # 取消按钮
         cancel_button = ttk.Button(button_frame, text="取消", command=cancel)
         cancel_button.pack(side=tk.RIGHT, padx=(0, 5))
+        version_window.protocol("WM_DELETE_WINDOW", cancel)
+        # 窗口随父窗口一起关闭时也视为取消
+        version_window.bind("<Destroy>", lambda event: event.widget is version_window and not future.done() and future.set_result(None))
 
         # 重新启用下载按钮
         self.download_resourcepack_button.config(state=tk.NORMAL)
         
-        # 等待窗口关闭
-        version_window.wait_window()
-        
-        # 返回选择的版本ID
-        return selected_version[0]
-    
-    def load_resourcepack_version(self, event):
-        """加载资源包版本"""
-        self.version_tree.delete(*self.version_tree.get_children())
-
-        # 填充版本数据
-        for version in self.versions_data:
-            if self.resourcepack_minecraft_version_var.get() == "全部" or self.resourcepack_minecraft_version_var.get() in version.get('game_versions', []):
-                self.version_tree.insert('', tk.END, values=(
-                    version.get('version_number', '未知'),
-                    version.get('files', [])[0].get('filename', '未知'),
-                    ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                    version.get('version_type', '未知'),
-                    version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                ), tags=(version.get('id'),))
+        return future
         
     def _download_resourcepack_thread(self, project_id):
         """在后台线程中下载资源包"""
@@ -3415,43 +6061,27 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
             # 获取项目详细信息
             project_url = f'https://api.modrinth.com/v2/project/{project_id}'
-            req = urllib.request.Request(project_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            project_data = json.loads(response.read().decode())
+            project_data = json.loads(self.http_request(project_url).decode())
             
             # 获取项目版本信息
             versions_url = f'https://api.modrinth.com/v2/project/{project_id}/version'
-            req = urllib.request.Request(versions_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            versions_data = json.loads(response.read().decode())
+            versions_data = json.loads(self.http_request(versions_url).decode())
             
             # 选择版本
             if not versions_data:
                 self.resourcepack_log("未找到可用版本", "WARN")
                 return
             
-            # 在主线程中显示版本选择窗口
-            selected_version_id = [None]
-            def show_version_selector():
-                selected_version_id[0] = self.select_resourcepack_version(versions_data, project_data.get('title', '未知资源包'))
-            
-            show_version_selector()
-            
-            # 等待用户选择版本
-            while selected_version_id[0] is None:
-                import time
-                time.sleep(0.1)
-            
-            if selected_version_id[0] == 'not_selected':
+            # 在主线程中显示版本选择窗口，等待用户确认或取消
+            selection = self.call_in_main_thread(self.select_resourcepack_version, versions_data, project_data.get('title', '未知资源包')).result()
+            if selection is None:
                 self.resourcepack_log("用户取消了版本选择", "WARN")
                 return
                 
             # 获取选中版本的详细信息
             selected_version = None
             for version in versions_data:
-                if version.get('id') == selected_version_id[0]:
+                if version.get('id') == selection['version_id']:
                     selected_version = version
                     break
             
@@ -3475,8 +6105,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 return
                 
             # 确定保存路径
-            self.init_isolation_state(self.install_resourcepack_version_var.get())
-            resourcepacks_dir = f"{self.isolation_dir}/resourcepacks"
+            resourcepacks_dir = f"{self.get_isolation_dir(selection['instance'])}/resourcepacks"
             if not os.path.exists(resourcepacks_dir):
                 os.makedirs(resourcepacks_dir)
                 
@@ -3485,11 +6114,8 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             self.resourcepack_log(f"正在下载: {file_name}", "INFO")
             
             # 下载文件
-            def progress_callback(block_num, block_size, total_size):
-                percent = min(100, int(block_num * block_size * 100 / total_size))
-                self.resourcepack_window.after(0, lambda: self.resourcepack_log(f"下载进度: {percent}%", "INFO"))
-                
-            urllib.request.urlretrieve(file_url, save_path, reporthook=progress_callback)
+            if self.download_files([{'urls': [file_url], 'path': save_path, 'name': file_name, 'hashes': file_info.get('hashes'), 'size': file_info.get('size'), 'store': True}], self.resourcepack_log):
+                raise Exception(f"{file_name} 下载失败")
             
             self.resourcepack_log(f"资源包下载完成: {save_path}", "INFO")
             
@@ -3497,7 +6123,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
         except Exception as e:
             self.resourcepack_log(f"下载失败: {str(e)}", "ERROR")
-            messagebox.showerror("错误", f"下载失败: {str(e)}")
+            self.resourcepack_window.after(0, lambda error=str(e): messagebox.showerror("错误", f"下载失败: {error}"))
         finally:
             # 重新启用下载按钮
             self.resourcepack_window.after(0, lambda: self.download_resourcepack_button.config(state=tk.NORMAL))
@@ -3611,7 +6237,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         self.mod_log("正在获取版本列表...", "INFO")
         try:
             # 获取所有可用版本
-            versions = minecraft_launcher_lib.utils.get_version_list()
+            versions = self.get_minecraft_version_list(self.refresh_widget(self.mod_mc_version_combobox, self.load_mod_version_list))
             if self.show_non_release_mod_var.get():
                 self.version_list = [version['id'] for version in versions]
             else:
@@ -3625,12 +6251,6 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             # 更新下拉列表
             self.mod_mc_version_combobox['value'] = self.version_list
 
-            try:
-                self.mod_minecraft_version_combobox['value'] = self.version_list
-                if self.version_list:
-                    self.mod_minecraft_version_var.set(self.version_list[0])
-            except:
-                pass
             
             # 设置默认选中版本为最新版本
             if self.version_list:
@@ -3643,14 +6263,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
     def mod_log(self, message, level):
         """在Mod日志区域显示消息"""
-        print(f"[{time.asctime()}] [mod/{level}] {message}")
-        with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
-            f.write(f"[{time.asctime()}] [mod/{level}] {message}\n")
-        
-        self.mod_log_text.config(state=tk.NORMAL)
-        self.mod_log_text.insert(tk.END, message + "\n")
-        self.mod_log_text.config(state=tk.DISABLED)
-        self.mod_log_text.see(tk.END)
+        self.write_log("mod", message, level, ['mod_log_text'])
         
     def search_mods(self):
         """搜索Mods"""
@@ -3705,10 +6318,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             url = base_url + '?' + urllib.parse.urlencode(params)
             
             # 发送请求
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            data = json.loads(response.read().decode())
+            data = json.loads(self.http_request(url).decode())
             
             # 在主线程中更新UI
             self.mod_window.after(0, self._update_mods_tree, data)
@@ -3791,8 +6401,8 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         download_thread.start()
         
     def select_mod_version(self, versions_data, project_name):
-        """选择Mod版本"""
-        self.versions_data = versions_data
+        """选择Mod版本（在主线程中调用），返回Future，确认后结果为{'version_id', 'instance'}，取消时为None"""
+        future = concurrent.futures.Future()
 
         # 创建版本选择窗口
         version_window = tk.Toplevel(self.mod_window)
@@ -3815,27 +6425,27 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         top_frame.pack(fill=tk.BOTH, expand=True)
 
         # 选择想要安装Mod的版本
-        self.install_mod_version_var = tk.StringVar()
-        self.install_mod_version_combobox = ttk.Combobox(top_frame, textvariable=self.install_mod_version_var, state="readonly", width=20)
-        self.install_mod_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.install_mod_version_combobox['values'] = self.installed_versions
-        self.install_mod_version_var.set(self.installed_versions[0])
+        install_version_var = tk.StringVar()
+        install_version_combobox = ttk.Combobox(top_frame, textvariable=install_version_var, state="readonly", width=20)
+        install_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        install_version_combobox['values'] = self.installed_versions
+        install_version_var.set(self.installed_versions[0])
 
         # 选择Mod的MC版本
-        self.mod_minecraft_version_var = tk.StringVar()
-        self.mod_minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=self.mod_minecraft_version_var, state="readonly", width=20)
-        self.mod_minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.mod_minecraft_version_combobox.bind("<<ComboboxSelected>>", self.load_mod_list)
-
-        self.load_mod_version_list()
+        minecraft_version_var = tk.StringVar()
+        minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=minecraft_version_var, state="readonly", width=20)
+        minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        minecraft_version_combobox['values'] = self.mod_mc_version_combobox['values']
+        minecraft_version_var.set("全部")
+        minecraft_version_combobox.bind("<<ComboboxSelected>>", lambda event: load_version_list())
 
         # 选择Mod的模组加载器版本
-        self.mod_modloader_var = tk.StringVar()
-        self.mod_modloader_combobox = ttk.Combobox(top_frame, textvariable=self.mod_modloader_var, state="readonly", width=20)
-        self.mod_modloader_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.mod_modloader_combobox['values'] = ("全部", "Forge", "Fabric", "Quilt")
-        self.mod_modloader_var.set("全部")
-        self.mod_modloader_combobox.bind("<<ComboboxSelected>>", self.load_mod_list)
+        modloader_var = tk.StringVar()
+        modloader_combobox = ttk.Combobox(top_frame, textvariable=modloader_var, state="readonly", width=20)
+        modloader_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        modloader_combobox['values'] = ("全部", "Forge", "Fabric", "Quilt")
+        modloader_var.set("全部")
+        modloader_combobox.bind("<<ComboboxSelected>>", lambda event: load_version_list())
 
         # 版本列表框架
         version_list_frame = ttk.Frame(version_main_frame)
@@ -3843,67 +6453,58 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         
         # 创建Treeview来显示版本列表
         version_columns = ('version', 'mod_filename', 'mod_loader', 'mc_version', 'type', 'date')
-        self.version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
+        version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
         
         # 定义列标题
-        self.version_tree.heading('version', text='版本')
-        self.version_tree.heading('mod_filename', text='文件名')
-        self.version_tree.heading('mod_loader', text='模组加载器')
-        self.version_tree.heading('mc_version', text='MC版本')
-        self.version_tree.heading('type', text='类型')
-        self.version_tree.heading('date', text='发布日期')
+        version_tree.heading('version', text='版本')
+        version_tree.heading('mod_filename', text='文件名')
+        version_tree.heading('mod_loader', text='模组加载器')
+        version_tree.heading('mc_version', text='MC版本')
+        version_tree.heading('type', text='类型')
+        version_tree.heading('date', text='发布日期')
         
         # 设置列宽
-        self.version_tree.column('version', width=170)
-        self.version_tree.column('mod_filename', width=250)
-        self.version_tree.column('mod_loader', width=70)
-        self.version_tree.column('mc_version', width=150)
-        self.version_tree.column('type', width=50)
-        self.version_tree.column('date', width=120)
+        version_tree.column('version', width=170)
+        version_tree.column('mod_filename', width=250)
+        version_tree.column('mod_loader', width=70)
+        version_tree.column('mc_version', width=150)
+        version_tree.column('type', width=50)
+        version_tree.column('date', width=120)
         
         # 添加滚动条
-        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=self.version_tree.yview)
-        self.version_tree.configure(yscrollcommand=version_scrollbar.set)
+        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=version_tree.yview)
+        version_tree.configure(yscrollcommand=version_scrollbar.set)
         
         # 布局
-        self.version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         version_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 填充版本数据
-        for version in versions_data:
-            if self.mod_minecraft_version_var.get() in version.get('game_versions', []) or self.mod_minecraft_version_var.get() == "全部":
-                if self.mod_modloader_var.get().lower() in version.get('loaders', []) or self.mod_modloader_var.get() == "全部":
-                    self.version_tree.insert('', tk.END, values=(
-                        version.get('version_number', '未知'),
-                        version.get('files', [])[0].get('filename','未知'),
-                        version.get('loaders', []),
-                        ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                        version.get('version_type', '未知'),
-                        version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                    ), tags=(version.get('id'),))
-        
-        # 选择的版本变量
-        selected_version = [None]  # 使用列表以便在内部函数中修改
-
-        def on_version_select(event):
-            """当选择版本时"""
-            selection = self.version_tree.selection()
-            if selection:
-                item = self.version_tree.item(selection[0])
-                tags = item['tags']
-                if tags:
-                    selected_version[0] = tags[0]
+        def load_version_list():
+            """按筛选条件填充版本数据"""
+            version_tree.delete(*version_tree.get_children())
+            for version in versions_data:
+                if minecraft_version_var.get() in version.get('game_versions', []) or minecraft_version_var.get() == "全部":
+                    if modloader_var.get().lower() in version.get('loaders', []) or modloader_var.get() == "全部":
+                        version_tree.insert('', tk.END, values=(
+                            version.get('version_number', '未知'),
+                            version.get('files', [])[0].get('filename','未知'),
+                            version.get('loaders', []),
+                            ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
+                            version.get('version_type', '未知'),
+                            version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
+                        ), tags=(version.get('id'),))
+
+        load_version_list()
         
         def confirm_selection():
             """确认选择"""
-            if selected_version[0] is None:
+            selection = version_tree.selection()
+            if not selection or not version_tree.item(selection[0])['tags']:
                 messagebox.showwarning("警告", "请先选择一个版本")
                 return
+            future.set_result({'version_id': version_tree.item(selection[0])['tags'][0], 'instance': install_version_var.get()})
             version_window.destroy()
         
-        # 绑定选择事件
-        self.version_tree.bind('<<TreeviewSelect>>', on_version_select)
-        
         # 按钮框架
         button_frame = ttk.Frame(version_main_frame)
         button_frame.pack(fill=tk.X)
@@ -3914,37 +6515,20 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
 
         def cancel():
             """取消"""
-            selected_version[0] = 'not_selected'
+            future.set_result(None)
             version_window.destroy()
 
-
         # 取消按钮
         cancel_button = ttk.Button(button_frame, text="取消", command=cancel)
         cancel_button.pack(side=tk.RIGHT, padx=(0, 5))
+        version_window.protocol("WM_DELETE_WINDOW", cancel)
+        # 窗口随父窗口一起关闭时也视为取消
+        version_window.bind("<Destroy>", lambda event: event.widget is version_window and not future.done() and future.set_result(None))
 
         # 重新启用下载按钮
         self.download_mod_button.config(state=tk.NORMAL)
         
-        # 等待窗口关闭
-        version_window.wait_window()
-        
-        # 返回选择的版本ID
-        return selected_version[0]
-    
-    def load_mod_list(self, event):
-        """加载mod版本"""
-        self.version_tree.delete(*self.version_tree.get_children())
-        for version in self.versions_data:
-            if self.mod_minecraft_version_var.get() in version.get('game_versions', []) or self.mod_minecraft_version_var.get() == "全部":
-                if self.mod_modloader_var.get().lower() in version.get('loaders', []) or self.mod_modloader_var.get() == "全部":
-                    self.version_tree.insert('', tk.END, values=(
-                        version.get('version_number', '未知'),
-                        version.get('files', [])[0].get('filename','未知'),
-                        version.get('loaders', []),
-                        ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                        version.get('version_type', '未知'),
-                        version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                    ), tags=(version.get('id'),))
+        return future
         
     def _download_mod_thread(self, project_id):
         """在后台线程中下载Mod"""
@@ -3957,43 +6541,27 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
             # 获取项目详细信息
             project_url = f'https://api.modrinth.com/v2/project/{project_id}'
-            req = urllib.request.Request(project_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            project_data = json.loads(response.read().decode())
+            project_data = json.loads(self.http_request(project_url).decode())
             
             # 获取项目版本信息
             versions_url = f'https://api.modrinth.com/v2/project/{project_id}/version'
-            req = urllib.request.Request(versions_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            versions_data = json.loads(response.read().decode())
+            versions_data = json.loads(self.http_request(versions_url).decode())
             
             # 选择版本
             if not versions_data:
                 self.mod_log("未找到可用版本", "WARN")
                 return
             
-            # 在主线程中显示版本选择窗口
-            selected_version_id = [None]
-            def show_version_selector():
-                selected_version_id[0] = self.select_mod_version(versions_data, project_data.get('title', '未知Mod'))
-            
-            show_version_selector()
-            
-            # 等待用户选择版本
-            while selected_version_id[0] is None:
-                import time
-                time.sleep(0.1)
-            
-            if selected_version_id[0] == 'not_selected':
+            # 在主线程中显示版本选择窗口，等待用户确认或取消
+            selection = self.call_in_main_thread(self.select_mod_version, versions_data, project_data.get('title', '未知Mod')).result()
+            if selection is None:
                 self.mod_log("用户取消了版本选择", "WARN")
                 return
                 
             # 获取选中版本的详细信息
             selected_version = None
             for version in versions_data:
-                if version.get('id') == selected_version_id[0]:
+                if version.get('id') == selection['version_id']:
                     selected_version = version
                     break
             
@@ -4017,8 +6585,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 return
                 
             # 确定保存路径
-            self.init_isolation_state(self.install_mod_version_var.get())
-            mods_dir = f"{self.isolation_dir}/mods"
+            mods_dir = f"{self.get_isolation_dir(selection['instance'])}/mods"
             if not os.path.exists(mods_dir):
                 os.makedirs(mods_dir)
                 
@@ -4027,11 +6594,8 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             self.mod_log(f"正在下载: {file_name}", "INFO")
             
             # 下载文件
-            def progress_callback(block_num, block_size, total_size):
-                percent = min(100, int(block_num * block_size * 100 / total_size))
-                self.mod_window.after(0, lambda: self.mod_log(f"下载进度: {percent}%", "INFO"))
-                
-            urllib.request.urlretrieve(file_url, save_path, reporthook=progress_callback)
+            if self.download_files([{'urls': [file_url], 'path': save_path, 'name': file_name, 'hashes': file_info.get('hashes'), 'size': file_info.get('size'), 'store': True}], self.mod_log):
+                raise Exception(f"{file_name} 下载失败")
             
             self.mod_log(f"Mod下载完成: {save_path}", "INFO")
             self.mod_window.after(0, lambda: messagebox.showinfo("成功", f"Mod下载完成!\n保存至: {save_path}"))
@@ -4044,41 +6608,162 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                     self.required_dep_counter += 1
             if dependencies:
                 self.mod_log(f"发现 {len(dependencies)} 个依赖项，{self.required_dep_counter}个重要，正在处理...", "INFO")
-                self._download_dependencies(dependencies)
+                self._download_dependencies(dependencies, selected_version, mods_dir, selection['instance'])
             
         except Exception as e:
             self.mod_log(f"下载失败: {str(e)}", "ERROR")
-            messagebox.showerror("错误", f"下载失败: {str(e)}")
+            self.mod_window.after(0, lambda error=str(e): messagebox.showerror("错误", f"下载失败: {error}"))
         finally:
             # 重新启用下载按钮
             self.mod_window.after(0, lambda: self.download_mod_button.config(state=tk.NORMAL))
 
-    def _download_dependencies(self, dependencies):
-        """打开依赖项下载页面并让用户下载依赖项"""
+    def _download_dependencies(self, dependencies, selected_version, mods_dir, instance_version):
+        """解析全部依赖项，确认后同时下载"""
         try:
-            
-            if messagebox.askyesno("提示",f"发现{len(dependencies)}个依赖项，{self.required_dep_counter}个重要。是否下载非必要依赖项？"):
-                download_non_required_dep = True
+            # 按目标实例筛选依赖的版本
+            instance_info = self.get_instance_info(instance_version)
+            loaders = [instance_info['loader']] if instance_info['loader'] else selected_version.get('loaders', [])
+            if instance_info['loader'] == 'quilt':
+                loaders.append('fabric')
+            game_versions = [instance_info['minecraft_version']] if instance_info['minecraft_version'] else selected_version.get('game_versions', [])
+
+            # 已安装的Mod不再下载
+            installed_projects = self.get_installed_mod_projects(mods_dir)
+
+            required_versions, optional_versions = self.resolve_mod_dependencies(selected_version, loaders, game_versions, installed_projects)
+            if not required_versions and not optional_versions:
+                self.mod_log("依赖项都已安装", "INFO")
+                return
+
+            projects = self.get_modrinth_projects(list(required_versions) + list(optional_versions))
+            def describe(versions):
+                return '\n'.join(f"  {projects.get(project_id, {}).get('title', project_id)} {version.get('version_number', '')}" for project_id, version in versions.items())
+
+            # 一次确认所有依赖项
+            message = f"目标版本: {instance_info['minecraft_version'] or '未知'} {instance_info['loader'] or ''}\n"
+            if required_versions:
+                message += f"必需的依赖项（{len(required_versions)}个）:\n{describe(required_versions)}\n"
+            if optional_versions:
+                message += f"可选的依赖项（{len(optional_versions)}个）:\n{describe(optional_versions)}\n"
+                message += "\n是否同时下载可选依赖项？选择“否”只下载必需的依赖项。"
+                answer = self.call_in_main_thread(messagebox.askyesnocancel, "下载依赖项", message)
             else:
-                download_non_required_dep = False
-                
-            for dep in dependencies:
-                if not download_non_required_dep:
-                    if dep.get('dependency_type') != 'required':
-                        continue  # 只下载必需的依赖项
-                    
-                project_id = dep.get('project_id')
-                if not project_id:
-                    continue
+                answer = False if self.call_in_main_thread(messagebox.askokcancel, "下载依赖项", message + "\n是否下载？") else None
+            if answer is None or (answer is False and not required_versions):
+                self.mod_log("用户取消了依赖项下载", "WARN")
+                return
+
+            versions = dict(required_versions)
+            if answer:
+                versions.update(optional_versions)
 
-                # 在新线程中执行下载操作
-                download_thread = threading.Thread(target=self._download_mod_thread, args=(project_id,))
-                download_thread.daemon = True
-                download_thread.start()
-                download_thread.join()
+            # 同时下载所有依赖项
+            download_tasks = []
+            for version in versions.values():
+                file_info = self.get_primary_file(version)
+                if not file_info or not file_info.get('url') or not file_info.get('filename'):
+                    continue
+                download_tasks.append({
+                    'urls': [file_info['url']],
+                    'path': f"{mods_dir}/{file_info['filename']}",
+                    'name': file_info['filename'],
+                    'hashes': file_info.get('hashes'),
+                    'size': file_info.get('size'),
+                    'store': True
+                })
+
+            self.mod_log(f"正在下载 {len(download_tasks)} 个依赖项...", "INFO")
+            failed_tasks = self.download_files(download_tasks, self.mod_log)
+            if failed_tasks:
+                self.mod_log(f"{len(failed_tasks)} 个依赖项下载失败", "WARN")
+            else:
+                self.mod_log(f"{len(download_tasks)} 个依赖项下载完成", "INFO")
 
         except Exception as e:
             self.mod_log(f"下载依赖项失败: {str(e)}", "ERROR")
+
+    def get_installed_mod_projects(self, mods_dir):
+        """根据文件哈希查找已安装Mod对应的Modrinth项目ID"""
+        if not os.path.isdir(mods_dir):
+            return set()
+        hashes = [metadata['sha1'] for file, metadata in self.get_mod_index(mods_dir).items() if file.endswith('.jar')]
+        if not hashes:
+            return set()
+        return {version.get('project_id') for version in self.get_modrinth_versions_by_hash(hashes).values()}
+
+    def is_version_compatible(self, version, loaders, game_versions):
+        """检查Modrinth版本是否支持指定的加载器和游戏版本"""
+        if loaders and not set(loaders) & set(version.get('loaders', [])):
+            return False
+        if game_versions and not set(game_versions) & set(version.get('game_versions', [])):
+            return False
+        return True
+
+    def resolve_mod_dependencies(self, root_version, loaders, game_versions, installed_projects):
+        """解析完整的依赖关系，返回(必需的依赖, 可选的依赖)，均为{项目ID: 版本}"""
+        resolved = {root_version.get('project_id'): root_version}
+        # 记录每个项目是否只通过必需依赖就能到达
+        required_projects = {root_version.get('project_id')}
+        edges = []
+
+        def collect(version):
+            pending = []
+            for dep in version.get('dependencies', []):
+                if dep.get('dependency_type') not in ('required', 'optional'):
+                    continue
+                if dep.get('project_id') in installed_projects:
+                    continue
+                edges.append((version.get('project_id'), dep))
+                if not dep.get('project_id') or dep.get('project_id') not in resolved:
+                    pending.append(dep)
+            return pending
+
+        pending = collect(root_version)
+        while pending:
+            # 指定了版本的依赖一次获取，不兼容时改为选择兼容的最新版本
+            pinned_versions = self.get_modrinth_versions([dep['version_id'] for dep in pending if dep.get('version_id')])
+            level_versions = []
+            project_ids = []
+            for dep in pending:
+                version = pinned_versions.get(dep.get('version_id'))
+                if version and self.is_version_compatible(version, loaders, game_versions):
+                    level_versions.append(version)
+                elif dep.get('project_id') or version:
+                    project_ids.append(dep.get('project_id') or version.get('project_id'))
+
+            # 同时获取其他依赖的兼容版本，结果按从新到旧排列
+            project_ids = [project_id for project_id in dict.fromkeys(project_ids) if project_id not in resolved and project_id not in installed_projects]
+            for project_id, versions in self.get_modrinth_project_versions(project_ids, loaders, game_versions).items():
+                release_versions = [version for version in versions if version.get('version_type') == 'release']
+                if release_versions or versions:
+                    level_versions.append((release_versions or versions)[0])
+                else:
+                    self.mod_log(f"依赖项 {project_id} 没有兼容的版本", "WARN")
+
+            pending = []
+            for version in level_versions:
+                project_id = version.get('project_id')
+                if project_id in resolved or project_id in installed_projects:
+                    continue
+                resolved[project_id] = version
+                pending.extend(collect(version))
+
+        # 给只指定了版本ID的依赖补上项目ID
+        version_projects = {version.get('id'): project_id for project_id, version in resolved.items()}
+        edges = [(parent, dep.get('project_id') or version_projects.get(dep.get('version_id')), dep.get('dependency_type')) for parent, dep in edges]
+
+        changed = True
+        while changed:
+            changed = False
+            for parent, child, dependency_type in edges:
+                if dependency_type == 'required' and parent in required_projects and child in resolved and child not in required_projects:
+                    required_projects.add(child)
+                    changed = True
+
+        del resolved[root_version.get('project_id')]
+        required_versions = {project_id: version for project_id, version in resolved.items() if project_id in required_projects}
+        optional_versions = {project_id: version for project_id, version in resolved.items() if project_id not in required_projects}
+        return required_versions, optional_versions
             
     # 创建光影包下载窗口
     def create_shader_download_widgets(self):
@@ -4182,7 +6867,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         self.shader_log("正在获取版本列表...", "INFO")
         try:
             # 获取所有可用版本
-            versions = minecraft_launcher_lib.utils.get_version_list()
+            versions = self.get_minecraft_version_list(self.refresh_widget(self.shader_mc_version_combobox, self.load_shader_version_list))
             if self.show_non_release_shader_var.get():
                 self.version_list = [version['id'] for version in versions]
             else:
@@ -4196,12 +6881,6 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             # 更新下拉列表
             self.shader_mc_version_combobox['value'] = self.version_list
 
-            try:
-                self.shader_minecraft_version_combobox['value'] = self.version_list
-                if self.version_list:
-                    self.shader_minecraft_version_var.set(self.version_list[0])
-            except:
-                pass
             
             # 设置默认选中版本为最新版本
             if self.version_list:
@@ -4214,14 +6893,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
     def shader_log(self, message, level):
         """在光影包日志区域显示消息"""
-        print(f"[{time.asctime()}] [shaderpack/{level}] {message}")
-        with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
-            f.write(f"[{time.asctime()}] [shaderpack/{level}] {message}\n")
-        
-        self.shader_log_text.config(state=tk.NORMAL)
-        self.shader_log_text.insert(tk.END, message + "\n")
-        self.shader_log_text.config(state=tk.DISABLED)
-        self.shader_log_text.see(tk.END)
+        self.write_log("shader", message, level, ['shader_log_text'])
         
     def search_shaders(self):
         """搜索光影包"""
@@ -4276,10 +6948,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             url = base_url + '?' + urllib.parse.urlencode(params)
             
             # 发送请求
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            data = json.loads(response.read().decode())
+            data = json.loads(self.http_request(url).decode())
             
             # 在主线程中更新UI
             self.shader_window.after(0, self._update_shaders_tree, data)
@@ -4362,8 +7031,8 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         download_thread.start()
         
     def select_shader_version(self, versions_data, project_name):
-        """选择光影包版本"""
-        self.versions_data = versions_data
+        """选择光影包版本（在主线程中调用），返回Future，确认后结果为{'version_id', 'instance'}，取消时为None"""
+        future = concurrent.futures.Future()
 
         # 创建版本选择窗口
         version_window = tk.Toplevel(self.shader_window)
@@ -4386,19 +7055,19 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         top_frame.pack(fill=tk.BOTH, expand=True)
 
         # 选择想要安装光影包的MC版本
-        self.install_shader_version_var = tk.StringVar()
-        self.install_shader_version_combobox = ttk.Combobox(top_frame, textvariable=self.install_shader_version_var, state="readonly", width=20)
-        self.install_shader_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.install_shader_version_combobox['values'] = self.installed_versions
-        self.install_shader_version_var.set(self.installed_versions[0])
+        install_version_var = tk.StringVar()
+        install_version_combobox = ttk.Combobox(top_frame, textvariable=install_version_var, state="readonly", width=20)
+        install_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        install_version_combobox['values'] = self.installed_versions
+        install_version_var.set(self.installed_versions[0])
 
         # 选择光影包的MC版本
-        self.shader_minecraft_version_var = tk.StringVar()
-        self.shader_minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=self.shader_minecraft_version_var, state="readonly", width=20)
-        self.shader_minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.shader_minecraft_version_combobox.bind("<<ComboboxSelected>>", self.load_shader_version)
-
-        self.load_shader_version_list()
+        minecraft_version_var = tk.StringVar()
+        minecraft_version_combobox = ttk.Combobox(top_frame, textvariable=minecraft_version_var, state="readonly", width=20)
+        minecraft_version_combobox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=(0, 10))
+        minecraft_version_combobox['values'] = self.shader_mc_version_combobox['values']
+        minecraft_version_var.set("全部")
+        minecraft_version_combobox.bind("<<ComboboxSelected>>", lambda event: load_version_list())
 
         # 版本列表框架
         version_list_frame = ttk.Frame(version_main_frame)
@@ -4406,63 +7075,54 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         
         # 创建Treeview来显示版本列表
         version_columns = ('version', 'shader_filename', 'mc_version', 'type', 'date')
-        self.version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
+        version_tree = ttk.Treeview(version_list_frame, columns=version_columns, show='headings', height=17)
         
         # 定义列标题
-        self.version_tree.heading('version', text='版本')
-        self.version_tree.heading('shader_filename', text='文件名')
-        self.version_tree.heading('mc_version', text='MC版本')
-        self.version_tree.heading('type', text='类型')
-        self.version_tree.heading('date', text='发布日期')
+        version_tree.heading('version', text='版本')
+        version_tree.heading('shader_filename', text='文件名')
+        version_tree.heading('mc_version', text='MC版本')
+        version_tree.heading('type', text='类型')
+        version_tree.heading('date', text='发布日期')
         
         # 设置列宽
-        self.version_tree.column('version', width=70)
-        self.version_tree.column('shader_filename', width=200)
-        self.version_tree.column('mc_version', width=360)
-        self.version_tree.column('type', width=50)
-        self.version_tree.column('date', width=120)
+        version_tree.column('version', width=70)
+        version_tree.column('shader_filename', width=200)
+        version_tree.column('mc_version', width=360)
+        version_tree.column('type', width=50)
+        version_tree.column('date', width=120)
         
         # 添加滚动条
-        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=self.version_tree.yview)
-        self.version_tree.configure(yscrollcommand=version_scrollbar.set)
+        version_scrollbar = ttk.Scrollbar(version_list_frame, orient=tk.VERTICAL, command=version_tree.yview)
+        version_tree.configure(yscrollcommand=version_scrollbar.set)
         
         # 布局
-        self.version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        version_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         version_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 填充版本数据
-        for version in versions_data:
-            if self.shader_minecraft_version_var.get() == "全部" or self.shader_minecraft_version_var.get() in version.get('game_versions', []):
-                self.version_tree.insert('', tk.END, values=(
-                    version.get('version_number', '未知'),
-                    version.get('files', [])[0].get('filename', '未知'),
-                    ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                    version.get('version_type', '未知'),
-                    version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                ), tags=(version.get('id'),))
-        
-        # 选择的版本变量
-        selected_version = [None]  # 使用列表以便在内部函数中修改
-
-        def on_version_select(event):
-            """当选择版本时"""
-            selection = self.version_tree.selection()
-            if selection:
-                item = self.version_tree.item(selection[0])
-                tags = item['tags']
-                if tags:
-                    selected_version[0] = tags[0]
+        def load_version_list():
+            """按筛选条件填充版本数据"""
+            version_tree.delete(*version_tree.get_children())
+            for version in versions_data:
+                if minecraft_version_var.get() == "全部" or minecraft_version_var.get() in version.get('game_versions', []):
+                    version_tree.insert('', tk.END, values=(
+                        version.get('version_number', '未知'),
+                        version.get('files', [])[0].get('filename', '未知'),
+                        ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
+                        version.get('version_type', '未知'),
+                        version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
+                    ), tags=(version.get('id'),))
+
+        load_version_list()
         
         def confirm_selection():
             """确认选择"""
-            if selected_version[0] is None:
+            selection = version_tree.selection()
+            if not selection or not version_tree.item(selection[0])['tags']:
                 messagebox.showwarning("警告", "请先选择一个版本")
                 return
+            future.set_result({'version_id': version_tree.item(selection[0])['tags'][0], 'instance': install_version_var.get()})
             version_window.destroy()
         
-        # 绑定选择事件
-        self.version_tree.bind('<<TreeviewSelect>>', on_version_select)
-        
         # 按钮框架
         button_frame = ttk.Frame(version_main_frame)
         button_frame.pack(fill=tk.X)
@@ -4473,37 +7133,20 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
 
         def cancel():
             """取消"""
-            selected_version[0] = 'not_selected'
+            future.set_result(None)
             version_window.destroy()
 
-
         # 取消按钮
         cancel_button = ttk.Button(button_frame, text="取消", command=cancel)
         cancel_button.pack(side=tk.RIGHT, padx=(0, 5))
+        version_window.protocol("WM_DELETE_WINDOW", cancel)
+        # 窗口随父窗口一起关闭时也视为取消
+        version_window.bind("<Destroy>", lambda event: event.widget is version_window and not future.done() and future.set_result(None))
 
         # 重新启用下载按钮
         self.download_shader_button.config(state=tk.NORMAL)
         
-        # 等待窗口关闭
-        version_window.wait_window()
-        
-        # 返回选择的版本ID
-        return selected_version[0]
-    
-    def load_shader_version(self, event):
-        """加载光影包版本"""
-        self.version_tree.delete(*self.version_tree.get_children())
-
-        # 填充版本数据
-        for version in self.versions_data:
-            if self.shader_minecraft_version_var.get() == "全部" or self.shader_minecraft_version_var.get() in version.get('game_versions', []):
-                self.version_tree.insert('', tk.END, values=(
-                    version.get('version_number', '未知'),
-                    version.get('files', [])[0].get('filename', '未知'),
-                    ', '.join(version.get('game_versions', [])) if version.get('game_versions') else '未知',
-                    version.get('version_type', '未知'),
-                    version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
-                ), tags=(version.get('id'),))
+        return future
         
     def _download_shader_thread(self, project_id):
         """在后台线程中下载光影包"""
@@ -4516,43 +7159,27 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
             # 获取项目详细信息
             project_url = f'https://api.modrinth.com/v2/project/{project_id}'
-            req = urllib.request.Request(project_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            project_data = json.loads(response.read().decode())
+            project_data = json.loads(self.http_request(project_url).decode())
             
             # 获取项目版本信息
             versions_url = f'https://api.modrinth.com/v2/project/{project_id}/version'
-            req = urllib.request.Request(versions_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            versions_data = json.loads(response.read().decode())
+            versions_data = json.loads(self.http_request(versions_url).decode())
             
             # 选择版本
             if not versions_data:
                 self.shader_log("未找到可用版本", "WARN")
                 return
             
-            # 在主线程中显示版本选择窗口
-            selected_version_id = [None]
-            def show_version_selector():
-                selected_version_id[0] = self.select_shader_version(versions_data, project_data.get('title', '未知光影包'))
-            
-            show_version_selector()
-            
-            # 等待用户选择版本
-            while selected_version_id[0] is None:
-                import time
-                time.sleep(0.1)
-            
-            if selected_version_id[0] == 'not_selected':
+            # 在主线程中显示版本选择窗口，等待用户确认或取消
+            selection = self.call_in_main_thread(self.select_shader_version, versions_data, project_data.get('title', '未知光影包')).result()
+            if selection is None:
                 self.shader_log("用户取消了版本选择", "WARN")
                 return
                 
             # 获取选中版本的详细信息
             selected_version = None
             for version in versions_data:
-                if version.get('id') == selected_version_id[0]:
+                if version.get('id') == selection['version_id']:
                     selected_version = version
                     break
             
@@ -4576,8 +7203,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 return
                 
             # 确定保存路径
-            self.init_isolation_state(self.install_shader_version_var.get())
-            shaderpacks_dir = f"{self.isolation_dir}/shaderpacks"
+            shaderpacks_dir = f"{self.get_isolation_dir(selection['instance'])}/shaderpacks"
             if not os.path.exists(shaderpacks_dir):
                 os.makedirs(shaderpacks_dir)
                 
@@ -4586,11 +7212,8 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             self.shader_log(f"正在下载: {file_name}", "INFO")
             
             # 下载文件
-            def progress_callback(block_num, block_size, total_size):
-                percent = min(100, int(block_num * block_size * 100 / total_size))
-                self.shader_window.after(0, lambda: self.shader_log(f"下载进度: {percent}%", "INFO"))
-                
-            urllib.request.urlretrieve(file_url, save_path, reporthook=progress_callback)
+            if self.download_files([{'urls': [file_url], 'path': save_path, 'name': file_name, 'hashes': file_info.get('hashes'), 'size': file_info.get('size')}], self.shader_log):
+                raise Exception(f"{file_name} 下载失败")
             
             self.shader_log(f"光影包下载完成: {save_path}", "INFO")
             
@@ -4598,7 +7221,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
         except Exception as e:
             self.shader_log(f"下载失败: {str(e)}", "ERROR")
-            messagebox.showerror("错误", f"下载失败: {str(e)}")
+            self.shader_window.after(0, lambda error=str(e): messagebox.showerror("错误", f"下载失败: {error}"))
         finally:
             # 重新启用下载按钮
             self.shader_window.after(0, lambda: self.download_shader_button.config(state=tk.NORMAL))
@@ -4753,7 +7376,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         self.modpack_log("正在获取版本列表...", "INFO")
         try:
             # 获取所有可用版本
-            versions = minecraft_launcher_lib.utils.get_version_list()
+            versions = self.get_minecraft_version_list(self.refresh_widget(self.modpack_mc_version_combobox, self.load_modpack_version_list))
             if self.show_non_release_modpack_var.get():
                 self.version_list = [version['id'] for version in versions]
             else:
@@ -4778,18 +7401,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             
     def modpack_log(self, message, level):
         """在整合包日志区域显示消息"""
-        print(f"[{time.asctime()}] [modpack/{level}] {message}")
-        with open(f"logs/log_{self.start_time}.log", "a", encoding="utf-8") as f:
-            f.write(f"[{time.asctime()}] [modpack/{level}] {message}\n")
-        
-        self.modpack_log_text.config(state=tk.NORMAL)
-        self.modpack_log_text.insert(tk.END, message + "\n")
-        self.modpack_log_text.config(state=tk.DISABLED)
-        self.modpack_log_text.see(tk.END)
-        self.modpack_install_log_text.config(state=tk.NORMAL)
-        self.modpack_install_log_text.insert(tk.END, message + "\n")
-        self.modpack_install_log_text.config(state=tk.DISABLED)
-        self.modpack_install_log_text.see(tk.END)
+        self.write_log("modpack", message, level, ['modpack_log_text', 'modpack_install_log_text'])
         
     def search_modpacks(self):
         """搜索整合包"""
@@ -4844,10 +7456,7 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
             url = base_url + '?' + urllib.parse.urlencode(params)
             
             # 发送请求
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            data = json.loads(response.read().decode())
+            data = json.loads(self.http_request(url).decode())
             
             # 在主线程中更新UI
             self.modpack_window.after(0, self._update_modpacks_tree, data)
@@ -4940,7 +7549,9 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         download_thread.start()
         
     def select_modpack_version(self, versions_data, project_name):
-        """选择整合包版本"""
+        """选择整合包版本（在主线程中调用），返回Future，确认后结果为{'version_id'}，取消时为None"""
+        future = concurrent.futures.Future()
+
         # 创建版本选择窗口
         version_window = tk.Toplevel(self.modpack_window)
         version_window.title(f"选择 {project_name} 的版本")
@@ -4997,28 +7608,15 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 version.get('date_published', '未知')[:10] if version.get('date_published') else '未知'
             ), tags=(version.get('id'),))
         
-        # 选择的版本变量
-        selected_version = [None]  # 使用列表以便在内部函数中修改
-
-        def on_version_select(event):
-            """当选择版本时"""
-            selection = version_tree.selection()
-            if selection:
-                item = version_tree.item(selection[0])
-                tags = item['tags']
-                if tags:
-                    selected_version[0] = tags[0]
-        
         def confirm_selection(): 
             """确认选择"""
-            if selected_version[0] is None:
+            selection = version_tree.selection()
+            if not selection or not version_tree.item(selection[0])['tags']:
                 messagebox.showwarning("警告", "请先选择一个版本")
                 return
+            future.set_result({'version_id': version_tree.item(selection[0])['tags'][0]})
             version_window.destroy()
         
-        # 绑定选择事件
-        version_tree.bind('<<TreeviewSelect>>', on_version_select)
-        
         # 按钮框架
         button_frame = ttk.Frame(version_main_frame)
         button_frame.pack(fill=tk.X)
@@ -5029,21 +7627,20 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
 
         def cancel():
             """取消"""
-            selected_version[0] = 'not_selected'
+            future.set_result(None)
             version_window.destroy()
 
         # 取消按钮
         cancel_button = ttk.Button(button_frame, text="取消", command=cancel)
         cancel_button.pack(side=tk.RIGHT, padx=(0, 5))
+        version_window.protocol("WM_DELETE_WINDOW", cancel)
+        # 窗口随父窗口一起关闭时也视为取消
+        version_window.bind("<Destroy>", lambda event: event.widget is version_window and not future.done() and future.set_result(None))
 
         # 重新启用下载按钮
         self.download_modpack_button.config(state=tk.NORMAL)
         
-        # 等待窗口关闭
-        version_window.wait_window()
-        
-        # 返回选择的版本ID
-        return selected_version[0]
+        return future
         
     def _download_modpack_thread(self, project_id):
         """在后台线程中下载整合包"""
@@ -5054,49 +7651,29 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 
             self.modpack_log(f"正在获取整合包信息: {project_id}", "INFO")
             
-            import zipfile
-            import tempfile
-            import shutil
-            
             # 获取项目详细信息
             project_url = f'https://api.modrinth.com/v2/project/{project_id}'
-            req = urllib.request.Request(project_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            project_data = json.loads(response.read().decode())
+            project_data = json.loads(self.http_request(project_url).decode())
             
             # 获取项目版本信息
             versions_url = f'https://api.modrinth.com/v2/project/{project_id}/version'
-            req = urllib.request.Request(versions_url)
-            req.add_header('User-Agent', 'PMCL/1.2 (Python Minecraft Launcher)')
-            response = urllib.request.urlopen(req)
-            versions_data = json.loads(response.read().decode())
+            versions_data = json.loads(self.http_request(versions_url).decode())
             
             # 选择版本
             if not versions_data:
                 self.modpack_log("未找到可用版本", "WARN")
                 return
             
-            # 在主线程中显示版本选择窗口
-            selected_version_id = [None]
-            def show_version_selector():
-                selected_version_id[0] = self.select_modpack_version(versions_data, project_data.get('title', '未知整合包'))
-            
-            show_version_selector()
-            
-            # 等待用户选择版本
-            while selected_version_id[0] is None:
-                import time
-                time.sleep(0.1)
-            
-            if selected_version_id[0] == 'not_selected':
+            # 在主线程中显示版本选择窗口，等待用户确认或取消
+            selection = self.call_in_main_thread(self.select_modpack_version, versions_data, project_data.get('title', '未知整合包')).result()
+            if selection is None:
                 self.modpack_log("用户取消了版本选择", "WARN")
                 return
                 
             # 获取选中版本的详细信息
             selected_version = None
             for version in versions_data:
-                if version.get('id') == selected_version_id[0]:
+                if version.get('id') == selection['version_id']:
                     selected_version = version
                     break
             
@@ -5119,203 +7696,282 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
                 self.modpack_log("文件信息不完整", "WARN")
                 return
                 
-            # 创建临时目录
-            temp_dir = tempfile.mkdtemp()
-            modpack_zip_path = os.path.join(temp_dir, file_name)
+            # 整合包保存在缓存目录中，安装失败后重试时无需重新下载
+            modpack_zip_path = os.path.join(self.minecraft_directory, 'pmcl_cache', 'modpacks', file_name)
             
             self.modpack_log(f"正在下载整合包: {file_name}", "INFO")
             
             # 下载整合包文件
-            def progress_callback(block_num, block_size, total_size):
-                percent = min(100, int(block_num * block_size * 100 / total_size))
-                self.modpack_window.after(0, lambda: self.modpack_log(f"下载进度: {percent}%", "INFO"))
-                
-            urllib.request.urlretrieve(file_url, modpack_zip_path, reporthook=progress_callback)
-            
-            self.modpack_log("整合包下载完成，正在解压...", "INFO")
+            if self.download_files([{'urls': [file_url], 'path': modpack_zip_path, 'name': file_name, 'hashes': file_info.get('hashes'), 'size': file_info.get('size')}], self.modpack_log):
+                raise Exception(f"{file_name} 下载失败")
             
-            # 解压整合包
-            extract_dir = os.path.join(temp_dir, 'extracted')
-            os.makedirs(extract_dir, exist_ok=True)
-            
-            with zipfile.ZipFile(modpack_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
+            self.modpack_log("整合包下载完成", "INFO")
+
+            if not self.install_mrpack(modpack_zip_path):
+                return
+
+            # 安装成功后删除整合包文件
+            os.remove(modpack_zip_path)
             
-            self.modpack_log("整合包解压完成，正在处理...", "INFO")
+            self.modpack_log("整合包安装完成!", "INFO")
+            self.modpack_window.after(0, lambda: messagebox.showinfo("成功", "整合包安装完成!"))
+
+            # 重新加载已安装版本列表
+            self.call_in_main_thread(self.load_installed_versions)
             
+        except Exception as e:
+            self.modpack_log(f"整合包安装失败: {str(e)}", "ERROR")
+            self.modpack_window.after(0, lambda error=str(e): messagebox.showerror("错误", f"整合包安装失败: {error}"))
+        finally:
+            # 重新启用下载按钮
+            self.modpack_window.after(0, lambda: self.download_modpack_button.config(state=tk.NORMAL))
+
+    def install_mrpack(self, modpack_path):
+        """安装Modrinth整合包(.mrpack)，直接从压缩包中读取文件，不解压到临时目录
+
+        文件先写入暂存目录，全部下载并校验后再一起移动到实例中。已完成的步骤记录在
+        暂存目录的manifest.json中，安装失败后重试同一个整合包时从失败的步骤继续。
+        """
+        import zipfile
+        import shutil
+
+        # 每个整合包文件使用独立的暂存目录
+        staging_dir = os.path.join(self.minecraft_directory, 'pmcl_cache', 'staging', self.hash_file(modpack_path, 'sha1'))
+        staging_files_dir = os.path.join(staging_dir, 'files')
+        manifest_path = os.path.join(staging_dir, 'manifest.json')
+
+        manifest = {'steps': []}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except Exception:
+                manifest = {'steps': []}
+            if manifest['steps']:
+                self.modpack_log(f"继续上次未完成的安装，已完成的步骤: {', '.join(manifest['steps'])}", "INFO")
+
+        def save_manifest(step=None):
+            if step:
+                manifest['steps'].append(step)
+            os.makedirs(staging_dir, exist_ok=True)
+            with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=4)
+            os.replace(f'{manifest_path}.tmp', manifest_path)
+
+        with zipfile.ZipFile(modpack_path, 'r') as zip_ref:
             # 读取modrinth.index.json文件
-            index_file = os.path.join(extract_dir, 'modrinth.index.json')
-            if not os.path.exists(index_file):
+            try:
+                index_data = json.loads(zip_ref.read('modrinth.index.json').decode('utf-8'))
+            except KeyError:
                 self.modpack_log("错误: 未找到modrinth.index.json文件", "WARN")
-                shutil.rmtree(temp_dir)
-                return
-            
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-            
+                return False
+
+            self.modpack_log("正在处理整合包...", "INFO")
+
             # 获取游戏版本和加载器信息
-            game_version = index_data.get('dependencies', {}).get('minecraft', '未知')
+            dependencies = index_data.get('dependencies', {})
+            game_version = dependencies.get('minecraft', '未知')
             modloader = None
-            if 'forge' in index_data.get('dependencies', {}):
+            if 'forge' in dependencies:
                 modloader = 'forge'
-            elif 'fabric-loader' in index_data.get('dependencies', {}):
+            elif 'fabric-loader' in dependencies:
                 modloader = 'fabric'
-            elif 'quilt-loader' in index_data.get('dependencies', {}):
+            elif 'quilt-loader' in dependencies:
                 modloader = 'quilt'
             
             self.modpack_log(f"整合包信息: Minecraft {game_version}, 加载器: {modloader if modloader else '原版'}", "INFO")
-            
-            # 检查是否需要安装游戏版本
-            current_max = 0
-
-            def set_status(status):
-                self.modpack_log(status.replace("Download", "下载").replace("Running", "运行").replace("Install java runtime", "安装Java环境").replace("Installation complete", "安装完成"), "INFO")
 
-            def set_progress(progress):
-                if current_max:
-                    self.modpack_log(f"进度：{progress}/{current_max} {progress / current_max * 100:.1f}%", "INFO")
-            
-            def set_max(new_max):
-                global current_max
-                current_max = new_max
-
-            callback = {
-                "setStatus": set_status,
-                "setProgress": set_progress,
-                "setMax": set_max
-            }
+            if 'isolation' not in manifest:
+                manifest['isolation'] = self.call_in_main_thread(messagebox.askyesno, "提示", "是否为安装的整合包启用版本隔离？")
+                save_manifest()
 
-            java_path = ''
-            java_exe = 'java.exe' if platform.system().lower() == 'windows' else 'java'
-            for root, dirs, files in os.walk(self.minecraft_directory):
-                if java_exe in files:
-                    java_path = os.path.join(root, java_exe)
-
-            if not java_path:
-                self.log("没有检测到Java，正在安装……", "INFO")
-                minecraft_launcher_lib.runtime.install_jvm_runtime(minecraft_launcher_lib.runtime.get_jvm_runtimes()[0], self.minecraft_directory, callback=callback)
-                for root, dirs, files in os.walk(self.minecraft_directory):
-                    if java_exe in files:
-                        java_path = os.path.join(root, java_exe)
-            
-            if not modloader:
-                if not os.path.exists(f"{self.minecraft_directory}/versions/{game_version}"):
-                    self.modpack_log(f"需要安装Minecraft {game_version}...", "INFO")
-                    try:
-                        minecraft_launcher_lib.install.install_minecraft_version(game_version, self.minecraft_directory, callback=callback)
-                        self.modpack_log(f"Minecraft {game_version} 安装完成", "INFO")
-                    except Exception as e:
-                        self.modpack_log(f"安装Minecraft版本失败: {str(e)}", "ERROR")
-            
-            # 检查是否需要安装模组加载器
-            if modloader == 'forge':
-                forge_version = index_data.get('dependencies', {}).get('forge')
-                if forge_version:
-                    for version in minecraft_launcher_lib.forge.list_forge_versions():
-                        if game_version in version and forge_version in version:
-                            forge_id = version
-                            break
-                    
-                    if not os.path.exists(f"{self.minecraft_directory}/versions/{forge_id}"):
-                        self.modpack_log(f"需要安装Forge {forge_version}...", "INFO")
-                        try:
-                            minecraft_launcher_lib.forge.install_forge_version(forge_id, self.minecraft_directory, java=java_exe, callback=callback)
-                            self.modpack_log(f"Forge {forge_version} 安装完成", "INFO")
-                            self.load_installed_versions()
-                            for version in self.launch_version_combobox['values']:
-                                if (game_version in version) and ('forge' in version):
-                                    installed_version = ''.join(version)
-                        except Exception as e:
-                            self.modpack_log(f"安装Forge失败: {str(e)}", "ERROR")
-            elif modloader == 'fabric':
-                fabric_loader_version = index_data.get('dependencies', {}).get('fabric-loader')
-                if fabric_loader_version:
-                    fabric_id = f"fabric-loader-{fabric_loader_version}-{game_version}"
-                    if not os.path.exists(f"{self.minecraft_directory}/versions/{fabric_id}"):
-                        self.modpack_log(f"需要安装Fabric Loader {fabric_loader_version}...", "INFO")
-                        try:
-                            minecraft_launcher_lib.fabric.install_fabric(game_version, self.minecraft_directory, loader_version=fabric_loader_version, java=java_exe, callback=callback)
-                            self.modpack_log(f"Fabric Loader {fabric_loader_version} 安装完成", "INFO")
-                        except Exception as e:
-                            self.modpack_log(f"安装Fabric失败: {str(e)}", "ERROR")
-            
-            elif modloader == 'quilt':
-                quilt_loader_version = index_data.get('dependencies', {}).get('Quilt-loader')
-                if quilt_loader_version:
-                    quilt_id = f"quilt-loader-{quilt_loader_version}-{game_version}"
-                    if not os.path.exists(f"{self.minecraft_directory}/versions/{quilt_id}"):
-                        self.modpack_log(f"需要安装Quilt Loader {quilt_loader_version}...", "INFO")
-                        try:
-                            minecraft_launcher_lib.quilt.install_quilt(game_version, self.minecraft_directory, loader_version=quilt_loader_version, java=java_exe, callback=callback)
-                            self.modpack_log(f"Quilt Loader {quilt_loader_version} 安装完成", "INFO")
-                        except Exception as e:
-                            self.modpack_log(f"安装Quilt失败: {str(e)}", "ERROR")
+            # 第一步：安装游戏版本和模组加载器
+            if 'loader' not in manifest['steps']:
+                manifest['version_id'] = self.install_mrpack_loader(game_version, modloader, dependencies)
+                save_manifest('loader')
+            version_id = manifest['version_id']
 
-            if messagebox.askyesno("提示", "是否为安装的整合包启用版本隔离？"):
-                if not modloader:
-                    isolation_dir = os.path.join(self.minecraft_directory, 'versions', game_version)
-                else:
-                    isolation_dir = os.path.join(self.minecraft_directory, 'versions', (installed_version if modloader == 'forge' else (fabric_id if modloader == 'fabric' else quilt_id)))
-                os.makedirs(os.path.join(isolation_dir, 'config'), exist_ok=True)
+            if manifest['isolation']:
+                isolation_dir = os.path.join(self.minecraft_directory, 'versions', version_id)
             else:
-                if not modloader:
-                    isolation_dir = ''.join(self.minecraft_directory)
-                else:
-                    isolation_dir = ''.join(self.minecraft_directory)
-            
-            # 下载依赖文件（模组、资源包等）
-            self.modpack_log("正在下载整合包依赖文件...", "INFO")
+                isolation_dir = ''.join(self.minecraft_directory)
             
+            # 第二步：下载依赖文件（模组、资源包等）到暂存目录
+            download_tasks = []
             for file_info in index_data.get('files', []):
+                # 跳过仅服务端需要的文件
+                if file_info.get('env', {}).get('client') == 'unsupported':
+                    continue
+
                 file_path = file_info.get('path', '')
                 downloads = file_info.get('downloads', [])
                 
                 if downloads:
-                    download_url = downloads[0]
-                    
-                    # 确定保存路径
-                    save_path = os.path.join(isolation_dir, file_path)
-                    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                    
-                    # 下载文件
-                    try:
-                        urllib.request.urlretrieve(download_url, save_path)
-                        self.modpack_log(f"已下载: {file_path}", "INFO")
-                    except Exception as e:
-                        self.modpack_log(f"下载 {file_path} 失败: {str(e)}", "ERROR")
-            
-            # 复制overrides文件夹（如果有）
-            overrides_dir = os.path.join(extract_dir, 'overrides')
-            if os.path.exists(overrides_dir):
-                self.modpack_log("正在复制overrides文件...", "INFO")
-                for root, dirs, files in os.walk(overrides_dir):
-                    for file in files:
-                        src_path = os.path.join(root, file)
-                        rel_path = os.path.relpath(src_path, overrides_dir)
-                        dst_path = os.path.join(isolation_dir, rel_path)
-                        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-                        shutil.copy2(src_path, dst_path)
+                    # 检查路径是否合法，文件先保存到暂存目录
+                    self.get_safe_path(isolation_dir, file_path)
+                    download_tasks.append({
+                        'urls': downloads,
+                        'path': self.get_safe_path(staging_files_dir, file_path),
+                        'name': file_path,
+                        'hashes': file_info.get('hashes'),
+                        'size': file_info.get('fileSize'),
+                        'store': True
+                    })
+
+            if 'download' not in manifest['steps']:
+                self.modpack_log("正在下载整合包依赖文件...", "INFO")
+
+                # 并发下载文件，已经下载并校验过的文件会被跳过
+                failed_tasks = self.download_files(download_tasks, self.modpack_log)
+                if failed_tasks:
+                    raise Exception(f"{len(failed_tasks)} 个文件下载失败，重新安装时将继续下载")
+                save_manifest('download')
+            
+            # 第三步：复制overrides文件夹（如果有）到暂存目录
+            if 'overrides' not in manifest['steps']:
+                self.extract_mrpack_overrides(zip_ref, staging_files_dir)
+                save_manifest('overrides')
+
+        # 第四步：将暂存的文件移动到实例中，失败时回滚
+        if 'commit' not in manifest['steps']:
+            self.modpack_log("正在将文件移动到实例中...", "INFO")
+            if manifest['isolation']:
+                os.makedirs(os.path.join(isolation_dir, 'config'), exist_ok=True)
+            if os.path.isdir(staging_files_dir):
+                self.migrate_directories(staging_files_dir, isolation_dir, os.listdir(staging_files_dir), True)
+
+            # 共享存储中的引用改为指向实例中的文件
+            if self.use_shared_store:
+                for task in download_tasks:
+                    sha1 = (task.get('hashes') or {}).get('sha1')
+                    final_path = os.path.join(isolation_dir, os.path.relpath(task['path'], staging_files_dir))
+                    object_path = self.get_store_object_path(sha1) if sha1 else None
+                    if object_path and os.path.exists(object_path) and os.path.exists(final_path) and os.path.samefile(object_path, final_path):
+                        self.add_store_ref(sha1, task.get('size'), final_path, 'link')
+                self.save_store_index()
+            save_manifest('commit')
+
+        self.rename_version(version_id, self.version_name)
+
+        # 安装完成，删除暂存目录
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return True
+
+    def install_mrpack_loader(self, game_version, modloader, dependencies):
+        """安装整合包需要的游戏版本和模组加载器，返回版本ID，失败时删除安装了一半的版本"""
+        import shutil
+        current_max = 0
+
+        def set_status(status):
+            self.modpack_log(status.replace("Download", "下载").replace("Running", "运行").replace("Install java runtime", "安装Java环境").replace("Installation complete", "安装完成"), "INFO")
+
+        def set_progress(progress):
+            if current_max:
+                self.modpack_log(f"进度：{progress}/{current_max} {progress / current_max * 100:.1f}%", "INFO")
+        
+        def set_max(new_max):
+            nonlocal current_max
+            current_max = new_max
 
+        callback = {
+            "setStatus": set_status,
+            "setProgress": set_progress,
+            "setMax": set_max
+        }
+
+        # 记录安装前已有的版本
+        versions_dir = os.path.join(self.minecraft_directory, 'versions')
+        old_versions = set(os.listdir(versions_dir)) if os.path.isdir(versions_dir) else set()
+
+        try:
             if not modloader:
-                self.rename_version(game_version, self.version_name)
-            else:
-                self.rename_version(installed_version if modloader == 'forge' else (fabric_id if modloader == 'fabric' else quilt_id), self.version_name)
-            
-            # 清理临时文件
-            shutil.rmtree(temp_dir)
-            
-            self.modpack_log("整合包安装完成!", "INFO")
-            self.modpack_window.after(0, lambda: messagebox.showinfo("成功", "整合包安装完成!"))
+                version_id = game_version
+                if not os.path.exists(f"{self.minecraft_directory}/versions/{game_version}"):
+                    self.modpack_log(f"需要安装Minecraft {game_version}...", "INFO")
+                    minecraft_launcher_lib.install.install_minecraft_version(game_version, self.minecraft_directory, callback=callback)
+                    self.modpack_log(f"Minecraft {game_version} 安装完成", "INFO")
 
-            # 重新加载已安装版本列表
-            self.load_installed_versions()
+            # 检查是否需要安装模组加载器
+            elif modloader == 'forge':
+                forge_version = dependencies.get('forge')
+                version_id = self.find_installed_forge(game_version, forge_version)
+                if not version_id:
+                    forge_id = self.find_forge_version(game_version, forge_version)
+                    if not forge_id:
+                        raise Exception(f"找不到Forge {forge_version} for Minecraft {game_version}")
+                    self.modpack_log(f"需要安装Forge {forge_version}...", "INFO")
+                    java_path = self.get_java_for_install(game_version, self.modpack_log, callback)
+                    minecraft_launcher_lib.forge.install_forge_version(forge_id, self.minecraft_directory, java=java_path, callback=callback)
+                    version_id = self.find_installed_forge(game_version, forge_version)
+                    if not version_id:
+                        raise Exception(f"安装Forge {forge_version} 后找不到对应的版本")
+                    self.modpack_log(f"Forge {forge_version} 安装完成", "INFO")
+
+            elif modloader == 'fabric':
+                fabric_loader_version = dependencies.get('fabric-loader')
+                version_id = f"fabric-loader-{fabric_loader_version}-{game_version}"
+                if not os.path.exists(f"{self.minecraft_directory}/versions/{version_id}"):
+                    self.modpack_log(f"需要安装Fabric Loader {fabric_loader_version}...", "INFO")
+                    java_path = self.get_java_for_install(game_version, self.modpack_log, callback)
+                    minecraft_launcher_lib.fabric.install_fabric(game_version, self.minecraft_directory, loader_version=fabric_loader_version, java=java_path, callback=callback)
+                    self.modpack_log(f"Fabric Loader {fabric_loader_version} 安装完成", "INFO")
             
-        except Exception as e:
-            self.modpack_log(f"整合包安装失败: {str(e)}", "ERROR")
-            messagebox.showerror("错误", f"整合包安装失败: {str(e)}")
-        finally:
-            # 重新启用下载按钮
-            self.modpack_window.after(0, lambda: self.download_modpack_button.config(state=tk.NORMAL))
+            else:
+                quilt_loader_version = dependencies.get('quilt-loader')
+                version_id = f"quilt-loader-{quilt_loader_version}-{game_version}"
+                if not os.path.exists(f"{self.minecraft_directory}/versions/{version_id}"):
+                    self.modpack_log(f"需要安装Quilt Loader {quilt_loader_version}...", "INFO")
+                    java_path = self.get_java_for_install(game_version, self.modpack_log, callback)
+                    minecraft_launcher_lib.quilt.install_quilt(game_version, self.minecraft_directory, loader_version=quilt_loader_version, java=java_path, callback=callback)
+                    self.modpack_log(f"Quilt Loader {quilt_loader_version} 安装完成", "INFO")
+        except Exception:
+            # 删除这次安装了一半的版本
+            if os.path.isdir(versions_dir):
+                for version in set(os.listdir(versions_dir)) - old_versions:
+                    self.modpack_log(f"正在删除未安装完成的版本 {version}", "WARN")
+                    shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+            raise
+
+        return version_id
+
+    def find_installed_forge(self, game_version, forge_version):
+        """查找已安装的Forge版本，找不到时返回None"""
+        versions_dir = os.path.join(self.minecraft_directory, 'versions')
+        if not forge_version or not os.path.isdir(versions_dir):
+            return None
+        # Forge安装器生成的版本ID，旧版本使用不同的格式
+        candidates = [f"{game_version}-forge-{forge_version}", f"{game_version}-forge{game_version}-{forge_version}", f"{game_version}-Forge{forge_version}-{game_version}"]
+        installed = os.listdir(versions_dir)
+        for candidate in candidates:
+            for version in installed:
+                if version.lower() == candidate.lower():
+                    return version
+        # 不使用被重命名的版本，它可能是其他整合包的实例
+        return None
+
+    def get_safe_path(self, base_dir, relative_path):
+        """拼接路径，拒绝指向base_dir以外的路径"""
+        base_dir = os.path.abspath(base_dir)
+        target_path = os.path.abspath(os.path.join(base_dir, relative_path))
+        if os.path.isabs(relative_path) or os.path.commonpath([base_dir, target_path]) != base_dir:
+            raise Exception(f"非法的文件路径: {relative_path}")
+        return target_path
+
+    def extract_mrpack_overrides(self, zip_ref, dest_dir):
+        """将整合包中的overrides和client-overrides直接写入目标目录"""
+        import shutil
+        # client-overrides会覆盖overrides中的同名文件
+        for prefix in ('overrides/', 'client-overrides/'):
+            members = [info for info in zip_ref.infolist() if info.filename.startswith(prefix) and not info.is_dir()]
+            if not members:
+                continue
+
+            self.modpack_log(f"正在复制{prefix[:-1]}文件...", "INFO")
+            for info in members:
+                dst_path = self.get_safe_path(dest_dir, info.filename[len(prefix):])
+                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                with zip_ref.open(info) as src_file, open(dst_path, 'wb') as dst_file:
+                    shutil.copyfileobj(src_file, dst_file, 1024 * 1024)
 
     def install_modpack(self, modpack_path):
         """安装本地整合包"""
@@ -5338,197 +7994,30 @@ copyright © 2025 Bilibili @七星五彩 (Github Gitcode & YouTube Dilideguazi).
         try:
             if not modpack_path:
                 self.modpack_log("请指定整合包文件！", "WARN")
-                messagebox.showwarning("警告", "请指定整合包文件！")
+                self.call_in_main_thread(messagebox.showwarning, "警告", "请指定整合包文件！")
                 return
             
-            import tempfile
-            import zipfile
-            import shutil
-
             # 禁用按钮防止重复安装
-            self.modpack_install_button.config(state=tk.DISABLED)
+            self.call_in_main_thread(lambda: self.modpack_install_button.config(state=tk.DISABLED))
 
-            # 解压整合包
-            extract_dir = tempfile.mkdtemp()
-            
-            with zipfile.ZipFile(modpack_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            self.modpack_log("整合包解压完成，正在处理...", "INFO")
-            
-            # 读取modrinth.index.json文件
-            index_file = os.path.join(extract_dir, 'modrinth.index.json')
-            if not os.path.exists(index_file):
-                self.modpack_log("错误: 未找到modrinth.index.json文件", "WARN")
-                shutil.rmtree(extract_dir)
+            if not self.install_mrpack(modpack_path):
                 return
             
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index_data = json.load(f)
-            
-            # 获取游戏版本和加载器信息
-            game_version = index_data.get('dependencies', {}).get('minecraft', '未知')
-            modloader = None
-            if 'forge' in index_data.get('dependencies', {}):
-                modloader = 'forge'
-            elif 'fabric-loader' in index_data.get('dependencies', {}):
-                modloader = 'fabric'
-            elif 'quilt-loader' in index_data.get('dependencies', {}):
-                modloader = 'quilt'
-            
-            self.modpack_log(f"整合包信息: Minecraft {game_version}, 加载器: {modloader if modloader else '原版'}", "INFO")
-            
-            # 检查是否需要安装游戏版本
-            current_max = 0
-
-            def set_status(status):
-                self.modpack_log(status.replace("Download", "下载").replace("Running", "运行").replace("Install java runtime", "安装Java环境").replace("Installation complete", "安装完成"), "INFO")
-
-            def set_progress(progress):
-                if current_max:
-                    self.modpack_log(f"进度：{progress}/{current_max} {progress / current_max * 100:.1f}%", "INFO")
-            
-            def set_max(new_max):
-                global current_max
-                current_max = new_max
-
-            callback = {
-                "setStatus": set_status,
-                "setProgress": set_progress,
-                "setMax": set_max
-            }
-
-            java_path = ''
-            java_exe = 'java.exe' if platform.system().lower() == 'windows' else 'java'
-            for root, dirs, files in os.walk(self.minecraft_directory):
-                if java_exe in files:
-                    java_path = os.path.join(root, java_exe)
-
-            if not java_path:
-                self.log("没有检测到Java，正在安装……", "INFO")
-                minecraft_launcher_lib.runtime.install_jvm_runtime(minecraft_launcher_lib.runtime.get_jvm_runtimes()[0], self.minecraft_directory, callback=callback)
-                for root, dirs, files in os.walk(self.minecraft_directory):
-                    if java_exe in files:
-                        java_path = os.path.join(root, java_exe)
-
-            if not modloader:
-                if not os.path.exists(f"{self.minecraft_directory}/versions/{game_version}"):
-                    self.modpack_log(f"需要安装Minecraft {game_version}...", "INFO")
-                    try:
-                        minecraft_launcher_lib.install.install_minecraft_version(game_version, self.minecraft_directory, callback=callback)
-                        self.modpack_log(f"Minecraft {game_version} 安装完成", "INFO")
-                    except Exception as e:
-                        self.modpack_log(f"安装Minecraft版本失败: {str(e)}", "ERROR")
-            
-            # 检查是否需要安装模组加载器
-            if modloader == 'forge':
-                forge_version = index_data.get('dependencies', {}).get('forge')
-                if forge_version:
-                    for version in minecraft_launcher_lib.forge.list_forge_versions():
-                        if game_version in version and forge_version in version:
-                            forge_id = version
-                            break
-                    
-                    if not os.path.exists(f"{self.minecraft_directory}/versions/{forge_id}"):
-                        self.modpack_log(f"需要安装Forge {forge_version}...", "INFO")
-                        try:
-                            minecraft_launcher_lib.forge.install_forge_version(forge_id, self.minecraft_directory, java=java_exe, callback=callback)
-                            self.modpack_log(f"Forge {forge_version} 安装完成", "INFO")
-                            self.load_installed_versions()
-                            for version in self.launch_version_combobox['values']:
-                                if (game_version in version) and ('forge' in version):
-                                    installed_version = ''.join(version)
-                        except Exception as e:
-                            self.modpack_log(f"安装Forge失败: {str(e)}", "ERROR")
-            elif modloader == 'fabric':
-                fabric_loader_version = index_data.get('dependencies', {}).get('fabric-loader')
-                if fabric_loader_version:
-                    fabric_id = f"fabric-loader-{fabric_loader_version}-{game_version}"
-                    if not os.path.exists(f"{self.minecraft_directory}/versions/{fabric_id}"):
-                        self.modpack_log(f"需要安装Fabric Loader {fabric_loader_version}...", "INFO")
-                        try:
-                            minecraft_launcher_lib.fabric.install_fabric(game_version, self.minecraft_directory, loader_version=fabric_loader_version, java=java_exe, callback=callback)
-                            self.modpack_log(f"Fabric Loader {fabric_loader_version} 安装完成", "INFO")
-                        except Exception as e:
-                            self.modpack_log(f"安装Fabric失败: {str(e)}", "ERROR")
-            
-            elif modloader == 'quilt':
-                quilt_loader_version = index_data.get('dependencies', {}).get('quilt-loader')
-                if quilt_loader_version:
-                    quilt_id = f"quilt-loader-{quilt_loader_version}-{game_version}"
-                    if not os.path.exists(f"{self.minecraft_directory}/versions/{quilt_id}"):
-                        self.modpack_log(f"需要安装Quilt Loader {quilt_loader_version}...", "INFO")
-                        try:
-                            minecraft_launcher_lib.quilt.install_quilt(game_version, self.minecraft_directory, loader_version=quilt_loader_version, java=java_exe, callback=callback)
-                            self.modpack_log(f"Quilt Loader {quilt_loader_version} 安装完成", "INFO")
-                        except Exception as e:
-                            self.modpack_log(f"安装Quilt失败: {str(e)}", "ERROR")
-            
-            # 下载依赖文件（模组、资源包等）
-            self.modpack_log("正在下载整合包依赖文件...", "INFO")
-
-            if self.modpack_window.after(0, messagebox.askyesno("提示", "是否为安装的整合包启用版本隔离？")):
-                if not modloader:
-                    isolation_dir = os.path.join(self.minecraft_directory, 'versions', game_version)
-                else:
-                    isolation_dir = os.path.join(self.minecraft_directory, 'versions', installed_version if modloader == 'forge' else (fabric_id if modloader == 'fabric' else quilt_id))
-                os.makedirs(os.path.join(isolation_dir, 'config'), exist_ok=True)
-            else:
-                if not modloader:
-                    isolation_dir = ''.join(self.minecraft_directory)
-                else:
-                    isolation_dir = ''.join(self.minecraft_directory)
-
-            for file_info in index_data.get('files', []):
-                file_path = file_info.get('path', '')
-                downloads = file_info.get('downloads', [])
-                
-                if downloads:
-                    download_url = downloads[0]
-                    
-                    # 确定保存路径                    
-                    save_path = os.path.join(isolation_dir, file_path)
-                    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                    
-                    # 下载文件
-                    try:
-                        urllib.request.urlretrieve(download_url, save_path)                        
-                        self.modpack_log(f"已下载: {file_path}", "INFO")
-                    except Exception as e:
-                        self.modpack_log(f"下载 {file_path} 失败: {str(e)}", "ERROR")
-            
-            # 复制overrides文件夹（如果有）
-            overrides_dir = os.path.join(extract_dir, 'overrides')
-            if os.path.exists(overrides_dir):
-                self.modpack_log("正在复制overrides文件...", "INFO")
-                for root, dirs, files in os.walk(overrides_dir):
-                    for file in files:
-                        src_path = os.path.join(root, file)
-                        rel_path = os.path.relpath(src_path, overrides_dir)
-                        dst_path = os.path.join(isolation_dir, rel_path)
-                        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-                        shutil.copy2(src_path, dst_path)
-            
-            if not modloader:
-                self.rename_version(game_version, self.version_name)
-            else:
-                self.rename_version(installed_version if modloader == 'forge' else (fabric_id if modloader == 'fabric' else quilt_id), self.version_name)
-
-            # 清理临时文件
-            shutil.rmtree(extract_dir)
-            
             self.modpack_log("整合包安装完成!", "INFO")
-            self.modpack_window.after(0, lambda: messagebox.showinfo("成功", "整合包安装完成!"))
+            self.call_in_main_thread(messagebox.showinfo, "成功", "整合包安装完成!")
 
             # 重新加载已安装版本列表
-            self.load_installed_versions()
+            self.call_in_main_thread(self.load_installed_versions)
             
         except Exception as e:
             self.modpack_log(f"整合包安装失败: {str(e)}", "ERROR")
-            messagebox.showerror("错误", f"整合包安装失败: {str(e)}")
+            self.call_in_main_thread(messagebox.showerror, "错误", f"整合包安装失败: {str(e)}")
         finally:
-            # 重新启用安装按钮
-            self.modpack_install_button.config(state=tk.NORMAL)
+            # 重新启用安装按钮，窗口可能已经关闭
+            try:
+                self.call_in_main_thread(lambda: self.modpack_install_button.config(state=tk.NORMAL))
+            except tk.TclError:
+                pass
 
     def install_update(self):
         """安装更新"""
@@ -5581,6 +8070,7 @@ del /q updater.bat >nul
                 os.startfile('updater.bat')
             
             # 退出当前程序
+            self.stop_logger()
             sys.exit(0)
         except Exception as e:
             messagebox.showerror("错误", f"执行更新失败：{e}")